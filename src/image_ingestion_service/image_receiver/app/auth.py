@@ -5,14 +5,22 @@ import secrets
 import ipaddress
 import re
 import os
+import math
+import time
+import random
 from typing import Optional, Dict
 
 from fastapi import Request, Header, HTTPException, Response, status, Depends
 from fastapi.security import HTTPBasic, HTTPBasicCredentials
-from prometheus_client import Counter
-from asyncio import Lock
+from prometheus_client import Counter, Gauge, Histogram
 
-from .db import get_all_from_db
+from starlette.requests import ClientDisconnect
+
+from .db import fetch_all_from_db
+from .auth_mappings import AUTH_MAPPINGS_FILE, AuthMappings, compile_scripted_networks, read_auth_mappings_file
+from .config import get_float_env
+from .multipart import MultipartError, MultipartImageReader, multipart_boundary
+from .traffic_trace import start_trace
 
 # -------------------- Logger Setup --------------------
 logger = logging.getLogger(__name__)
@@ -35,18 +43,55 @@ def load_mapping_from_env(env_var: str, default: dict = None) -> dict:
         if isinstance(parsed, dict):
             return parsed
     except json.JSONDecodeError as e:
-        logger.warning(f"JSON decoding failed for {env_var}: {e}")
+        logger.warning("JSON decoding failed for %s: %s", env_var, e)
     return default
 
 # -------------------- Authentication Setup --------------------
 security = HTTPBasic()
 
-LOCATION_USER_PASS_MAPPING = load_mapping_from_env("LOCATION_USER_PASS_MAPPING")
-SCRIPTED_IP_MAPPING = load_mapping_from_env("SCRIPTED_IP_MAPPING")
-
-# In-memory cache of credentials fetched from the database
+def load_auth_mappings() -> AuthMappings:
+    """Startup maps: from AUTH_MAPPINGS_FILE if set and valid, otherwise from the environment."""
+    if AUTH_MAPPINGS_FILE:
+        try:
+            return read_auth_mappings_file(AUTH_MAPPINGS_FILE)
+        except (OSError, ValueError) as e:
+            logger.error("Could not load auth mappings from %s, using environment variables: %s", AUTH_MAPPINGS_FILE, e)
+    scripted = load_mapping_from_env("SCRIPTED_IP_MAPPING")
+    return AuthMappings(load_mapping_from_env("LOCATION_USER_PASS_MAPPING"), scripted, compile_scripted_networks(scripted))
+
+# Treated as immutable: the lifespan and reloads rebind these names via
+# apply_auth_mappings. Empty until then, so importing the module does no I/O.
+LOCATION_USER_PASS_MAPPING: dict = {}
+SCRIPTED_IP_MAPPING: dict = {}
+_scripted_networks = (SCRIPTED_IP_MAPPING, [])
+
+def apply_auth_mappings(mappings: AuthMappings):
+    """Swap in reloaded maps. Runs on the event loop, so no request sees a mix of old and new."""
+    global LOCATION_USER_PASS_MAPPING, SCRIPTED_IP_MAPPING, _scripted_networks
+    LOCATION_USER_PASS_MAPPING = mappings.locations
+    SCRIPTED_IP_MAPPING = mappings.scripted
+    _scripted_networks = (mappings.scripted, mappings.scripted_networks)
+
+def scripted_networks():
+    """Parsed networks for the current SCRIPTED_IP_MAPPING, recompiled only if the mapping was replaced."""
+    global _scripted_networks
+    mapping, networks = _scripted_networks
+    if mapping is not SCRIPTED_IP_MAPPING:
+        networks = compile_scripted_networks(SCRIPTED_IP_MAPPING)
+        _scripted_networks = (SCRIPTED_IP_MAPPING, networks)
+    return networks
+
+# In-memory cache of credentials fetched from the database. Refreshes build
+# a new dict and rebind the name, so readers never see a partial update.
 CREDENTIAL_CACHE: Dict[str, dict] = {}
-CREDENTIAL_CACHE_LOCK = Lock()
+CREDENTIAL_CACHE_LOADED_AT: Optional[float] = None
+
+# Refresh cadence, backoff while the DB is failing, and how long the last
+# good cache may be served before it is reported as stale
+CREDENTIAL_REFRESH_INTERVAL_SECONDS = get_float_env("CREDENTIAL_REFRESH_INTERVAL_SECONDS", 30.0)
+CREDENTIAL_REFRESH_RETRY_SECONDS = get_float_env("CREDENTIAL_REFRESH_RETRY_SECONDS", 5.0)
+CREDENTIAL_REFRESH_MAX_BACKOFF_SECONDS = get_float_env("CREDENTIAL_REFRESH_MAX_BACKOFF_SECONDS", 300.0)
+CREDENTIAL_STALENESS_BUDGET_SECONDS = get_float_env("CREDENTIAL_STALENESS_BUDGET_SECONDS", 900.0)
 
 # -------------------- Prometheus Counters --------------------
 # These track various authentication and processing outcomes
@@ -66,39 +111,104 @@ def record_processing_success(): successful_processing_counter.inc()
 def record_processing_failure(): unsuccessful_processing_counter.inc()
 
 # -------------------- Credential Refresh Task --------------------
+def credential_cache_age() -> float:
+    """Seconds since the cache was last loaded from the DB, or infinity if it never was."""
+    if CREDENTIAL_CACHE_LOADED_AT is None:
+        return math.inf
+    return time.monotonic() - CREDENTIAL_CACHE_LOADED_AT
+
+def credential_cache_is_stale() -> bool:
+    return credential_cache_age() > CREDENTIAL_STALENESS_BUDGET_SECONDS
+
+def credential_cache_status() -> dict:
+    """Size and age of the cache, as reported by the readiness endpoint."""
+    age = credential_cache_age()
+    return {
+        "records": len(CREDENTIAL_CACHE),
+        "age_seconds": None if math.isinf(age) else round(age, 1),
+        "stale": credential_cache_is_stale(),
+    }
+
+credential_refresh_attempts_counter = Counter("credential_refresh_attempts_total", "Count of credential cache refreshes from the DB")
+credential_refresh_failures_counter = Counter("credential_refresh_failures_total", "Count of failed credential cache refreshes")
+credential_refresh_duration_histogram = Histogram(
+    "credential_refresh_duration_seconds",
+    "Time taken by a credential cache refresh, including failed ones",
+    buckets=(0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 15, 30),
+)
+credential_cache_age_gauge = Gauge("credential_cache_age_seconds", "Seconds since the credential cache was last refreshed")
+credential_cache_age_gauge.set_function(credential_cache_age)
+credential_cache_stale_gauge = Gauge("credential_cache_stale", "1 while the credential cache is older than its staleness budget")
+credential_cache_stale_gauge.set_function(lambda: float(credential_cache_is_stale()))
+
+def build_credential_cache(rows) -> Dict[str, dict]:
+    """Camera records keyed by their ID as a string, as looked up on each request."""
+    return {str(record["ID"]): record for record in rows}
+
+def swap_credential_cache(rows) -> int:
+    """Replace the cache with one built from DB rows in a single assignment."""
+    global CREDENTIAL_CACHE, CREDENTIAL_CACHE_LOADED_AT
+    CREDENTIAL_CACHE = build_credential_cache(rows)
+    CREDENTIAL_CACHE_LOADED_AT = time.monotonic()
+    return len(CREDENTIAL_CACHE)
+
+async def refresh_credentials() -> bool:
+    """
+    Reload the cache from the DB in a worker thread. On failure the last good
+    cache stays in place and False is returned.
+    """
+    credential_refresh_attempts_counter.inc()
+    start = time.perf_counter()
+    try:
+        rows = await asyncio.to_thread(fetch_all_from_db)
+        if not rows:
+            raise ValueError("query returned no cameras")
+        count = swap_credential_cache(rows)
+    except Exception as e:
+        credential_refresh_failures_counter.inc()
+        if CREDENTIAL_CACHE_LOADED_AT is None:
+            logger.error("Error loading camera details, none loaded yet: %s", e)
+        elif credential_cache_is_stale():
+            logger.error("Error updating camera details, cache is %.0fs old and past its staleness budget: %s", credential_cache_age(), e)
+        else:
+            logger.warning("Error updating camera details, serving cache from %.0fs ago: %s", credential_cache_age(), e)
+        return False
+    finally:
+        credential_refresh_duration_histogram.observe(time.perf_counter() - start)
+
+    logger.info("Updated %s camera details.", count)
+    return True
+
+def next_refresh_delay(failures: int) -> float:
+    """The regular interval after a success, otherwise jittered exponential backoff."""
+    if failures == 0:
+        return CREDENTIAL_REFRESH_INTERVAL_SECONDS
+    ceiling = min(CREDENTIAL_REFRESH_MAX_BACKOFF_SECONDS, CREDENTIAL_REFRESH_RETRY_SECONDS * 2 ** min(failures - 1, 20))
+    # Jitter over the upper half of the window, so replicas that lost the DB together do not retry in step
+    return random.uniform(ceiling / 2, ceiling)
+
 async def update_credentials_periodically():
-    """Background task to refresh credentials every 30 seconds."""
+    """Background task to refresh credentials, backing off while the DB is failing."""
+    failures = 0
     while True:
-        try:
-            logger.info("Refreshing camera details from DB...")
-            creds_list = get_all_from_db()
-            if creds_list:
-                new_cache = {str(record["ID"]): record for record in creds_list}
-                async with CREDENTIAL_CACHE_LOCK:
-                    CREDENTIAL_CACHE.clear()
-                    CREDENTIAL_CACHE.update(new_cache)
-                logger.info(f"Updated {len(new_cache)} camera details.")
-        except Exception as e:
-            logger.error(f"Error updating camera details: {e}")
-        await asyncio.sleep(30)
+        logger.info("Refreshing camera details from DB...")
+        failures = 0 if await refresh_credentials() else failures + 1
+        await asyncio.sleep(next_refresh_delay(failures))
 
 async def get_cached_credentials():
-    async with CREDENTIAL_CACHE_LOCK:
-        return CREDENTIAL_CACHE.copy()
+    # No copy needed: refreshes swap in a new dict rather than mutating this one
+    return CREDENTIAL_CACHE
 
 # -------------------- Initial Load of Credentials --------------------
 def get_data_from_db():
     """One-time loading of credentials on startup or fallback."""
     try:
         logger.info("Initializing camera details from DB...")
-        creds_list = get_all_from_db()
+        creds_list = fetch_all_from_db()
         if creds_list:
-            # Build a dictionary with camera ID as the key
-            new_cache = {str(record["ID"]): record for record in creds_list}
-            CREDENTIAL_CACHE.clear()
-            CREDENTIAL_CACHE.update(new_cache)
+            swap_credential_cache(creds_list)
     except Exception as e:
-        logger.error(f"Error initializing camera details: {e}")
+        logger.error("Error initializing camera details: %s", e)
 
 # -------------------- Camera ID Validation --------------------
 def validate_id_and_get_camera_record(data: dict, camera_id: str) -> dict:
@@ -112,6 +222,16 @@ def validate_id_and_get_camera_record(data: dict, camera_id: str) -> dict:
     
     raise ValueError("No matching record found for this camera ID")
 
+# -------------------- Filename Parsing --------------------
+CAMERA_ID_INVALID_CHARS = re.compile(r'[^a-zA-Z0-9_-]')
+
+def camera_id_from_filename(filename: str) -> str:
+    """Derive the camera ID from an uploaded filename, e.g. '/x/123.jpg' -> '123'.
+    Returns an empty string if nothing usable is left."""
+    safe_basename = os.path.basename(filename)
+    camera_id_raw = os.path.splitext(safe_basename)[0]
+    return CAMERA_ID_INVALID_CHARS.sub('', camera_id_raw)[:20]
+
 # -------------------- IP & Protocol Extraction --------------------
 def get_client_ip(request: Request) -> str:
     """Extract client IP from 'forwarded' header or request context."""
@@ -157,7 +277,7 @@ def check_ip_match(client_ip: str, expected_ip: str) -> bool:
     try:
         client_addr = ipaddress.ip_address(client_ip)
     except ValueError:
-        logger.warning(f"Invalid client IP: {client_ip}")
+        logger.warning("Invalid client IP: %s", client_ip)
         return False
     
     try:
@@ -170,7 +290,7 @@ def check_ip_match(client_ip: str, expected_ip: str) -> bool:
             expected_addr = ipaddress.ip_address(expected_ip)
             return client_addr == expected_addr
     except ValueError:
-        logger.warning(f"Invalid expected IP or CIDR: {expected_ip}")
+        logger.warning("Invalid expected IP or CIDR: %s", expected_ip)
         return False
 
 def verify_credentials(credentials: HTTPBasicCredentials, expected_creds: dict) -> bool:
@@ -187,7 +307,7 @@ def get_camera_record_and_validate(camera_id: str, db_data: list) -> dict:
         return validate_id_and_get_camera_record(db_data, camera_id)
     except ValueError as e:
         record_auth_failure()
-        logger.warning(f"Validation Error for camera {camera_id}: {e}")
+        logger.warning("Validation Error for camera %s: %s", camera_id, e)
         raise HTTPException(status_code=401, detail="Unauthorized")
 
 # -------------------- IP Authorization --------------------
@@ -195,7 +315,7 @@ def verify_ip_or_raise(client_ip: str, expected_ip: str, camera_id: str):
     """Validate client IP against expected, raise if mismatch."""
     if expected_ip:
         if not check_ip_match(client_ip, expected_ip):
-            logger.warning(f"IP mismatch for {camera_id}: expected {expected_ip}, got {client_ip}")
+            logger.warning("IP mismatch for %s: expected %s, got %s", camera_id, expected_ip, client_ip)
             record_ip_failure()
             raise HTTPException(
                 status_code=401,
@@ -205,13 +325,13 @@ def verify_ip_or_raise(client_ip: str, expected_ip: str, camera_id: str):
         record_ip_success()
     else:
         record_ip_success()
-        logger.info(f"No IP restriction for camera {camera_id}. Skipping IP validation.")
+        logger.info("No IP restriction for camera %s. Skipping IP validation.", camera_id)
 
 # -------------------- Credential Authorization --------------------
 def verify_creds_or_raise(credentials: HTTPBasicCredentials, expected_creds: dict, camera_id: str):
     """Check credentials, log and raise if invalid."""
     if not expected_creds:
-        logger.warning(f"No credentials configured for camera {camera_id}.")
+        logger.warning("No credentials configured for camera %s.", camera_id)
         record_auth_failure()
         raise HTTPException(
             status_code=401,
@@ -219,7 +339,7 @@ def verify_creds_or_raise(credentials: HTTPBasicCredentials, expected_creds: dic
             headers={"WWW-Authenticate": "Basic"},
         )
     if not verify_credentials(credentials, expected_creds):
-        logger.warning(f"Invalid credentials for camera {camera_id}.")
+        logger.warning("Invalid credentials for camera %s.", camera_id)
         record_auth_failure()
         raise HTTPException(
             status_code=401,
@@ -228,6 +348,49 @@ def verify_creds_or_raise(credentials: HTTPBasicCredentials, expected_creds: dic
         )
     record_auth_success()
 
+# -------------------- Scripted Sources --------------------
+def find_scripted_source(client_ip: str) -> Optional[str]:
+    """Return the SCRIPTED_IP_MAPPING name whose IPs or CIDRs include client_ip, if any."""
+    networks = scripted_networks()
+    if not networks:
+        return None
+    try:
+        client_addr = ipaddress.ip_address(client_ip)
+    except ValueError:
+        logger.warning("Invalid client IP: %s", client_ip)
+        return None
+    for scripted_name, network in networks:
+        if client_addr in network:
+            return scripted_name
+    return None
+
+# -------------------- Upload Filename --------------------
+async def get_upload_filename(request: Request, client_ip: str) -> str:
+    """
+    Filename the camera ID is derived from. For multipart/form-data uploads it
+    is the first file part's filename; the body is read only up to that part's
+    headers and the reader is kept on request.state for receive_image.
+    Otherwise it comes from the Content-Disposition header.
+    """
+    try:
+        boundary = multipart_boundary(request.headers.get("content-type"))
+        if boundary is not None:
+            reader = MultipartImageReader(request.stream(), boundary)
+            filename = await reader.read_filename()
+            request.state.multipart_reader = reader
+            return filename
+    except (MultipartError, ClientDisconnect) as e:
+        logger.warning("Request from IP=%s has a malformed multipart body: %s", client_ip, e)
+        record_auth_failure()
+        raise HTTPException(status_code=400, detail="Malformed multipart body")
+
+    content_disposition = request.headers.get("content-disposition")
+    if not content_disposition or "filename=" not in content_disposition:
+        logger.warning("Request from IP=%s has a missing or malformed Content-Disposition header.", client_ip)
+        record_auth_failure()
+        raise HTTPException(status_code=400, detail="Missing or malformed Content-Disposition header")
+    return content_disposition.split("filename=")[-1].strip('"')
+
 # -------------------- Main Auth Function --------------------
 async def authenticate_request(
     request: Request,
@@ -239,6 +402,20 @@ async def authenticate_request(
     - Check IP and credentials
     - Return camera record
     """
+    trace = start_trace(request)
+    started = time.perf_counter()
+    try:
+        record = await _authenticate(request, credentials, trace)
+    except HTTPException as e:
+        # Rejected uploads never reach receive_image, so close their trace here
+        trace.stage("auth", started)
+        trace.note("auth_rejected")
+        trace.finish(e.status_code)
+        raise
+    trace.stage("auth", started)
+    return record
+
+async def _authenticate(request: Request, credentials: Optional[HTTPBasicCredentials], trace) -> dict:
     # Ensure we have credentials
     if not CREDENTIAL_CACHE:
         get_data_from_db()
@@ -249,47 +426,37 @@ async def authenticate_request(
     # Extract filename from header to derive camera ID
     client_ip = get_client_ip(request)
     client_proto = get_client_proto(request)
-    content_disposition = request.headers.get("content-disposition")
-    if not content_disposition or "filename=" not in content_disposition:
-        logger.warning(f"Request from IP={client_ip} has a missing or malformed Content-Disposition header.")
-        record_auth_failure()
-        raise HTTPException(status_code=400, detail="Missing or malformed Content-Disposition header")
-    filename = content_disposition.split("filename=")[-1].strip('"')
-    safe_basename = os.path.basename(filename)
-    camera_id_raw = os.path.splitext(safe_basename)[0]
-    camera_id = re.sub(r'[^a-zA-Z0-9_-]', '', camera_id_raw)[:20]
+    filename = await get_upload_filename(request, client_ip)
+    camera_id = camera_id_from_filename(filename)
     if not camera_id:
-        logger.warning(f"Request from IP={client_ip} has an invalid filename")
+        logger.warning("Request from IP=%s has an invalid filename", client_ip)
         record_auth_failure()
         raise HTTPException(status_code=400, detail="Invalid filename format")
 
-    logger.info(f"Request from IP={client_ip} for camera={camera_id} using proto={client_proto}")
+    logger.info("Request from IP=%s for camera=%s using proto=%s", client_ip, camera_id, client_proto)
+    trace.set_camera(camera_id)
 
     # Handle scripted IPs (trusted automation)
-    for scripted_name, ip_patterns in SCRIPTED_IP_MAPPING.items():
-        # Ensure we always have a list, even if one IP is given
-        if isinstance(ip_patterns, str):
-            ip_patterns = [ip_patterns]
-
-        for ip_pattern in ip_patterns:
-            norm_ip = normalize_and_validate_ip(ip_pattern)
-            if norm_ip and check_ip_match(client_ip, norm_ip):
-                logger.info(f"Scripted request detected: {scripted_name}")
-                creds = LOCATION_USER_PASS_MAPPING.get(scripted_name)
-                verify_creds_or_raise(credentials, creds, camera_id)
-                record_ip_success()
-
-                record = get_camera_record_and_validate(camera_id, db_data)
-                return {
-                    **record,
-                    "ID": str(record["ID"]),
-                    "ip_address": client_ip,
-                    "is_scripted": True
-                }
+    scripted_name = find_scripted_source(client_ip)
+    if scripted_name is not None:
+        logger.info("Scripted request detected: %s", scripted_name)
+        creds = LOCATION_USER_PASS_MAPPING.get(scripted_name)
+        verify_creds_or_raise(credentials, creds, camera_id)
+        record_ip_success()
+
+        record = get_camera_record_and_validate(camera_id, db_data)
+        trace.set_camera(camera_id, (record.get("Cam_LocationsRegion") or "").strip())
+        return {
+            **record,
+            "ID": str(record["ID"]),
+            "ip_address": client_ip,
+            "is_scripted": True
+        }
 
     # Handle regular camera request
     record = get_camera_record_and_validate(camera_id, db_data)
     region = record.get("Cam_LocationsRegion", "").strip()
+    trace.set_camera(camera_id, region)
     
     expected_ip = normalize_and_validate_ip((record.get("Cam_MaintenancePublic_IP") or "").strip())
 
@@ -302,4 +469,39 @@ async def authenticate_request(
         "ID": str(record["ID"]),
         "ip_address": client_ip,
         "is_scripted": False
-    }
\ No newline at end of file
+    }
+
+# -------------------- Batch Auth Function --------------------
+async def authenticate_batch_request(
+    request: Request,
+    credentials: Optional[HTTPBasicCredentials] = Depends(security, use_cache=False),
+) -> dict:
+    """
+    Authenticate a batch upload once for the whole request:
+    - Client IP must belong to a scripted source in SCRIPTED_IP_MAPPING
+    - Credentials must match that source
+    Each camera in the batch is checked against the cache as it is read.
+    """
+    if not CREDENTIAL_CACHE:
+        get_data_from_db()
+    db_data = await get_cached_credentials()
+    if not db_data:
+        raise HTTPException(status_code=500, detail="Camera data unavailable.")
+
+    client_ip = get_client_ip(request)
+    scripted_name = find_scripted_source(client_ip)
+    if scripted_name is None:
+        logger.warning("Batch upload from IP=%s which is not a scripted source", client_ip)
+        record_ip_failure()
+        raise HTTPException(status_code=403, detail="Batch uploads are only accepted from scripted sources")
+
+    creds = LOCATION_USER_PASS_MAPPING.get(scripted_name)
+    verify_creds_or_raise(credentials, creds, scripted_name)
+    record_ip_success()
+    logger.info("Batch upload from scripted source %s at IP=%s", scripted_name, client_ip)
+
+    return {
+        "scripted_name": scripted_name,
+        "ip_address": client_ip,
+        "cameras": db_data,
+    }
@@ -0,0 +1,204 @@
+import os
+import re
+import json
+import time
+import asyncio
+import logging
+import ipaddress
+from typing import Callable, Dict, NamedTuple, Optional, Tuple, Union
+
+from prometheus_client import Counter, Gauge
+
+from .config import get_float_env
+
+
+logger = logging.getLogger(__name__)
+
+# Optional file holding LOCATION_USER_PASS_MAPPING and SCRIPTED_IP_MAPPING,
+# such as the mounted vault secrets. When set it is watched and reloaded.
+AUTH_MAPPINGS_FILE = os.getenv("AUTH_MAPPINGS_FILE", "")
+AUTH_MAPPINGS_POLL_SECONDS = get_float_env("AUTH_MAPPINGS_POLL_SECONDS", 10.0)
+
+MAPPING_KEYS = ("LOCATION_USER_PASS_MAPPING", "SCRIPTED_IP_MAPPING")
+# Backslash escapes the shell removes inside double quotes
+DOUBLE_QUOTED_ESCAPE = re.compile(r'\\([\\"$`])')
+
+# -------------------- Prometheus Metrics --------------------
+auth_mappings_reloads_counter = Counter(
+    "auth_mappings_reloads_total",
+    "Count of auth mapping file reloads, by whether the new mappings were applied or rejected",
+    ["result"],
+)
+auth_mappings_loaded_gauge = Gauge("auth_mappings_last_reload_timestamp_seconds", "When auth mappings were last applied from file")
+
+IPNetwork = Union[ipaddress.IPv4Network, ipaddress.IPv6Network]
+ScriptedNetworks = Tuple[Tuple[str, IPNetwork], ...]
+
+
+class AuthMappings(NamedTuple):
+    """Validated credential and scripted IP maps, with the scripted CIDRs parsed once."""
+    locations: Dict[str, dict]
+    scripted: Dict[str, object]
+    scripted_networks: ScriptedNetworks
+
+
+# -------------------- Compilation --------------------
+def parse_ip_pattern(pattern: str) -> IPNetwork:
+    """An IPv4 address or CIDR, optionally with a port, as a network. Raises ValueError."""
+    return ipaddress.IPv4Network(pattern.strip().split(":")[0], strict=False)
+
+
+def compile_scripted_networks(mapping: dict, strict: bool = False) -> ScriptedNetworks:
+    """
+    (name, network) pairs in mapping order. Invalid patterns are skipped, or
+    rejected with ValueError when strict.
+    """
+    networks = []
+    for scripted_name, ip_patterns in mapping.items():
+        # Ensure we always have a list, even if one IP is given
+        if isinstance(ip_patterns, str):
+            ip_patterns = [ip_patterns]
+        if not isinstance(ip_patterns, list):
+            if strict:
+                raise ValueError(f"Scripted source '{scripted_name}' must map to an IP, CIDR or list of them")
+            continue
+        for ip_pattern in ip_patterns:
+            try:
+                networks.append((scripted_name, parse_ip_pattern(str(ip_pattern))))
+            except ValueError:
+                if strict:
+                    raise ValueError(f"Invalid IP or CIDR '{ip_pattern}' for scripted source '{scripted_name}'")
+                logger.warning("Ignoring invalid IP or CIDR '%s' for scripted source '%s'", ip_pattern, scripted_name)
+    return tuple(networks)
+
+
+def validate_locations(mapping: dict):
+    for name, creds in mapping.items():
+        if not isinstance(creds, dict) or not isinstance(creds.get("username"), str) or not isinstance(creds.get("password"), str):
+            raise ValueError(f"Credentials for '{name}' must have a string username and password")
+
+
+def compile_auth_mappings(locations: dict, scripted: dict) -> AuthMappings:
+    """Validate both maps and parse the scripted networks. Raises ValueError on any invalid entry."""
+    if not locations:
+        raise ValueError("LOCATION_USER_PASS_MAPPING is missing or empty")
+    validate_locations(locations)
+    return AuthMappings(locations, scripted, compile_scripted_networks(scripted, strict=True))
+
+
+# -------------------- File Loading --------------------
+def parse_json_mapping(raw: str, name: str) -> dict:
+    """A JSON object, possibly double-encoded as a JSON string. Raises ValueError."""
+    try:
+        parsed = json.loads(raw)
+        if isinstance(parsed, str):
+            parsed = json.loads(parsed)
+    except json.JSONDecodeError as e:
+        raise ValueError(f"{name} is not valid JSON: {e}")
+    if not isinstance(parsed, dict):
+        raise ValueError(f"{name} must be a JSON object")
+    return parsed
+
+
+def parse_env_file(text: str) -> Dict[str, str]:
+    """KEY=VALUE lines as in a sourced secrets.env; `export` prefixes, comments and quotes are allowed."""
+    values = {}
+    for line in text.splitlines():
+        line = line.strip()
+        if not line or line.startswith("#"):
+            continue
+        if line.startswith("export "):
+            line = line[len("export "):].lstrip()
+        key, sep, value = line.partition("=")
+        if not sep:
+            continue
+        value = value.strip()
+        if len(value) >= 2 and value[0] == value[-1] == "'":
+            value = value[1:-1]
+        elif len(value) >= 2 and value[0] == value[-1] == '"':
+            value = DOUBLE_QUOTED_ESCAPE.sub(r"\1", value[1:-1])
+        values[key.strip()] = value
+    return values
+
+
+def read_auth_mappings_file(path: str) -> AuthMappings:
+    """
+    Load and compile the maps from a JSON file with both keys, or from an env
+    file defining them. Raises OSError or ValueError; nothing is applied from
+    a file that fails validation.
+    """
+    with open(path, encoding="utf-8") as f:
+        text = f.read()
+
+    if text.lstrip().startswith("{"):
+        document = parse_json_mapping(text, path)
+        mappings = [document.get(key) or {} for key in MAPPING_KEYS]
+        for key, mapping in zip(MAPPING_KEYS, mappings):
+            if not isinstance(mapping, dict):
+                raise ValueError(f"{key} must be a JSON object")
+    else:
+        values = parse_env_file(text)
+        mappings = [parse_json_mapping(values[key], key) if values.get(key) else {} for key in MAPPING_KEYS]
+
+    return compile_auth_mappings(*mappings)
+
+
+# -------------------- Watcher --------------------
+class AuthMappingsWatcher:
+    """
+    Polls the mappings file and applies new contents once they validate.
+
+    A change is detected from the file's mtime, size and inode, which also
+    catches the symlink swaps used by mounted secrets. Reading and compiling
+    happen in a worker thread; `apply` runs on the event loop, so requests
+    see either the old maps or the new ones.
+    """
+
+    def __init__(self, path: str, interval: float):
+        self.path = path
+        self.interval = interval
+        self._signature = None
+
+    def _stat(self):
+        stat = os.stat(self.path)
+        return stat.st_mtime_ns, stat.st_size, stat.st_ino
+
+    async def check(self, apply: Callable[[AuthMappings], object]) -> bool:
+        """Reload if the file changed. Returns True if new mappings were applied."""
+        try:
+            signature = await asyncio.to_thread(self._stat)
+        except OSError as e:
+            logger.warning("Cannot stat auth mappings file %s: %s", self.path, e)
+            return False
+        if signature == self._signature:
+            return False
+
+        # Remember the signature even if invalid, so a bad file is reported once, not every poll
+        self._signature = signature
+        try:
+            mappings = await asyncio.to_thread(read_auth_mappings_file, self.path)
+        except (OSError, ValueError) as e:
+            auth_mappings_reloads_counter.labels(result="rejected").inc()
+            logger.error("Rejected auth mappings from %s, keeping the current ones: %s", self.path, e)
+            return False
+
+        apply(mappings)
+        auth_mappings_reloads_counter.labels(result="applied").inc()
+        auth_mappings_loaded_gauge.set(time.time())
+        logger.info(
+            "Applied auth mappings from %s: %s credentials, %s scripted networks",
+            self.path, len(mappings.locations), len(mappings.scripted_networks),
+        )
+        return True
+
+    async def run(self, apply: Callable[[AuthMappings], object]):
+        while True:
+            await self.check(apply)
+            await asyncio.sleep(self.interval)
+
+
+def build_auth_mappings_watcher_from_env() -> Optional[AuthMappingsWatcher]:
+    """Create the watcher if AUTH_MAPPINGS_FILE is set."""
+    if not AUTH_MAPPINGS_FILE:
+        return None
+    return AuthMappingsWatcher(AUTH_MAPPINGS_FILE, AUTH_MAPPINGS_POLL_SECONDS)
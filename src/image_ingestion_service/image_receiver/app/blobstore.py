@@ -0,0 +1,141 @@
+import os
+import time
+import uuid
+import asyncio
+import hashlib
+import logging
+from abc import ABC, abstractmethod
+from typing import Optional
+
+from prometheus_client import Counter
+
+from .config import get_bool_env, get_float_env
+
+
+logger = logging.getLogger(__name__)
+
+# -------------------- Prometheus Counters --------------------
+claim_check_bytes_saved_counter = Counter(
+    "claim_check_broker_bytes_saved_total",
+    "Image bytes kept off the broker by publishing a blob reference instead of the body",
+)
+claim_check_failures_counter = Counter(
+    "claim_check_store_failures_total",
+    "Count of blob writes that failed, so the image was published inline instead",
+)
+blobs_purged_counter = Counter(
+    "claim_check_blobs_purged_total",
+    "Count of stored images removed after the retention period",
+)
+
+
+# -------------------- Blob Stores --------------------
+class BlobStore(ABC):
+    """Somewhere to park image bodies so broker messages only carry a reference."""
+
+    @abstractmethod
+    async def put(self, key: str, data: bytes) -> str:
+        """Store `data` under `key` and return a reference consumers can resolve."""
+
+    @abstractmethod
+    async def purge(self, older_than: float) -> int:
+        """Remove blobs written before the `older_than` epoch time. Returns the count removed."""
+
+    async def check_in(self, image_bytes: bytes, camera_id: str, filename: str) -> dict:
+        """Store an upload and return the headers that replace its body on the broker."""
+        digest = await asyncio.to_thread(lambda: hashlib.sha256(image_bytes).hexdigest())
+        ref = await self.put(f"{camera_id}/{digest[:16]}_{filename}", image_bytes)
+        return {
+            "blob_ref": ref,
+            "content_sha256": digest,
+            "content_length": len(image_bytes),
+        }
+
+
+class LocalFilesystemBlobStore(BlobStore):
+    """
+    Stores blobs as files under `root`, which is expected to be a volume the
+    consumers can also read. Writes go to a temporary name first and are
+    renamed into place, so a reference is never published for a partial file.
+    """
+
+    def __init__(self, root: str):
+        self.root = os.path.abspath(root)
+
+    def path_for(self, key: str) -> str:
+        path = os.path.abspath(os.path.join(self.root, key))
+        if not path.startswith(self.root + os.sep):
+            raise ValueError(f"Blob key escapes the store root: {key}")
+        return path
+
+    async def put(self, key: str, data: bytes) -> str:
+        # Imported here because the store is optional and aiofiles is slow to import
+        import aiofiles
+        import aiofiles.os
+
+        path = self.path_for(key)
+        await aiofiles.os.makedirs(os.path.dirname(path), exist_ok=True)
+        temp_path = f"{path}.{uuid.uuid4().hex}.tmp"
+        try:
+            async with aiofiles.open(temp_path, "wb") as handle:
+                await handle.write(data)
+            await aiofiles.os.replace(temp_path, path)
+        except BaseException:
+            try:
+                await aiofiles.os.remove(temp_path)
+            except OSError:
+                pass
+            raise
+        return f"file://{path}"
+
+    async def purge(self, older_than: float) -> int:
+        return await asyncio.to_thread(self._purge, older_than)
+
+    def _purge(self, older_than: float) -> int:
+        removed = 0
+        for directory, _, files in os.walk(self.root, topdown=False):
+            for name in files:
+                path = os.path.join(directory, name)
+                try:
+                    if os.stat(path).st_mtime < older_than:
+                        os.remove(path)
+                        removed += 1
+                except FileNotFoundError:
+                    pass
+            if directory != self.root:
+                try:
+                    os.rmdir(directory)
+                except OSError:
+                    pass
+        return removed
+
+
+# -------------------- Retention --------------------
+async def purge_blobs_periodically(store: BlobStore, retention: float, interval: float):
+    """Background task that drops blobs older than the retention period."""
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            removed = await store.purge(time.time() - retention)
+            if removed:
+                blobs_purged_counter.inc(removed)
+                logger.info("Purged %s stored images older than %ss", removed, retention)
+        except Exception as e:
+            logger.error("Blob retention purge failed: %s", e)
+
+
+def build_blob_store_from_env() -> Optional[BlobStore]:
+    """Enable claim-check publishing if CLAIM_CHECK_ENABLED is set and BLOB_STORE_PATH is given."""
+    if not get_bool_env("CLAIM_CHECK_ENABLED", False):
+        return None
+    path = os.getenv("BLOB_STORE_PATH")
+    if not path:
+        logger.warning("CLAIM_CHECK_ENABLED is set but BLOB_STORE_PATH is not, publishing images inline.")
+        return None
+    logger.info("Claim-check publishing enabled, storing images under %s", path)
+    return LocalFilesystemBlobStore(path)
+
+
+blob_store = build_blob_store_from_env()
+BLOB_RETENTION_SECONDS = get_float_env("BLOB_RETENTION_SECONDS", 3600.0)
+BLOB_PURGE_INTERVAL_SECONDS = get_float_env("BLOB_PURGE_INTERVAL_SECONDS", 300.0)
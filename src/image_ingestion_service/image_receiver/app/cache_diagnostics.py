@@ -0,0 +1,223 @@
+# Diagnostics for the camera credential cache.
+#
+# Loads the cache the way the service does (same query, same row conversion,
+# same dict build) and reports on it as JSON. Run inside the container:
+#
+#   . /vault/secrets/secrets.env && python -m app.cache_diagnostics footprint
+#   . /vault/secrets/secrets.env && python -m app.cache_diagnostics timings --runs 5
+#   . /vault/secrets/secrets.env && python -m app.cache_diagnostics lookup
+#   . /vault/secrets/secrets.env && python -m app.cache_diagnostics dump cams.json
+#   . /vault/secrets/secrets.env && python -m app.cache_diagnostics diff cams.json
+#
+# footprint and lookup accept --snapshot FILE to work from a dump instead of
+# the DB; diff compares two dumps, or a dump against the DB.
+
+import sys
+import json
+import time
+import random
+import argparse
+import statistics
+from datetime import datetime, timezone
+from typing import Dict, Iterable, List, Tuple
+
+from .auth import build_credential_cache, validate_id_and_get_camera_record
+from .db import CAMS_QUERY, get_engine, rows_to_dicts
+
+
+LIVE_DB = "db"
+SAMPLE_IDS = 20
+
+
+# -------------------- Loading --------------------
+def timed_load() -> Tuple[Dict[str, dict], Dict[str, float]]:
+    """Load the cache from the DB, timing each phase in milliseconds."""
+    # Only the DB commands need SQLAlchemy and the ODBC stack; snapshot work does not
+    from sqlalchemy import text
+
+    engine = get_engine()
+    started = time.perf_counter()
+    with engine.connect() as connection:
+        connected = time.perf_counter()
+        raw_rows = connection.execute(text(CAMS_QUERY)).fetchall()
+    fetched = time.perf_counter()
+    rows = rows_to_dicts(raw_rows)
+    materialized = time.perf_counter()
+    cache = build_credential_cache(rows)
+    built = time.perf_counter()
+    return cache, {
+        "connect_ms": (connected - started) * 1000,
+        "query_ms": (fetched - connected) * 1000,
+        "materialize_ms": (materialized - fetched) * 1000,
+        "build_ms": (built - materialized) * 1000,
+        "total_ms": (built - started) * 1000,
+    }
+
+
+def load_snapshot(path: str) -> Dict[str, dict]:
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)["records"]
+
+
+def load_cache(source: str) -> Dict[str, dict]:
+    return timed_load()[0] if source == LIVE_DB else load_snapshot(source)
+
+
+def dump_snapshot(cache: Dict[str, dict], path: str):
+    snapshot = {"taken_at": datetime.now(timezone.utc).isoformat(), "records": cache}
+    with open(path, "w", encoding="utf-8") as f:
+        # default=str covers driver types such as Decimal or datetime
+        json.dump(snapshot, f, default=str, indent=1, sort_keys=True)
+
+
+# -------------------- Footprint --------------------
+def deep_sizeof(obj, seen: set) -> int:
+    """Bytes held by obj and everything it references, counting shared objects once per `seen`."""
+    if id(obj) in seen:
+        return 0
+    seen.add(id(obj))
+    size = sys.getsizeof(obj)
+    if isinstance(obj, dict):
+        size += sum(deep_sizeof(key, seen) + deep_sizeof(value, seen) for key, value in obj.items())
+    elif isinstance(obj, (list, tuple, set, frozenset)):
+        size += sum(deep_sizeof(item, seen) for item in obj)
+    return size
+
+
+def percentile(values: List[float], fraction: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))]
+
+
+def footprint(cache: Dict[str, dict]) -> dict:
+    """Deep size of the whole cache and of each record on its own."""
+    per_record = [deep_sizeof(record, set()) for record in cache.values()]
+    index_bytes = sys.getsizeof(cache) + sum(deep_sizeof(key, set()) for key in cache)
+    total = deep_sizeof(cache, set())
+    report = {"records": len(cache), "total_bytes": total, "index_bytes": index_bytes}
+    if per_record:
+        report["per_record_bytes"] = {
+            "mean": round(statistics.fmean(per_record), 1),
+            "p50": percentile(per_record, 0.5),
+            "p95": percentile(per_record, 0.95),
+            "max": max(per_record),
+        }
+        # Objects shared between records (e.g. repeated region strings) make this less than the sum
+        report["shared_bytes"] = sum(per_record) + index_bytes - total
+    return report
+
+
+# -------------------- Phase Timings --------------------
+def timings(runs: int) -> dict:
+    phases: Dict[str, List[float]] = {}
+    records = 0
+    for _ in range(runs):
+        cache, run = timed_load()
+        records = len(cache)
+        for phase, value in run.items():
+            phases.setdefault(phase, []).append(value)
+    return {
+        "records": records,
+        "runs": runs,
+        "phases": {
+            phase: {"min_ms": round(min(values), 3), "median_ms": round(statistics.median(values), 3)}
+            for phase, values in phases.items()
+        },
+    }
+
+
+# -------------------- Lookup Benchmark --------------------
+def time_lookups(cache: Dict[str, dict], camera_ids: Iterable[str]) -> float:
+    """Nanoseconds per validate_id_and_get_camera_record call, as on the request path."""
+    camera_ids = list(camera_ids)
+    start = time.perf_counter()
+    for camera_id in camera_ids:
+        try:
+            validate_id_and_get_camera_record(cache, camera_id)
+        except ValueError:
+            pass
+    return (time.perf_counter() - start) / len(camera_ids) * 1e9
+
+
+def lookup_benchmark(cache: Dict[str, dict], lookups: int, seed: int = 1) -> dict:
+    rng = random.Random(seed)
+    known = list(cache)
+    report = {"records": len(cache), "lookups": lookups}
+    if known:
+        report["hit_ns"] = round(time_lookups(cache, (rng.choice(known) for _ in range(lookups))), 1)
+    missing = [str(10 ** 9 + index) for index in range(lookups)]
+    report["miss_ns"] = round(time_lookups(cache, missing), 1)
+    return report
+
+
+# -------------------- Snapshot Diff --------------------
+def diff_snapshots(old: Dict[str, dict], new: Dict[str, dict]) -> dict:
+    """Records added, removed and changed between two caches, with the fields that changed."""
+    added = sorted(set(new) - set(old))
+    removed = sorted(set(old) - set(new))
+    changed = []
+    field_changes: Dict[str, int] = {}
+    for camera_id in sorted(set(old) & set(new)):
+        # Compare as text so a dump and a live load of the same data are equal
+        before = {key: str(value) for key, value in old[camera_id].items()}
+        after = {key: str(value) for key, value in new[camera_id].items()}
+        if before == after:
+            continue
+        changed.append(camera_id)
+        for field in before.keys() | after.keys():
+            if before.get(field) != after.get(field):
+                field_changes[field] = field_changes.get(field, 0) + 1
+
+    return {
+        "old_records": len(old),
+        "new_records": len(new),
+        "added": len(added),
+        "removed": len(removed),
+        "changed": len(changed),
+        "churn_ratio": round((len(added) + len(removed) + len(changed)) / max(1, len(old)), 4),
+        "changed_fields": dict(sorted(field_changes.items())),
+        "sample_ids": {"added": added[:SAMPLE_IDS], "removed": removed[:SAMPLE_IDS], "changed": changed[:SAMPLE_IDS]},
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Camera credential cache diagnostics")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    footprint_parser = commands.add_parser("footprint", help="deep memory size of the cache and per record")
+    footprint_parser.add_argument("--snapshot", default=LIVE_DB, help="dump file to load instead of the DB")
+
+    timings_parser = commands.add_parser("timings", help="time the query, row conversion and dict build")
+    timings_parser.add_argument("--runs", type=int, default=3)
+
+    lookup_parser = commands.add_parser("lookup", help="time cache lookups for known and unknown camera IDs")
+    lookup_parser.add_argument("--snapshot", default=LIVE_DB, help="dump file to load instead of the DB")
+    lookup_parser.add_argument("--lookups", type=int, default=100000)
+
+    dump_parser = commands.add_parser("dump", help="save the cache loaded from the DB to a file")
+    dump_parser.add_argument("path")
+
+    diff_parser = commands.add_parser("diff", help="compare two dumps, or a dump against the DB")
+    diff_parser.add_argument("old")
+    diff_parser.add_argument("new", nargs="?", default=LIVE_DB)
+
+    args = parser.parse_args(argv)
+
+    if args.command == "footprint":
+        report = footprint(load_cache(args.snapshot))
+    elif args.command == "timings":
+        report = timings(max(1, args.runs))
+    elif args.command == "lookup":
+        report = lookup_benchmark(load_cache(args.snapshot), max(1, args.lookups))
+    elif args.command == "dump":
+        cache = load_cache(LIVE_DB)
+        dump_snapshot(cache, args.path)
+        report = {"records": len(cache), "path": args.path}
+    else:
+        report = diff_snapshots(load_cache(args.old), load_cache(args.new))
+
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,259 @@
+import time
+import heapq
+import logging
+from array import array
+from collections import OrderedDict
+from typing import Dict, List, Optional
+
+from prometheus_client import Counter, Gauge
+
+from .config import get_bool_env, get_float_env, get_int_env
+
+
+logger = logging.getLogger(__name__)
+
+# Intervals needed before a camera's cadence is trusted enough to call it late
+MIN_INTERVALS = 2
+
+# -------------------- Prometheus Metrics --------------------
+tracked_cameras_gauge = Gauge("camera_tracker_cameras", "Cameras with a slot in the freshness tracker")
+untracked_uploads_counter = Counter(
+    "camera_tracker_untracked_total",
+    "Count of uploads not tracked because the freshness tracker was at capacity",
+)
+
+
+# -------------------- Freshness Tracker --------------------
+class CameraTracker:
+    """
+    Per-camera last-seen time, upload cadence, sizes and failures.
+
+    Each camera gets a slot in flat typed arrays the first time it is seen,
+    up to `max_cameras`, so memory grows to a fixed ceiling of a few hundred
+    bytes per camera. The last `history` inter-arrival intervals and payload
+    sizes are kept in ring buffers inside those arrays; ring positions are
+    derived from the upload count, so they need no storage of their own.
+
+    Two indexes keep the freshness queries proportional to their answer
+    rather than to the number of cameras: an OrderedDict of slots in
+    last-seen order (the stale cameras are at its front) and a heap of
+    "late after" deadlines, one per upload. Superseded deadlines are left in
+    the heap and dropped when they are popped or when they pile up; ones
+    that pass are moved to a dict of overdue cameras until the next upload.
+    """
+
+    def __init__(self, max_cameras: int, history: int = 8, stale_seconds: float = 900.0, late_factor: float = 3.0):
+        self.max_cameras = max(1, max_cameras)
+        self.history = max(MIN_INTERVALS, history)
+        self.stale_seconds = stale_seconds
+        self.late_factor = late_factor
+
+        self._slots: Dict[str, int] = {}
+        self._ids: List[str] = []
+        self._last_seen = array("d")
+        self._uploads = array("Q")
+        self._failures = array("L")
+        self._bytes = array("Q")
+        self._version = array("L")
+        self._expected = array("f")
+        self._intervals = array("f")
+        self._sizes = array("L")
+
+        self._recency: "OrderedDict[int, None]" = OrderedDict()
+        self._deadlines: list = []
+        self._overdue: Dict[int, float] = {}
+
+    def __len__(self) -> int:
+        return len(self._ids)
+
+    def _slot(self, camera_id: str) -> Optional[int]:
+        slot = self._slots.get(camera_id)
+        if slot is not None:
+            return slot
+        if len(self._ids) >= self.max_cameras:
+            untracked_uploads_counter.inc()
+            return None
+
+        slot = len(self._ids)
+        self._slots[camera_id] = slot
+        self._ids.append(camera_id)
+        for column in (self._last_seen, self._uploads, self._failures, self._bytes, self._version, self._expected):
+            column.append(0)
+        self._intervals.extend([0.0] * self.history)
+        self._sizes.extend([0] * self.history)
+        tracked_cameras_gauge.set(len(self._ids))
+        return slot
+
+    def _recent_intervals(self, slot: int) -> List[float]:
+        """Recorded intervals, oldest first."""
+        written = max(0, self._uploads[slot] - 1)
+        base = slot * self.history
+        if written < self.history:
+            return list(self._intervals[base:base + written])
+        oldest = base + written % self.history
+        return list(self._intervals[oldest:base + self.history]) + list(self._intervals[base:oldest])
+
+    def expected_interval(self, slot: int) -> Optional[float]:
+        """Median of the recent inter-arrival intervals, once there are enough of them."""
+        intervals = self._recent_intervals(slot)
+        if len(intervals) < MIN_INTERVALS:
+            return None
+        intervals.sort()
+        return intervals[len(intervals) // 2]
+
+    # -------------------- Recording --------------------
+    def record_upload(self, camera_id: str, size: int, now: Optional[float] = None):
+        slot = self._slot(camera_id)
+        if slot is None:
+            return
+        now = time.time() if now is None else now
+
+        uploads = self._uploads[slot]
+        base = slot * self.history
+        if uploads:
+            self._intervals[base + (uploads - 1) % self.history] = max(0.0, now - self._last_seen[slot])
+        self._sizes[base + uploads % self.history] = min(size, 0xFFFFFFFF)
+        self._uploads[slot] = uploads + 1
+        self._bytes[slot] += size
+        self._last_seen[slot] = now
+
+        self._recency[slot] = None
+        self._recency.move_to_end(slot)
+
+        # Any earlier deadline for this camera is now superseded
+        self._version[slot] = (self._version[slot] + 1) & 0xFFFFFFFF
+        self._overdue.pop(slot, None)
+        # Retiring two passed deadlines per upload keeps the heap from accumulating them between queries
+        self._retire_deadlines(now, limit=2)
+        expected = self.expected_interval(slot)
+        self._expected[slot] = expected or 0.0
+        if expected:
+            heapq.heappush(self._deadlines, (now + self.late_factor * expected, slot, self._version[slot]))
+            if len(self._deadlines) > 2 * len(self._ids) + 64:
+                self._compact_deadlines()
+
+    def record_failure(self, camera_id: str):
+        slot = self._slot(camera_id)
+        if slot is not None:
+            self._failures[slot] += 1
+
+    def _retire_deadlines(self, now: float, limit: Optional[int] = None):
+        """Move deadlines that have passed out of the heap, dropping superseded ones for good."""
+        heap = self._deadlines
+        while heap and heap[0][0] <= now and limit != 0:
+            deadline, slot, version = heapq.heappop(heap)
+            if version == self._version[slot]:
+                self._overdue[slot] = deadline
+            if limit is not None:
+                limit -= 1
+
+    def _compact_deadlines(self):
+        self._deadlines = [entry for entry in self._deadlines if entry[2] == self._version[entry[1]]]
+        heapq.heapify(self._deadlines)
+
+    # -------------------- Queries --------------------
+    def stale(self, now: Optional[float] = None, limit: int = 100) -> dict:
+        """Cameras not seen for stale_seconds, longest silent first."""
+        now = time.time() if now is None else now
+        cutoff = now - self.stale_seconds
+        cameras = []
+        count = 0
+        for slot in self._recency:
+            last_seen = self._last_seen[slot]
+            if last_seen > cutoff:
+                break
+            count += 1
+            if len(cameras) < limit:
+                cameras.append({
+                    "camera_id": self._ids[slot],
+                    "last_seen": round(last_seen, 3),
+                    "seconds_since": round(now - last_seen, 1),
+                })
+        return {"count": count, "cameras": cameras}
+
+    def late(self, now: Optional[float] = None, limit: int = 100) -> dict:
+        """
+        Cameras overdue by late_factor times their usual interval but not yet
+        stale, most overdue first.
+        """
+        now = time.time() if now is None else now
+        cutoff = now - self.stale_seconds
+        self._retire_deadlines(now)
+
+        overdue = []
+        for slot, deadline in list(self._overdue.items()):
+            if self._last_seen[slot] <= cutoff:
+                # Stale now, and reported as such instead
+                del self._overdue[slot]
+            elif deadline <= now:
+                overdue.append((deadline, slot))
+
+        cameras = [
+            {
+                "camera_id": self._ids[slot],
+                "last_seen": round(self._last_seen[slot], 3),
+                "seconds_overdue": round(now - deadline, 1),
+                "expected_interval": round(self._expected[slot], 1),
+            }
+            for deadline, slot in heapq.nsmallest(limit, overdue)
+        ]
+        return {"count": len(overdue), "cameras": cameras}
+
+    def camera_stats(self, camera_id: str, now: Optional[float] = None) -> Optional[dict]:
+        slot = self._slots.get(camera_id)
+        if slot is None:
+            return None
+        now = time.time() if now is None else now
+        uploads = self._uploads[slot]
+        base = slot * self.history
+        sizes = list(self._sizes[base:base + min(uploads, self.history)])
+        expected = self.expected_interval(slot)
+        return {
+            "camera_id": camera_id,
+            "uploads": uploads,
+            "failures": self._failures[slot],
+            "bytes": self._bytes[slot],
+            "last_seen": round(self._last_seen[slot], 3) if uploads else None,
+            "seconds_since": round(now - self._last_seen[slot], 1) if uploads else None,
+            "expected_interval": round(expected, 1) if expected else None,
+            "recent_intervals": [round(interval, 1) for interval in self._recent_intervals(slot)],
+            "recent_mean_bytes": round(sum(sizes) / len(sizes)) if sizes else None,
+        }
+
+    def cadence(self, camera_id: str) -> Optional[float]:
+        """The camera's usual upload interval, once known."""
+        slot = self._slots.get(camera_id)
+        if slot is None or not self._expected[slot]:
+            return None
+        return self._expected[slot]
+
+    def cadences(self):
+        """(camera_id, last_seen, expected_interval) for every camera whose cadence is known."""
+        expected = self._expected
+        for slot, camera_id in enumerate(self._ids):
+            if expected[slot]:
+                yield camera_id, self._last_seen[slot], expected[slot]
+
+    def array_bytes(self) -> int:
+        columns = (
+            self._last_seen, self._uploads, self._failures, self._bytes, self._version, self._expected,
+            self._intervals, self._sizes,
+        )
+        return sum(column.buffer_info()[1] * column.itemsize for column in columns)
+
+
+def build_camera_tracker_from_env() -> Optional[CameraTracker]:
+    """Create the freshness tracker if CAMERA_TRACKER_ENABLED is set."""
+    if not get_bool_env("CAMERA_TRACKER_ENABLED", False):
+        return None
+    tracker = CameraTracker(
+        max_cameras=get_int_env("CAMERA_TRACKER_MAX_CAMERAS", 50000),
+        history=get_int_env("CAMERA_TRACKER_HISTORY", 8),
+        stale_seconds=get_float_env("CAMERA_STALE_SECONDS", 900.0),
+        late_factor=get_float_env("CAMERA_LATE_FACTOR", 3.0),
+    )
+    logger.info("Camera freshness tracking enabled for up to %s cameras", tracker.max_cameras)
+    return tracker
+
+
+camera_tracker = build_camera_tracker_from_env()
@@ -0,0 +1,134 @@
+import asyncio
+import logging
+from typing import Awaitable, Callable, Dict, Optional, Set, Tuple
+
+from prometheus_client import Counter, Gauge
+
+from .config import get_bool_env
+
+
+logger = logging.getLogger(__name__)
+
+# -------------------- Prometheus Metrics --------------------
+superseded_frames_counter = Counter(
+    "coalesced_frames_superseded_total",
+    "Count of frames replaced by a newer frame from the same camera before publishing",
+)
+pending_frames_gauge = Gauge("coalesce_pending_frames", "Frames waiting in the per-camera coalescing buffer")
+
+PublishFn = Callable[[], Awaitable[None]]
+
+
+# -------------------- Latest-Wins Coalescing --------------------
+class _CameraSlot:
+    __slots__ = ("pending", "busy")
+
+    def __init__(self):
+        self.pending: Optional[Tuple[PublishFn, asyncio.Future]] = None
+        self.busy = False
+
+
+class FrameCoalescer:
+    """
+    Per-camera latest-wins buffer in front of the RabbitMQ publish.
+
+    Each camera has at most one publish in flight and one frame waiting behind
+    it. A newer frame that arrives while the older one is still waiting takes
+    its place, so the backlog is bounded to one frame per camera no matter how
+    slow the broker is.
+    """
+
+    def __init__(self):
+        self._slots: Dict[str, _CameraSlot] = {}
+        self._tasks: Set[asyncio.Task] = set()
+        self._pending = 0
+
+    @property
+    def pending_count(self) -> int:
+        return self._pending
+
+    @property
+    def busy_count(self) -> int:
+        return len(self._tasks)
+
+    async def submit(self, camera_id: str, publish: PublishFn) -> bool:
+        """
+        Queue a frame for publishing. Returns True once it has been published,
+        or False if a newer frame for the same camera replaced it first.
+        Publish errors are raised to the caller that owns the frame.
+        """
+        future = asyncio.get_running_loop().create_future()
+        slot = self._slots.get(camera_id)
+        if slot is None:
+            slot = self._slots[camera_id] = _CameraSlot()
+
+        if slot.pending is not None:
+            _, superseded = slot.pending
+            if not superseded.done():
+                superseded.set_result(False)
+            superseded_frames_counter.inc()
+            logger.debug("Superseded queued frame for camera_id=%s", camera_id)
+        else:
+            self._set_pending(self._pending + 1)
+        slot.pending = (publish, future)
+
+        if not slot.busy:
+            slot.busy = True
+            task = asyncio.create_task(self._drain(camera_id, slot))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+        return await future
+
+    async def _drain(self, camera_id: str, slot: _CameraSlot):
+        try:
+            while slot.pending is not None:
+                publish, future = slot.pending
+                slot.pending = None
+                self._set_pending(self._pending - 1)
+                if future.done():
+                    # The uploader went away before its turn came up
+                    continue
+                try:
+                    await publish()
+                except asyncio.CancelledError:
+                    future.cancel()
+                    raise
+                except Exception as e:
+                    if not future.done():
+                        future.set_exception(e)
+                else:
+                    if not future.done():
+                        future.set_result(True)
+        finally:
+            slot.busy = False
+            if slot.pending is not None:
+                # Drain was cancelled with a frame still queued behind it
+                _, future = slot.pending
+                slot.pending = None
+                self._set_pending(self._pending - 1)
+                future.cancel()
+            if self._slots.get(camera_id) is slot and slot.pending is None:
+                del self._slots[camera_id]
+
+    async def wait_idle(self, timeout: float) -> bool:
+        """Wait for queued frames to be published. Returns False if the timeout ran out first."""
+        if not self._tasks:
+            return True
+        _, still_running = await asyncio.wait(set(self._tasks), timeout=max(0.0, timeout))
+        return not still_running
+
+    def _set_pending(self, value: int):
+        self._pending = value
+        pending_frames_gauge.set(value)
+
+
+def build_coalescer_from_env() -> Optional[FrameCoalescer]:
+    """Create the coalescing buffer if PUBLISH_COALESCING_ENABLED is set."""
+    if not get_bool_env("PUBLISH_COALESCING_ENABLED", False):
+        return None
+    logger.info("Latest-wins publish coalescing enabled.")
+    return FrameCoalescer()
+
+
+frame_coalescer = build_coalescer_from_env()
@@ -0,0 +1,124 @@
+import time
+import logging
+from typing import Callable, Optional
+
+from prometheus_client import Counter, Gauge
+
+from .config import get_bool_env, get_float_env, get_int_env
+
+
+logger = logging.getLogger(__name__)
+
+# -------------------- Prometheus Metrics --------------------
+concurrency_limit_gauge = Gauge("ingest_concurrency_limit", "Current adaptive concurrency limit for image uploads")
+inflight_requests_gauge = Gauge("ingest_inflight_requests", "Image uploads currently being processed")
+shed_requests_counter = Counter("ingest_requests_shed_total", "Count of image uploads rejected by the concurrency limiter")
+
+
+# -------------------- Adaptive Concurrency Limiter --------------------
+class AdaptiveConcurrencyLimiter:
+    """
+    AIMD concurrency limiter for the upload path.
+
+    The limit grows by roughly one slot per window of healthy completions and
+    is cut multiplicatively when server-side latency, publish latency or the
+    outcome of a request degrades. Requests over the limit are rejected
+    immediately instead of queueing behind a slow broker.
+    """
+
+    def __init__(
+        self,
+        initial_limit: int = 32,
+        min_limit: int = 4,
+        max_limit: int = 256,
+        latency_target: float = 2.0,
+        publish_latency_target: float = 1.0,
+        backoff_ratio: float = 0.8,
+        decrease_cooldown: float = 1.0,
+        publish_smoothing: float = 0.2,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.min_limit = max(1, min_limit)
+        self.max_limit = max(self.min_limit, max_limit)
+        self.limit = float(min(max(initial_limit, self.min_limit), self.max_limit))
+        self.latency_target = latency_target
+        self.publish_latency_target = publish_latency_target
+        self.backoff_ratio = backoff_ratio
+        self.decrease_cooldown = decrease_cooldown
+        self.publish_smoothing = publish_smoothing
+        self.inflight = 0
+        self.publish_latency = 0.0
+        self._clock = clock
+        self._last_decrease = float("-inf")
+        self._export()
+
+    @property
+    def current_limit(self) -> int:
+        return int(self.limit)
+
+    def try_acquire(self) -> bool:
+        """Take a slot if one is free, otherwise count the request as shed."""
+        if self.inflight >= self.current_limit:
+            shed_requests_counter.inc()
+            return False
+        self.inflight += 1
+        inflight_requests_gauge.set(self.inflight)
+        return True
+
+    def release(self, latency: Optional[float], success: bool = True):
+        """
+        Return a slot and adjust the limit from the observed latency. With no
+        latency (the request was rejected before its body was read) the limit
+        is left as it is: cheap rejections say nothing about capacity.
+        """
+        self.inflight = max(0, self.inflight - 1)
+        inflight_requests_gauge.set(self.inflight)
+        if latency is None:
+            return
+
+        degraded = (
+            not success
+            or latency > self.latency_target
+            or self.publish_latency > self.publish_latency_target
+        )
+        if degraded:
+            self._decrease()
+        elif self.inflight + 1 >= self.limit / 2:
+            # Only grow while the current limit is actually being used
+            self.limit = min(self.max_limit, self.limit + 1.0 / self.limit)
+        self._export()
+
+    def record_publish_latency(self, latency: float):
+        """Fold a RabbitMQ publish duration into the smoothed publish latency."""
+        alpha = self.publish_smoothing
+        self.publish_latency = alpha * latency + (1 - alpha) * self.publish_latency
+
+    def _decrease(self):
+        now = self._clock()
+        if now - self._last_decrease < self.decrease_cooldown:
+            return
+        self._last_decrease = now
+        new_limit = max(self.min_limit, self.limit * self.backoff_ratio)
+        if int(new_limit) < self.current_limit:
+            logger.info("Reducing upload concurrency limit from %s to %s", self.current_limit, int(new_limit))
+        self.limit = new_limit
+
+    def _export(self):
+        concurrency_limit_gauge.set(self.current_limit)
+
+
+def build_limiter_from_env() -> Optional[AdaptiveConcurrencyLimiter]:
+    """Create the upload limiter if INGEST_CONCURRENCY_ENABLED is set, configured by INGEST_CONCURRENCY_*."""
+    if not get_bool_env("INGEST_CONCURRENCY_ENABLED", False):
+        return None
+    logger.info("Adaptive concurrency limiting enabled.")
+    return AdaptiveConcurrencyLimiter(
+        initial_limit=get_int_env("INGEST_CONCURRENCY_INITIAL", 32),
+        min_limit=get_int_env("INGEST_CONCURRENCY_MIN", 4),
+        max_limit=get_int_env("INGEST_CONCURRENCY_MAX", 256),
+        latency_target=get_float_env("INGEST_LATENCY_TARGET_SECONDS", 2.0),
+        publish_latency_target=get_float_env("INGEST_PUBLISH_LATENCY_TARGET_SECONDS", 1.0),
+    )
+
+
+concurrency_limiter = build_limiter_from_env()
@@ -0,0 +1,51 @@
+import os
+import logging
+
+
+logger = logging.getLogger(__name__)
+
+# -------------------- Environment Helpers --------------------
+# Small typed readers for optional tuning knobs. Invalid values are logged
+# and replaced by the default rather than failing startup.
+
+def get_int_env(name: str, default: int) -> int:
+    raw = os.getenv(name)
+    if raw is None or raw.strip() == "":
+        return default
+    try:
+        return int(raw)
+    except ValueError:
+        logger.warning("Invalid integer '%s' for %s, falling back to %s.", raw, name, default)
+        return default
+
+def get_float_env(name: str, default: float) -> float:
+    raw = os.getenv(name)
+    if raw is None or raw.strip() == "":
+        return default
+    try:
+        return float(raw)
+    except ValueError:
+        logger.warning("Invalid number '%s' for %s, falling back to %s.", raw, name, default)
+        return default
+
+def get_bool_env(name: str, default: bool = False) -> bool:
+    raw = os.getenv(name)
+    if raw is None or raw.strip() == "":
+        return default
+    value = raw.strip().lower()
+    if value in ("1", "true", "yes", "on"):
+        return True
+    if value in ("0", "false", "no", "off"):
+        return False
+    logger.warning("Invalid boolean '%s' for %s, falling back to %s.", raw, name, default)
+    return default
+
+def get_choice_env(name: str, choices: tuple, default: str) -> str:
+    raw = os.getenv(name)
+    if raw is None or raw.strip() == "":
+        return default
+    value = raw.strip().lower()
+    if value not in choices:
+        logger.warning("Invalid value '%s' for %s, expected one of %s. Falling back to '%s'.", raw, name, choices, default)
+        return default
+    return value
@@ -1,7 +1,8 @@
 import os
 import logging
-from sqlalchemy import create_engine, text
-from sqlalchemy.engine import URL
+import threading
+
+from .config import get_int_env
 
 
 # Connection settings
@@ -11,38 +12,90 @@ DB_USER = os.getenv("DB_USER")
 DB_PASSWORD = os.getenv("DB_PASSWORD")
 DB_DRIVER = "ODBC Driver 18 for SQL Server"  # Make sure this driver is installed on the container
 
+# Pool and timeout settings. The service only runs the periodic refresh
+# query, so a small pool is enough; the timeouts keep an unreachable or
+# blocked SQL Server from tying up a refresh thread indefinitely.
+DB_POOL_SIZE = get_int_env("DB_POOL_SIZE", 2)
+DB_MAX_OVERFLOW = get_int_env("DB_MAX_OVERFLOW", 0)
+DB_POOL_TIMEOUT_SECONDS = get_int_env("DB_POOL_TIMEOUT_SECONDS", 10)
+DB_POOL_RECYCLE_SECONDS = get_int_env("DB_POOL_RECYCLE_SECONDS", 1800)
+DB_CONNECT_TIMEOUT_SECONDS = get_int_env("DB_CONNECT_TIMEOUT_SECONDS", 10)
+DB_QUERY_TIMEOUT_SECONDS = get_int_env("DB_QUERY_TIMEOUT_SECONDS", 15)
+
 logger = logging.getLogger(__name__)
 
-# Build connection URL
-connection_url = URL.create(
-    "mssql+pyodbc",
-    username=DB_USER,
-    password=DB_PASSWORD,
-    host=DB_SERVER,
-    port=1433,
-    database=DB_NAME,
-    query={
-        "driver": DB_DRIVER,
-        "TrustServerCertificate": "yes",
-        "Encrypt": "yes",
-    }
-)
-
-# Create SQLAlchemy engine
-engine = create_engine(connection_url)
-
-# Query function
+# SQLAlchemy and pyodbc are about a quarter of the service's import time, so
+# they are imported, and the engine created, on first use: the first
+# credential refresh, which runs in a worker thread while the lifespan
+# connects to RabbitMQ, rather than at import before uvicorn can bind.
+_engine = None
+_engine_lock = threading.Lock()
+
+def create_db_engine():
+    from sqlalchemy import create_engine, event
+    from sqlalchemy.engine import URL
+
+    connection_url = URL.create(
+        "mssql+pyodbc",
+        username=DB_USER,
+        password=DB_PASSWORD,
+        host=DB_SERVER,
+        port=1433,
+        database=DB_NAME,
+        query={
+            "driver": DB_DRIVER,
+            "TrustServerCertificate": "yes",
+            "Encrypt": "yes",
+        }
+    )
+    engine = create_engine(
+        connection_url,
+        pool_size=DB_POOL_SIZE,
+        max_overflow=DB_MAX_OVERFLOW,
+        pool_timeout=DB_POOL_TIMEOUT_SECONDS,
+        pool_recycle=DB_POOL_RECYCLE_SECONDS,
+        pool_pre_ping=True,
+        connect_args={"timeout": DB_CONNECT_TIMEOUT_SECONDS},  # pyodbc login timeout
+    )
+    event.listen(engine, "connect", set_query_timeout)
+    return engine
+
+def get_engine():
+    """The shared SQLAlchemy engine, created on first call."""
+    global _engine
+    if _engine is None:
+        with _engine_lock:
+            if _engine is None:
+                _engine = create_db_engine()
+    return _engine
+
+def set_query_timeout(dbapi_connection, connection_record):
+    # pyodbc applies the connection's timeout to every statement run on it
+    dbapi_connection.timeout = DB_QUERY_TIMEOUT_SECONDS
+
+# Camera details used to build the credential cache
+CAMS_QUERY = """
+    SELECT [ID], [Cam_InternetFTP_Folder], [Cam_InternetFTP_Filename],
+           [Cam_LocationsRegion], [Cam_MaintenancePublic_IP]
+    FROM [Cams]
+"""
+
+# Query functions
+def rows_to_dicts(rows):
+    return [dict(row._mapping) for row in rows]
+
+def fetch_all_from_db():
+    """Camera rows from the DB. Raises on connection, timeout or query errors."""
+    from sqlalchemy import text
+
+    with get_engine().connect() as connection:
+        result = connection.execute(text(CAMS_QUERY))
+        return rows_to_dicts(result)
+
 def get_all_from_db():
-    sql_statement = """
-        SELECT [ID], [Cam_InternetFTP_Folder], [Cam_InternetFTP_Filename],
-               [Cam_LocationsRegion], [Cam_MaintenancePublic_IP]
-        FROM [Cams]
-    """
-    with engine.connect() as connection:
-        try:
-            result = connection.execute(text(sql_statement))
-            rows = [dict(row._mapping) for row in result]
-            return rows
-        except Exception as e:
-            logger.error(f"Failed to connect to the database: {e}")
-                 
\ No newline at end of file
+    """Like fetch_all_from_db, but logs errors and returns None."""
+    try:
+        return fetch_all_from_db()
+    except Exception as e:
+        logger.error("Failed to connect to the database: %s", e)
+        return None
@@ -0,0 +1,117 @@
+import time
+import zlib
+import logging
+from collections import OrderedDict
+from typing import Callable, Optional
+
+from prometheus_client import Counter
+
+from .config import get_float_env, get_int_env
+
+
+logger = logging.getLogger(__name__)
+
+# -------------------- Prometheus Counters --------------------
+duplicate_frames_counter = Counter(
+    "duplicate_frames_suppressed_total",
+    "Count of uploads skipped because they repeat a recently published frame",
+    ["region"],
+)
+
+
+# -------------------- Streaming Digest --------------------
+class FrameDigest:
+    """
+    Incremental, non-cryptographic fingerprint of an upload body.
+
+    CRC-32 and Adler-32 are updated chunk by chunk while the body streams in
+    and combined with the length into a single integer. This is only used to
+    spot byte-identical re-sends from the same camera, not for integrity.
+    """
+
+    __slots__ = ("_crc", "_adler", "_length")
+
+    def __init__(self):
+        self._crc = 0
+        self._adler = 1
+        self._length = 0
+
+    def update(self, chunk: bytes):
+        self._crc = zlib.crc32(chunk, self._crc)
+        self._adler = zlib.adler32(chunk, self._adler)
+        self._length += len(chunk)
+
+    def digest(self) -> int:
+        return (self._length << 64) | (self._crc << 32) | self._adler
+
+
+# -------------------- Recent Digest Cache --------------------
+class DuplicateFrameCache:
+    """
+    Bounded per-camera history of recently published frame digests.
+
+    Each camera keeps at most `history` digests and at most `max_cameras`
+    cameras are tracked, least recently used first out. A digest counts as a
+    duplicate only while it is younger than `window` seconds, so a camera that
+    is stuck on one frame still gets it through once per window.
+    """
+
+    def __init__(
+        self,
+        window: float,
+        history: int = 4,
+        max_cameras: int = 50000,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.window = window
+        self.history = max(1, history)
+        self.max_cameras = max(1, max_cameras)
+        self._clock = clock
+        # camera_id -> [(digest, published_at), ...]
+        self._cameras: "OrderedDict[str, list]" = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._cameras)
+
+    def is_duplicate(self, camera_id: str, digest: int, region: str = "") -> bool:
+        entries = self._cameras.get(camera_id)
+        if not entries:
+            return False
+        cutoff = self._clock() - self.window
+        for seen_digest, published_at in entries:
+            if seen_digest == digest and published_at >= cutoff:
+                duplicate_frames_counter.labels(region=region or "unknown").inc()
+                return True
+        return False
+
+    def remember(self, camera_id: str, digest: int):
+        """Record a digest once its frame has actually been published."""
+        now = self._clock()
+        cutoff = now - self.window
+        entries = self._cameras.get(camera_id)
+        if entries is None:
+            entries = self._cameras[camera_id] = []
+            if len(self._cameras) > self.max_cameras:
+                self._cameras.popitem(last=False)
+        else:
+            self._cameras.move_to_end(camera_id)
+            entries[:] = [entry for entry in entries if entry[0] != digest and entry[1] >= cutoff]
+        entries.append((digest, now))
+        if len(entries) > self.history:
+            del entries[0]
+
+
+def build_duplicate_cache_from_env() -> Optional[DuplicateFrameCache]:
+    """Create the digest cache if DUPLICATE_SUPPRESSION_WINDOW_SECONDS is positive."""
+    window = get_float_env("DUPLICATE_SUPPRESSION_WINDOW_SECONDS", 0.0)
+    if window <= 0:
+        return None
+    logger.info("Duplicate frame suppression enabled with a %ss window.", window)
+    return DuplicateFrameCache(
+        window,
+        history=get_int_env("DUPLICATE_SUPPRESSION_HISTORY", 4),
+        max_cameras=get_int_env("DUPLICATE_SUPPRESSION_MAX_CAMERAS", 50000),
+    )
+
+
+duplicate_cache = build_duplicate_cache_from_env()
@@ -0,0 +1,97 @@
+import logging
+from io import BytesIO
+from typing import List, NamedTuple, Optional, Tuple
+
+from PIL import Image
+from prometheus_client import Counter
+
+
+logger = logging.getLogger(__name__)
+
+# -------------------- Prometheus Counters --------------------
+derivatives_generated_counter = Counter(
+    "image_derivatives_generated_total",
+    "Count of derivative images generated and published",
+    ["derivative"],
+)
+derivatives_failed_counter = Counter(
+    "image_derivatives_failed_total",
+    "Count of uploads whose derivatives could not be generated or published",
+)
+
+
+class DerivativeSpec(NamedTuple):
+    name: str
+    width: int
+    height: int
+    quality: int
+
+
+# -------------------- Rendering (runs in worker processes) --------------------
+def render_derivatives(image_bytes: bytes, specs: List[DerivativeSpec]) -> List[Tuple[str, bytes, int, int]]:
+    """
+    Returns (name, jpeg_bytes, width, height) for each spec, fitting the frame
+    inside width x height with its aspect ratio kept.
+
+    The frame is decoded once in JPEG draft mode, which lets libjpeg scale by
+    1/2, 1/4 or 1/8 during the DCT so a 1080p frame is never fully decoded
+    for a thumbnail. Smaller variants are resized from that decoded image.
+    """
+    largest = max(specs, key=lambda spec: spec.width * spec.height)
+    results = []
+    with Image.open(BytesIO(image_bytes)) as img:
+        img.draft("RGB", (largest.width, largest.height))
+        decoded = img.convert("RGB")
+
+    for spec in sorted(specs, key=lambda spec: spec.width * spec.height, reverse=True):
+        variant = decoded.copy()
+        variant.thumbnail((spec.width, spec.height), Image.Resampling.LANCZOS, reducing_gap=2.0)
+        buffer = BytesIO()
+        variant.save(buffer, format="JPEG", quality=spec.quality, optimize=True)
+        results.append((spec.name, buffer.getvalue(), variant.width, variant.height))
+    return results
+
+
+# -------------------- Configuration --------------------
+def parse_derivative_specs(mapping: dict) -> List[DerivativeSpec]:
+    """
+    Parse {"thumbnail": {"width": 160, "height": 120, "quality": 70}, ...}.
+    Invalid entries are logged and skipped.
+    """
+    specs = []
+    for name, options in mapping.items():
+        try:
+            spec = DerivativeSpec(
+                str(name),
+                int(options["width"]),
+                int(options["height"]),
+                int(options.get("quality", 80)),
+            )
+        except (KeyError, TypeError, ValueError, AttributeError):
+            logger.warning("Ignoring invalid derivative '%s': %s", name, options)
+            continue
+        if spec.width <= 0 or spec.height <= 0 or not 1 <= spec.quality <= 95:
+            logger.warning("Ignoring derivative '%s' with out of range size or quality: %s", name, options)
+            continue
+        specs.append(spec)
+    return specs
+
+
+def build_derivative_specs_from_env() -> Optional[List[DerivativeSpec]]:
+    """Derivatives are generated only if IMAGE_DERIVATIVES configures at least one size."""
+    # Imported here so worker processes, which only need render_derivatives, stay light
+    from .auth import load_mapping_from_env
+
+    specs = parse_derivative_specs(load_mapping_from_env("IMAGE_DERIVATIVES"))
+    if not specs:
+        return None
+    logger.info("Image derivatives enabled: %s", ", ".join(spec.name for spec in specs))
+    return specs
+
+
+def derivative_filename(filename: str, name: str) -> str:
+    """'123_20250819T142345Z.jpg' -> '123_20250819T142345Z_thumbnail.jpg'"""
+    stem, dot, extension = filename.rpartition(".")
+    if not dot:
+        return f"{filename}_{name}"
+    return f"{stem}_{name}.{extension}"
@@ -0,0 +1,234 @@
+import logging
+from typing import Optional
+
+from .config import get_bool_env
+
+
+logger = logging.getLogger(__name__)
+
+JPEG_METADATA_HEADERS = get_bool_env("JPEG_METADATA_HEADERS", False)
+
+# Start-of-frame markers that carry dimensions (C4 is DHT, C8 is reserved, CC is DAC)
+SOF_MARKERS = frozenset(range(0xC0, 0xD0)) - {0xC4, 0xC8, 0xCC}
+PROGRESSIVE_SOF_MARKERS = frozenset({0xC2, 0xC6, 0xCA, 0xCE})
+# Markers with no length field
+STANDALONE_MARKERS = frozenset({0x01, *range(0xD0, 0xD8)})
+
+# IJG standard luminance quantization table (any order; only its sum is used)
+STANDARD_LUMINANCE_TABLE_SUM = sum((
+    16, 11, 10, 16, 24, 40, 51, 61, 12, 12, 14, 19, 26, 58, 60, 55,
+    14, 13, 16, 24, 40, 57, 69, 56, 14, 17, 22, 29, 51, 87, 80, 62,
+    18, 22, 37, 56, 68, 109, 103, 77, 24, 35, 55, 64, 81, 104, 113, 92,
+    49, 64, 78, 87, 103, 121, 120, 101, 72, 92, 95, 98, 112, 100, 103, 99,
+))
+
+EXIF_IFD_POINTER_TAG = 0x8769
+DATETIME_ORIGINAL_TAG = 0x9003
+
+
+# -------------------- EXIF --------------------
+def exif_datetime_original(payload: bytes) -> Optional[str]:
+    """
+    DateTimeOriginal from an APP1 payload (starting at "Exif\\0\\0"), as
+    "YYYY-MM-DDTHH:MM:SS", or None if absent or malformed.
+    """
+    if not payload.startswith(b"Exif\x00\x00"):
+        return None
+    tiff = memoryview(payload)[6:]
+    if len(tiff) < 8:
+        return None
+    order = bytes(tiff[:2])
+    if order == b"II":
+        endian = "little"
+    elif order == b"MM":
+        endian = "big"
+    else:
+        return None
+
+    def u16(offset):
+        return int.from_bytes(tiff[offset:offset + 2], endian)
+
+    def u32(offset):
+        return int.from_bytes(tiff[offset:offset + 4], endian)
+
+    def find_tag(ifd_offset, tag):
+        if ifd_offset + 2 > len(tiff):
+            return None
+        count = u16(ifd_offset)
+        for index in range(count):
+            entry = ifd_offset + 2 + index * 12
+            if entry + 12 > len(tiff):
+                return None
+            if u16(entry) == tag:
+                return entry
+        return None
+
+    entry = find_tag(u32(4), EXIF_IFD_POINTER_TAG)
+    if entry is None:
+        return None
+    entry = find_tag(u32(entry + 8), DATETIME_ORIGINAL_TAG)
+    if entry is None:
+        return None
+
+    count = u32(entry + 4)
+    start = entry + 8 if count <= 4 else u32(entry + 8)
+    raw = bytes(tiff[start:start + count]).rstrip(b"\x00 ")
+    # "YYYY:MM:DD HH:MM:SS"
+    if len(raw) != 19 or raw[4:5] != b":" or raw[10:11] != b" ":
+        return None
+    text = raw.decode("ascii", "replace")
+    return f"{text[0:4]}-{text[5:7]}-{text[8:10]}T{text[11:]}"
+
+
+# -------------------- Incremental Marker Parser --------------------
+class JpegMetadataParser:
+    """
+    Reads JPEG header metadata from a body as it streams in, without decoding.
+
+    Walks the marker segments up to start-of-scan: SOFn for dimensions,
+    component count and progressive/baseline, DQT for an estimate of the
+    encoder quality, and APP1 for EXIF DateTimeOriginal. Other segments are
+    skipped by length without being buffered, and everything after SOS is
+    ignored, so the cost does not depend on the image size.
+    """
+
+    __slots__ = ("_buffer", "_skip", "_started", "done", "width", "height", "components",
+                 "progressive", "quality", "datetime_original")
+
+    def __init__(self):
+        self._buffer = bytearray()
+        self._skip = 0
+        self._started = False
+        self.done = False
+        self.width: Optional[int] = None
+        self.height: Optional[int] = None
+        self.components: Optional[int] = None
+        self.progressive: Optional[bool] = None
+        self.quality: Optional[int] = None
+        self.datetime_original: Optional[str] = None
+
+    def feed(self, chunk: bytes):
+        if self.done:
+            return
+        if self._skip:
+            skipped = min(self._skip, len(chunk))
+            self._skip -= skipped
+            if skipped == len(chunk):
+                return
+            chunk = chunk[skipped:]
+        # Parse in place; only a segment split across chunks is carried over
+        if self._buffer:
+            self._buffer += chunk
+            data = self._buffer
+        else:
+            data = chunk
+        position = self._parse(data)
+        self._buffer = bytearray() if self.done else bytearray(data[position:])
+
+    def _finish(self):
+        self.done = True
+        self._skip = 0
+
+    def _parse(self, data) -> int:
+        """Consume whole segments from data and return the offset of the first unconsumed byte."""
+        position = 0
+        end = len(data)
+        if not self._started:
+            if end < 2:
+                return 0
+            if data[0] != 0xFF or data[1] != 0xD8:
+                self._finish()
+                return end
+            self._started = True
+            position = 2
+
+        while True:
+            if end - position < 2:
+                return position
+            if data[position] != 0xFF:
+                # Not at a marker: corrupt header
+                self._finish()
+                return end
+            marker = data[position + 1]
+            if marker == 0xFF:
+                # Fill byte before a marker
+                position += 1
+                continue
+
+            if marker in STANDALONE_MARKERS:
+                position += 2
+                continue
+            if marker in (0xDA, 0xD9):  # SOS or EOI: no more header metadata
+                self._finish()
+                return end
+            if end - position < 4:
+                return position
+            length = (data[position + 2] << 8) | data[position + 3]
+            if length < 2:
+                self._finish()
+                return end
+            segment_end = position + 2 + length
+
+            if marker in SOF_MARKERS or marker == 0xDB or (marker == 0xE1 and self.datetime_original is None):
+                if end < segment_end:
+                    return position
+                segment = bytes(data[position + 4:segment_end])
+                position = segment_end
+                if marker == 0xDB:
+                    self._read_quantization(segment)
+                elif marker == 0xE1:
+                    self.datetime_original = exif_datetime_original(segment)
+                else:
+                    self._read_frame(marker, segment)
+                continue
+
+            # Any other segment: skip it, including any part not received yet
+            if end >= segment_end:
+                position = segment_end
+                continue
+            self._skip = segment_end - end
+            return end
+
+    def _read_frame(self, marker: int, segment: bytes):
+        if len(segment) < 6:
+            return
+        self.height = (segment[1] << 8) | segment[2]
+        self.width = (segment[3] << 8) | segment[4]
+        self.components = segment[5]
+        self.progressive = marker in PROGRESSIVE_SOF_MARKERS
+
+    def _read_quantization(self, segment: bytes):
+        # Estimate IJG quality from table 0 (luminance), the first table written by most encoders
+        offset = 0
+        while offset < len(segment) and self.quality is None:
+            precision, table_id = segment[offset] >> 4, segment[offset] & 0x0F
+            size = 128 if precision else 64
+            values = segment[offset + 1:offset + 1 + size]
+            offset += 1 + size
+            if len(values) < size:
+                return
+            if table_id != 0:
+                continue
+            total = sum(int.from_bytes(values[i:i + 2], "big") for i in range(0, 128, 2)) if precision else sum(values)
+            scale = total * 100 / STANDARD_LUMINANCE_TABLE_SUM
+            quality = 5000 / scale if scale > 100 else (200 - scale) / 2
+            self.quality = max(1, min(100, round(quality)))
+
+    def as_headers(self) -> dict:
+        """AMQP headers for whatever was found; empty if the header could not be read."""
+        headers = {}
+        if self.width is not None:
+            headers["image_width"] = self.width
+            headers["image_height"] = self.height
+            headers["image_components"] = self.components
+            headers["image_progressive"] = self.progressive
+        if self.quality is not None:
+            headers["image_quality_estimate"] = self.quality
+        if self.datetime_original is not None:
+            headers["exif_datetime_original"] = self.datetime_original
+        return headers
+
+
+def new_metadata_parser() -> Optional[JpegMetadataParser]:
+    """A parser per upload when JPEG_METADATA_HEADERS is enabled, otherwise None."""
+    return JpegMetadataParser() if JPEG_METADATA_HEADERS else None
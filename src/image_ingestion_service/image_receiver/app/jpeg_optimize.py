@@ -0,0 +1,163 @@
+import os
+import time
+import shutil
+import logging
+import resource
+import subprocess
+from typing import FrozenSet, NamedTuple, Optional, Tuple
+
+from prometheus_client import Counter
+
+from .config import get_bool_env, get_float_env
+
+
+logger = logging.getLogger(__name__)
+
+# JFIF, EXIF (its Orientation tag decides how viewers rotate the image), ICC
+# profile and Adobe (needed to decode the colour transform correctly)
+DEFAULT_KEEP_MARKERS = "APP0,APP1,APP2,APP14"
+COM_MARKER = 0xFE
+# Markers with no length field
+STANDALONE_MARKERS = frozenset({0x01, *range(0xD0, 0xD8)})
+
+# -------------------- Prometheus Counters --------------------
+optimize_results_counter = Counter(
+    "jpeg_optimize_results_total",
+    "Count of uploads by lossless optimization outcome: applied, below_threshold, failed or skipped",
+    ["region", "result"],
+)
+optimize_bytes_saved_counter = Counter(
+    "jpeg_optimize_bytes_saved_total",
+    "Bytes removed from published images by lossless optimization",
+    ["region"],
+)
+optimize_cpu_counter = Counter(
+    "jpeg_optimize_cpu_seconds_total",
+    "CPU seconds spent on lossless optimization, including the jpegtran process",
+    ["region"],
+)
+
+
+# -------------------- Marker Stripping --------------------
+def parse_marker_names(names: str) -> FrozenSet[int]:
+    """'APP0,APP2,COM' -> marker codes. Unknown names are logged and ignored."""
+    markers = set()
+    for name in (part.strip().upper() for part in names.split(",")):
+        if not name:
+            continue
+        if name == "COM":
+            markers.add(COM_MARKER)
+        elif name.startswith("APP") and name[3:].isdigit() and 0 <= int(name[3:]) <= 15:
+            markers.add(0xE0 + int(name[3:]))
+        else:
+            logger.warning("Ignoring unknown JPEG marker name '%s'", name)
+    return frozenset(markers)
+
+
+def strip_metadata(data: bytes, keep: FrozenSet[int]) -> bytes:
+    """
+    Drop APPn and COM segments not in `keep`, copying every other segment and
+    the entropy-coded data after SOS byte for byte. Returns `data` unchanged
+    if the header can't be walked.
+    """
+    if data[:2] != b"\xff\xd8":
+        return data
+    out = bytearray(b"\xff\xd8")
+    position = 2
+    end = len(data)
+    while position + 4 <= end:
+        if data[position] != 0xFF:
+            return data
+        marker = data[position + 1]
+        if marker == 0xFF:
+            position += 1
+            continue
+        if marker in STANDALONE_MARKERS:
+            out += data[position:position + 2]
+            position += 2
+            continue
+        if marker == 0xDA:
+            out += data[position:]
+            return bytes(out)
+        length = (data[position + 2] << 8) | data[position + 3]
+        segment_end = position + 2 + length
+        if length < 2 or segment_end > end:
+            return data
+        if not (0xE0 <= marker <= 0xEF or marker == COM_MARKER) or marker in keep:
+            out += data[position:segment_end]
+        position = segment_end
+    return data
+
+
+# -------------------- Optimization (runs in worker processes) --------------------
+def optimize_jpeg(data: bytes, keep: FrozenSet[int], jpegtran: Optional[str], timeout: float) -> Tuple[bytes, float]:
+    """
+    Returns (optimized_bytes, cpu_seconds). Metadata is stripped at marker
+    level, then jpegtran rewrites the Huffman tables from the image's own
+    statistics. Coefficients are copied, never decoded to pixels, so the
+    result decodes to exactly the same image.
+    """
+    cpu_start = time.process_time()
+    children_start = resource.getrusage(resource.RUSAGE_CHILDREN)
+    optimized = strip_metadata(data, keep)
+    if jpegtran:
+        completed = subprocess.run(
+            [jpegtran, "-optimize", "-copy", "all"],
+            input=optimized,
+            capture_output=True,
+            timeout=timeout,
+            check=True,
+        )
+        optimized = completed.stdout
+    children = resource.getrusage(resource.RUSAGE_CHILDREN)
+    cpu_seconds = (
+        time.process_time() - cpu_start
+        + children.ru_utime - children_start.ru_utime
+        + children.ru_stime - children_start.ru_stime
+    )
+    return optimized, cpu_seconds
+
+
+# -------------------- Configuration --------------------
+class JpegOptimizer(NamedTuple):
+    keep_markers: FrozenSet[int]
+    jpegtran: Optional[str]
+    min_savings_percent: float
+    timeout: float
+
+
+def accept_optimized(original: bytes, optimized: bytes, cpu_seconds: float, region: str, min_savings_percent: float) -> bytes:
+    """The optimized image if it saves at least min_savings_percent of the original, else the original."""
+    region = region or "unknown"
+    optimize_cpu_counter.labels(region=region).inc(cpu_seconds)
+    saved = len(original) - len(optimized)
+    if not optimized or saved * 100 < len(original) * min_savings_percent:
+        optimize_results_counter.labels(region=region, result="below_threshold").inc()
+        return original
+    optimize_results_counter.labels(region=region, result="applied").inc()
+    optimize_bytes_saved_counter.labels(region=region).inc(saved)
+    return optimized
+
+
+def record_optimize_skipped(region: str, result: str):
+    optimize_results_counter.labels(region=region or "unknown", result=result).inc()
+
+
+def build_jpeg_optimizer_from_env() -> Optional[JpegOptimizer]:
+    """Lossless optimization runs only if JPEG_OPTIMIZE_ENABLED is set."""
+    if not get_bool_env("JPEG_OPTIMIZE_ENABLED", False):
+        return None
+    keep = os.getenv("JPEG_OPTIMIZE_KEEP_MARKERS", DEFAULT_KEEP_MARKERS)
+    optimizer = JpegOptimizer(
+        keep_markers=parse_marker_names(keep),
+        jpegtran=shutil.which(os.getenv("JPEGTRAN_PATH", "jpegtran")),
+        min_savings_percent=get_float_env("JPEG_OPTIMIZE_MIN_SAVINGS_PERCENT", 2.0),
+        timeout=get_float_env("JPEG_OPTIMIZE_TIMEOUT_SECONDS", 5.0),
+    )
+    if optimizer.jpegtran is None:
+        logger.warning("jpegtran not found, JPEG optimization will only strip metadata")
+    logger.info("Lossless JPEG optimization enabled, keeping %s", keep or "no metadata")
+    return optimizer
+
+
+jpeg_optimizer = build_jpeg_optimizer_from_env()
@@ -0,0 +1,103 @@
+import os
+import signal
+import asyncio
+import logging
+import threading
+from typing import Optional
+
+from prometheus_client import Counter, Gauge
+
+from .config import get_float_env
+
+
+logger = logging.getLogger(__name__)
+
+SHUTDOWN_DRAIN_TIMEOUT_SECONDS = get_float_env("SHUTDOWN_DRAIN_TIMEOUT_SECONDS", 20.0)
+
+# -------------------- Prometheus Metrics --------------------
+uploads_in_flight_gauge = Gauge("uploads_in_flight", "Upload requests admitted and not yet answered")
+draining_gauge = Gauge("shutdown_draining", "1 once the service has stopped admitting uploads for shutdown")
+rejected_draining_counter = Counter("uploads_rejected_draining_total", "Count of uploads refused with 503 while shutting down")
+
+
+# -------------------- Admission Gate --------------------
+class AdmissionGate:
+    """
+    Counts uploads in flight and stops admitting new ones once draining.
+
+    `begin_drain` only sets a flag, so it is safe to call from a signal
+    handler; `wait_idle` then lets shutdown wait for the uploads already
+    admitted, including their publishes, before the broker is closed.
+    """
+
+    def __init__(self):
+        self.draining = False
+        self.in_flight = 0
+        self._idle: Optional[asyncio.Event] = None
+
+    def reset(self):
+        self.draining = False
+        self._idle = None
+        draining_gauge.set(0)
+
+    def try_enter(self) -> bool:
+        if self.draining:
+            rejected_draining_counter.inc()
+            return False
+        self.in_flight += 1
+        uploads_in_flight_gauge.inc()
+        return True
+
+    def leave(self):
+        self.in_flight -= 1
+        uploads_in_flight_gauge.dec()
+        if self.in_flight == 0 and self._idle is not None:
+            self._idle.set()
+
+    def begin_drain(self):
+        self.draining = True
+        draining_gauge.set(1)
+
+    async def wait_idle(self, timeout: float) -> bool:
+        """Wait until no uploads are in flight. Returns False if the timeout ran out first."""
+        if self.in_flight == 0:
+            return True
+        self._idle = asyncio.Event()
+        try:
+            await asyncio.wait_for(self._idle.wait(), max(0.0, timeout))
+            return True
+        except asyncio.TimeoutError:
+            return False
+
+
+# -------------------- SIGTERM --------------------
+def install_sigterm_handler(gate: AdmissionGate):
+    """
+    Stop admitting uploads as soon as SIGTERM arrives, then pass the signal on
+    to the handler that was installed before (uvicorn's, which starts its
+    graceful shutdown). Returns the previous handler so it can be restored,
+    or None if handlers can't be installed from this thread.
+    """
+    if threading.current_thread() is not threading.main_thread():
+        return None
+    previous = signal.getsignal(signal.SIGTERM)
+
+    def handle_sigterm(signum, frame):
+        gate.begin_drain()
+        if callable(previous):
+            previous(signum, frame)
+        elif previous == signal.SIG_DFL:
+            # Nothing to chain to: terminate as the default action would
+            signal.signal(signal.SIGTERM, signal.SIG_DFL)
+            os.kill(os.getpid(), signal.SIGTERM)
+
+    signal.signal(signal.SIGTERM, handle_sigterm)
+    return previous
+
+
+def restore_sigterm_handler(previous):
+    if previous is not None and threading.current_thread() is threading.main_thread():
+        signal.signal(signal.SIGTERM, previous)
+
+
+admission_gate = AdmissionGate()
@@ -0,0 +1,210 @@
+import os
+import sys
+import json
+import time
+import queue
+import atexit
+import logging
+import logging.handlers
+from collections import OrderedDict
+from contextvars import ContextVar
+from datetime import datetime, timezone
+from typing import Callable, Optional, Tuple
+
+from prometheus_client import Counter
+
+from .config import get_choice_env, get_float_env, get_int_env
+
+
+# -------------------- Prometheus Counters --------------------
+log_records_dropped_counter = Counter("log_records_dropped_total", "Count of log records dropped because the log queue was full")
+log_records_suppressed_counter = Counter(
+    "log_records_suppressed_total",
+    "Count of log records suppressed by the per-message rate limit",
+    ["level"],
+)
+
+
+# -------------------- Request ID Context for Logging --------------------
+
+# A context variable used to store the request ID per request.
+request_id_ctx_var: ContextVar[str] = ContextVar("request_id", default=None)
+
+# Retrieve the current request ID or fallback to "N/A"
+def get_request_id() -> str:
+    return request_id_ctx_var.get() or "N/A"
+
+
+# -------------------- Filters --------------------
+
+# Custom logging filter that injects the request ID into every log record
+class RequestIdLogFilter(logging.Filter):
+    def filter(self, record):
+        record.request_id = get_request_id()
+        return True
+
+
+class MessageRateLimitFilter(logging.Filter):
+    """
+    Per-message-type token bucket for hot-path INFO and WARNING lines.
+
+    The message type is the logger name plus the unformatted message template,
+    so every "Pushed to RabbitMQ for camera_id=%s ..." line shares one bucket
+    regardless of the camera. ERROR and above always pass. The first record
+    let through after a suppression carries the number of records dropped in
+    between as `record.suppressed`. At most `max_buckets` message types are
+    tracked; the least recently logged one is forgotten to make room.
+    """
+
+    def __init__(
+        self,
+        rate: float,
+        burst: float,
+        logger_prefix: str = "app",
+        max_level: int = logging.WARNING,
+        max_buckets: int = 1024,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        super().__init__()
+        self.rate = rate
+        self.burst = max(1.0, burst)
+        self.logger_prefix = logger_prefix
+        self.max_level = max_level
+        self.max_buckets = max(1, max_buckets)
+        self._clock = clock
+        # (logger, template) -> [tokens, updated, suppressed], least recently logged first
+        self._buckets: "OrderedDict[Tuple[str, str], list]" = OrderedDict()
+
+    def filter(self, record):
+        if record.levelno > self.max_level or not record.name.startswith(self.logger_prefix):
+            return True
+
+        now = self._clock()
+        key = (record.name, str(record.msg))
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            bucket = self._buckets[key] = [self.burst, now, 0]
+            if len(self._buckets) > self.max_buckets:
+                self._buckets.popitem(last=False)
+        else:
+            self._buckets.move_to_end(key)
+            bucket[0] = min(self.burst, bucket[0] + (now - bucket[1]) * self.rate)
+            bucket[1] = now
+
+        if bucket[0] < 1:
+            bucket[2] += 1
+            log_records_suppressed_counter.labels(level=record.levelname).inc()
+            return False
+
+        bucket[0] -= 1
+        if bucket[2]:
+            record.suppressed = bucket[2]
+            bucket[2] = 0
+        return True
+
+
+# -------------------- Formatters --------------------
+
+class TextLogFormatter(logging.Formatter):
+    def format(self, record):
+        formatted = super().format(record)
+        suppressed = getattr(record, "suppressed", 0)
+        if suppressed:
+            formatted += f" ({suppressed} similar messages suppressed)"
+        return formatted
+
+
+class JsonLogFormatter(logging.Formatter):
+    """One JSON object per line, keeping the request ID as its own field."""
+
+    def format(self, record):
+        entry = {
+            "time": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "request_id": getattr(record, "request_id", "N/A"),
+            "message": record.getMessage(),
+        }
+        suppressed = getattr(record, "suppressed", 0)
+        if suppressed:
+            entry["suppressed"] = suppressed
+        if record.exc_info:
+            entry["exc_info"] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str)
+
+
+# -------------------- Queue Handler --------------------
+
+class DeferredQueueHandler(logging.handlers.QueueHandler):
+    """
+    Queue handler that leaves formatting to the background writer.
+
+    The stock QueueHandler formats each record on the calling thread so it can
+    be pickled; here the queue never leaves the process, so the record is
+    passed through untouched and %-style arguments are only merged by the
+    listener thread.
+    """
+
+    def prepare(self, record):
+        return record
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            log_records_dropped_counter.inc()
+
+
+_listener: Optional[logging.handlers.QueueListener] = None
+
+
+def stop_logging():
+    """Flush queued records and stop the background writer."""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+
+
+# Initialize and configure structured logging
+def setup_logging():
+    global _listener
+    stop_logging()
+
+    log_level = os.getenv("PYTHON_LOG_LEVEL", "INFO").upper()
+    if get_choice_env("LOG_FORMAT", ("text", "json"), "text") == "json":
+        formatter = JsonLogFormatter()
+    else:
+        formatter = TextLogFormatter("%(asctime)s [%(levelname)s] [%(request_id)s] %(message)s")
+
+    stream_handler = logging.StreamHandler(sys.stdout)
+    stream_handler.setFormatter(formatter)
+
+    # Filters run on the caller's side: the request ID has to be read from
+    # the request's context, and suppressed records should never be queued
+    handler = DeferredQueueHandler(queue.Queue(maxsize=get_int_env("LOG_QUEUE_SIZE", 10000)))
+    handler.addFilter(RequestIdLogFilter())
+    rate = get_float_env("LOG_RATE_LIMIT_PER_SECOND", 0.0)
+    if rate > 0:
+        handler.addFilter(MessageRateLimitFilter(
+            rate,
+            get_float_env("LOG_RATE_LIMIT_BURST", rate * 10),
+            max_buckets=get_int_env("LOG_RATE_LIMIT_MAX_BUCKETS", 1024),
+        ))
+
+    root_logger = logging.getLogger()
+    root_logger.handlers.clear()
+    root_logger.setLevel(getattr(logging, log_level, logging.INFO))
+    root_logger.addHandler(handler)
+
+    _listener = logging.handlers.QueueListener(handler.queue, stream_handler)
+    _listener.start()
+
+    # Clear default handlers for Uvicorn to avoid duplicate logging
+    for name in ("uvicorn", "uvicorn.error", "uvicorn.access"):
+        logger = logging.getLogger(name)
+        logger.handlers.clear()
+        logger.propagate = True
+
+
+atexit.register(stop_logging)
@@ -1,17 +1,17 @@
 import os
 import socket
-import sys
 import uuid
+import time
 import logging
 import asyncio
 from io import BytesIO
 from datetime import datetime, timezone
 from contextlib import asynccontextmanager
-from contextvars import ContextVar
-from typing import Tuple, Optional
+from typing import List, Tuple, Optional
 import aio_pika
 
 from fastapi import FastAPI, Request, Response, Depends
+from fastapi.responses import JSONResponse
 from fastapi.middleware import Middleware
 from starlette.middleware.base import BaseHTTPMiddleware
 from starlette.requests import ClientDisconnect
@@ -19,51 +19,35 @@ from prometheus_fastapi_instrumentator import Instrumentator
 from PIL import Image, UnidentifiedImageError
 
 from .auth import (
-    authenticate_request, get_client_ip,
-    LOCATION_USER_PASS_MAPPING,
-    update_credentials_periodically,
+    authenticate_request, authenticate_batch_request, get_client_ip,
+    camera_id_from_filename, validate_id_and_get_camera_record, record_auth_failure,
+    update_credentials_periodically, load_auth_mappings, apply_auth_mappings, credential_cache_status,
     record_processing_failure, record_processing_success
 )
-from .rabbitmq import send_to_rabbitmq
-
-
-# -------------------- Request ID Context for Logging --------------------
-
-# A context variable used to store the request ID per request.
-request_id_ctx_var: ContextVar[str] = ContextVar("request_id", default=None)
-
-# Retrieve the current request ID or fallback to "N/A"
-def get_request_id() -> str:
-    return request_id_ctx_var.get() or "N/A"
-
-
-# -------------------- Logging Setup --------------------
-
-# Custom logging filter that injects the request ID into every log record
-class RequestIdLogFilter(logging.Filter):
-    def filter(self, record):
-        record.request_id = get_request_id()
-        return True
-
-# Initialize and configure structured logging
-def setup_logging():
-    log_level = os.getenv("PYTHON_LOG_LEVEL", "INFO").upper()
-    formatter = logging.Formatter("%(asctime)s [%(levelname)s] [%(request_id)s] %(message)s")
-
-    handler = logging.StreamHandler(sys.stdout)
-    handler.setFormatter(formatter)
-    handler.addFilter(RequestIdLogFilter())
-
-    root_logger = logging.getLogger()
-    root_logger.handlers.clear()
-    root_logger.setLevel(getattr(logging, log_level, logging.INFO))
-    root_logger.addHandler(handler)
+from .rabbitmq import send_to_rabbitmq, send_batch_to_rabbitmq, RABBITMQ_EXCHANGE_TYPE
+from .config import get_int_env
+from .concurrency import concurrency_limiter
+from .ratelimit import camera_rate_limiter, CAMERA_RATE_LIMIT_ACTION, retry_after_header
+from .coalesce import frame_coalescer
+from .dedup import FrameDigest, duplicate_cache
+from .logging_config import request_id_ctx_var, setup_logging
+from .traffic_trace import get_trace
+from .multipart import MultipartError, MultipartImageReader, multipart_boundary, MULTIPART_MAX_PREAMBLE_BYTES
+from .process_pool import process_pool, PoolBusy
+from .derivatives import (
+    build_derivative_specs_from_env, derivative_filename, render_derivatives,
+    derivatives_generated_counter, derivatives_failed_counter
+)
+from .jpeg_meta import new_metadata_parser
+from .blobstore import blob_store, purge_blobs_periodically, BLOB_RETENTION_SECONDS, BLOB_PURGE_INTERVAL_SECONDS
+from .publish_lanes import publish_lanes, lane_for, LANE_BATCH_CHUNK, LIVE_LANE, SCRIPTED_LANE
+from .auth_mappings import build_auth_mappings_watcher_from_env
+from .camera_tracker import camera_tracker
+from .sketches import region_sketches
+from .upload_schedule import upload_scheduler, SCHEDULE_HINT_HEADER
+from .jpeg_optimize import jpeg_optimizer, optimize_jpeg, accept_optimized, record_optimize_skipped
+from .lifecycle import admission_gate, install_sigterm_handler, restore_sigterm_handler, SHUTDOWN_DRAIN_TIMEOUT_SECONDS
 
-    # Clear default handlers for Uvicorn to avoid duplicate logging
-    for name in ("uvicorn", "uvicorn.error", "uvicorn.access"):
-        logger = logging.getLogger(name)
-        logger.handlers.clear()
-        logger.propagate = True
 
 setup_logging()
 logger = logging.getLogger(__name__)
@@ -93,23 +77,27 @@ def _get_max_file_size() -> int:
     default_size = 5 * 1024 * 1024
     max_size_str = os.getenv("MAX_FILE_SIZE_BYTES")
     if not max_size_str:
-        logger.info(f"MAX_FILE_SIZE_BYTES not set, using default of {default_size} bytes.")
+        logger.info("MAX_FILE_SIZE_BYTES not set, using default of %s bytes.", default_size)
         return default_size
     try:
         # Convert the environment variable (which is always a string) to an integer.
         size = int(max_size_str)
-        logger.info(f"MAX_FILE_SIZE_BYTES loaded from environment: {size} bytes.")
+        logger.info("MAX_FILE_SIZE_BYTES loaded from environment: %s bytes.", size)
         return size
     except (ValueError, TypeError):
         # This handles cases where the variable is set to a non-numeric string (e.g., "5MB").
         logger.warning(
-            f"Invalid value '{max_size_str}' for MAX_FILE_SIZE_BYTES. "
-            f"It must be an integer. Falling back to default of {default_size} bytes."
+            "Invalid value '%s' for MAX_FILE_SIZE_BYTES. "
+            "It must be an integer. Falling back to default of %s bytes.",
+            max_size_str, default_size
         )
         return default_size
     
 MAX_FILE_SIZE = _get_max_file_size()    
 
+# Optional downscaled variants published next to each original
+DERIVATIVE_SPECS = build_derivative_specs_from_env()
+
 # Validate that the image is a JPEG and under the max size limit
 def validate_jpg_image(image_bytes: bytes) -> Tuple[bool, Optional[str]]:
     if not image_bytes:
@@ -126,6 +114,87 @@ def validate_jpg_image(image_bytes: bytes) -> Tuple[bool, Optional[str]]:
         return False, "Cannot read image data"
     return True, None
 
+def start_derivatives(image_bytes: bytearray, camera_id: str):
+    """Queue derivative rendering if configured. Returns None when off or when the pool is full."""
+    if DERIVATIVE_SPECS is None:
+        return None
+    try:
+        return process_pool.try_submit("derivatives", render_derivatives, image_bytes, DERIVATIVE_SPECS)
+    except PoolBusy:
+        logger.info("Process pool busy, skipping derivatives for camera_id=%s", camera_id)
+        return None
+
+def start_optimization(image_bytes: bytearray, camera_id: str, region: str):
+    """Queue lossless optimization if enabled. Returns None when off or when the pool is full."""
+    if jpeg_optimizer is None:
+        return None
+    try:
+        return process_pool.try_submit(
+            "jpeg_optimize", optimize_jpeg, image_bytes, jpeg_optimizer.keep_markers, jpeg_optimizer.jpegtran, jpeg_optimizer.timeout
+        )
+    except PoolBusy:
+        logger.info("Process pool busy, publishing camera_id=%s unoptimized", camera_id)
+        record_optimize_skipped(region, "skipped")
+        return None
+
+async def finish_optimization(future, image_bytes: bytearray, camera_id: str, region: str):
+    """The optimized image if it saved enough, otherwise the original. Failures never fail the upload."""
+    try:
+        optimized, cpu_seconds = await future
+    except Exception as e:
+        logger.warning("JPEG optimization failed for camera_id=%s: %s", camera_id, e)
+        record_optimize_skipped(region, "failed")
+        return image_bytes
+    return accept_optimized(image_bytes, optimized, cpu_seconds, region, jpeg_optimizer.min_savings_percent)
+
+async def publish_in_lane(lane: str, publish):
+    """Await publish() through the weighted publish lanes when PUBLISH_LANES_ENABLED is set."""
+    if publish_lanes is None:
+        return await publish()
+    return await publish_lanes.run(lane, publish)
+
+async def publish_batch_in_lane(request: Request, items: List[dict], lane: str) -> List[Optional[Exception]]:
+    """
+    send_batch_to_rabbitmq in chunks of LANE_BATCH_CHUNK items, each taking its
+    own turn in the lane. Between chunks the slot and the channel lock are
+    free, so live publishes queued behind a large batch go ahead of its rest.
+    """
+    errors: List[Optional[Exception]] = []
+    for start in range(0, len(items), LANE_BATCH_CHUNK):
+        chunk = items[start:start + LANE_BATCH_CHUNK]
+        errors += await publish_in_lane(lane, lambda: send_batch_to_rabbitmq(request, chunk, lane=lane))
+    return errors
+
+async def publish_derivatives(request: Request, future, camera_id: str, timestamp: str, original_filename: str, region: str = "", lane: str = LIVE_LANE):
+    """
+    Publish rendered derivatives next to the original. Each carries a `derivative`
+    header and `derivative_of` naming the original. Failures never fail the upload.
+    """
+    try:
+        rendered = await future
+        items = [
+            {
+                "image_bytes": data,
+                "filename": derivative_filename(original_filename, name),
+                "camera_id": camera_id,
+                "timestamp": timestamp,
+                "region": region,
+                "headers": {"derivative": name, "derivative_of": original_filename, "width": width, "height": height},
+            }
+            for name, data, width, height in rendered
+        ]
+        errors = await publish_in_lane(lane, lambda: send_batch_to_rabbitmq(request, items, lane=lane))
+    except Exception as e:
+        derivatives_failed_counter.inc()
+        logger.warning("Derivatives failed for camera_id=%s: %s", camera_id, e)
+        return
+
+    if any(error is not None for error in errors):
+        derivatives_failed_counter.inc()
+    for item, error in zip(items, errors):
+        if error is None:
+            derivatives_generated_counter.labels(derivative=item["headers"]["derivative"]).inc()
+
 
 
 # -------------------- FastAPI Application Setup --------------------
@@ -135,11 +204,28 @@ async def lifespan(app: FastAPI):
 
     logger.info("Starting application...")
 
-    # 1. Background credential refresh task
+    # Credential and scripted IP maps, from AUTH_MAPPINGS_FILE or the environment
+    apply_auth_mappings(load_auth_mappings())
+
+    # 1. Background credential refresh task. Its first refresh imports SQLAlchemy and
+    # creates the DB engine in a worker thread, overlapping the RabbitMQ connect below
     credential_task = asyncio.create_task(
         update_credentials_periodically()
     )
 
+    # Retention purge for claim-check blobs
+    blob_purge_task = None
+    if blob_store is not None:
+        blob_purge_task = asyncio.create_task(
+            purge_blobs_periodically(blob_store, BLOB_RETENTION_SECONDS, BLOB_PURGE_INTERVAL_SECONDS)
+        )
+
+    # Reload credential and scripted IP maps when AUTH_MAPPINGS_FILE changes
+    auth_mappings_task = None
+    auth_mappings_watcher = build_auth_mappings_watcher_from_env()
+    if auth_mappings_watcher is not None:
+        auth_mappings_task = asyncio.create_task(auth_mappings_watcher.run(apply_auth_mappings))
+
     # 2. Read env vars
     cluster = os.getenv("CLUSTER")
     rb_url_gold = os.getenv("RABBITMQ_GOLD_URL")
@@ -156,7 +242,7 @@ async def lifespan(app: FastAPI):
         raise ValueError("Missing environment variable: RABBITMQ_EXCHANGE_NAME")
     
     if cluster.upper() != "GOLD" and cluster.upper() != "GOLDDR":
-            logger.warning(f"Unknown CLUSTER value '{cluster}', defaulting to GOLD URL.")
+            logger.warning("Unknown CLUSTER value '%s', defaulting to GOLD URL.", cluster)
 
     rb_url = rb_url_golddr if cluster.upper() == "GOLDDR" else rb_url_gold
 
@@ -166,17 +252,32 @@ async def lifespan(app: FastAPI):
         channel = await connection.channel()
         exchange = await channel.declare_exchange(
             name=rb_exchange_name,
-            type=aio_pika.ExchangeType.FANOUT,
+            type=aio_pika.ExchangeType(RABBITMQ_EXCHANGE_TYPE),
             durable=True
         )
         app.state.rabbitmq_connection = connection
         app.state.rabbitmq_channel = channel
         app.state.rabbitmq_exchange = exchange
         app.state.rabbitmq_channel_lock = asyncio.Lock()
+        logger.info("Publishing to %s exchange %s", RABBITMQ_EXCHANGE_TYPE, rb_exchange_name)
+
+        # Optional separate exchange for scripted traffic, so consumers can keep backfills off the live queues
+        rb_scripted_exchange_name = os.getenv("RABBITMQ_SCRIPTED_EXCHANGE_NAME")
+        if rb_scripted_exchange_name:
+            app.state.rabbitmq_scripted_exchange = await channel.declare_exchange(
+                name=rb_scripted_exchange_name,
+                type=aio_pika.ExchangeType(RABBITMQ_EXCHANGE_TYPE),
+                durable=True
+            )
+            logger.info("Publishing scripted uploads to exchange %s", rb_scripted_exchange_name)
     except Exception as e:
         logging.exception(f"Failed to connect to RabbitMQ: {e}", exc_info=True)
         raise
 
+    # Uploads are admitted until SIGTERM or shutdown, whichever comes first
+    admission_gate.reset()
+    previous_sigterm = install_sigterm_handler(admission_gate)
+
     logger.info("Application startup complete")
 
     try:
@@ -185,6 +286,17 @@ async def lifespan(app: FastAPI):
     finally:
         logger.info("Shutting down application...")
 
+        # Stop admitting uploads and let those in flight finish publishing before the broker is closed
+        admission_gate.begin_drain()
+        drain_deadline = time.monotonic() + SHUTDOWN_DRAIN_TIMEOUT_SECONDS
+        logger.info("Draining %s in-flight uploads", admission_gate.in_flight)
+        drained = await admission_gate.wait_idle(SHUTDOWN_DRAIN_TIMEOUT_SECONDS)
+        if frame_coalescer is not None:
+            drained = await frame_coalescer.wait_idle(drain_deadline - time.monotonic()) and drained
+        if not drained:
+            logger.warning("Shutdown drain timed out after %ss with %s uploads in flight", SHUTDOWN_DRAIN_TIMEOUT_SECONDS, admission_gate.in_flight)
+        restore_sigterm_handler(previous_sigterm)
+
         # 4. Stop background task (KEEP THIS)
         credential_task.cancel()
         try:
@@ -192,6 +304,20 @@ async def lifespan(app: FastAPI):
         except asyncio.CancelledError: # NOSONAR
             logger.info("Credential refresh task cancelled")
 
+        if blob_purge_task is not None:
+            blob_purge_task.cancel()
+            try:
+                await blob_purge_task
+            except asyncio.CancelledError: # NOSONAR
+                logger.info("Blob purge task cancelled")
+
+        if auth_mappings_task is not None:
+            auth_mappings_task.cancel()
+            try:
+                await auth_mappings_task
+            except asyncio.CancelledError: # NOSONAR
+                logger.info("Auth mappings watcher cancelled")
+
         # 5. Close RabbitMQ channel and connection
         channel = getattr(app.state, "rabbitmq_channel", None)
         if channel:
@@ -201,6 +327,8 @@ async def lifespan(app: FastAPI):
         if connection:
             await connection.close()
 
+        process_pool.shutdown()
+
         logger.info("Application shutdown complete")
 
 app = FastAPI(
@@ -225,11 +353,67 @@ Instrumentator().instrument(app).expose(app, endpoint="/api/metrics")
 async def log_post_request_details(request: Request, call_next):
     if request.method == "POST" and logger.isEnabledFor(logging.DEBUG):
         client_ip = get_client_ip(request)
-        logger.debug(f"Incoming POST request from IP={client_ip}")
-        logger.debug(f"POST Request Headers: {dict(request.headers)}")
+        logger.debug("Incoming POST request from IP=%s", client_ip)
+        logger.debug("POST Request Headers: %s", dict(request.headers))
     return await call_next(request)
 
 
+# -------------------- Adaptive Concurrency Limiting --------------------
+
+def is_upload_request(request: Request) -> bool:
+    return request.method == "POST" and request.url.path == "/api/images"
+
+# Sheds uploads over the adaptive limit before any auth or body work is done
+@app.middleware("http")
+async def limit_upload_concurrency(request: Request, call_next):
+    if concurrency_limiter is None or not is_upload_request(request):
+        return await call_next(request)
+
+    if not concurrency_limiter.try_acquire():
+        logger.warning("Shedding upload, concurrency limit %s reached", concurrency_limiter.current_limit)
+        return Response(
+            content="Server busy, retry later",
+            media_type="text/plain",
+            status_code=503,
+            headers={"Retry-After": "1"}
+        )
+
+    success = False
+    try:
+        response = await call_next(request)
+        success = response.status_code < 500
+        return response
+    finally:
+        # Only time after the body is read: a camera on a slow link must not shrink the limit for everyone
+        body_read_at = getattr(request.state, "body_read_at", None)
+        concurrency_limiter.release(time.perf_counter() - body_read_at if body_read_at else None, success)
+
+
+# -------------------- Shutdown Admission --------------------
+
+UPLOAD_PATHS = ("/api/images", "/api/images/batch")
+
+# Refuses uploads once shutdown has begun and counts those in flight so shutdown can wait for them
+@app.middleware("http")
+async def admit_uploads_until_shutdown(request: Request, call_next):
+    if request.method != "POST" or request.url.path not in UPLOAD_PATHS:
+        return await call_next(request)
+
+    if not admission_gate.try_enter():
+        return Response(
+            content="Shutting down, retry later",
+            media_type="text/plain",
+            status_code=503,
+            headers={"Retry-After": "1", "Connection": "close"}
+        )
+    # Start of the end-to-end latency fed to the region sketches
+    request.state.admitted_at = time.perf_counter()
+    try:
+        return await call_next(request)
+    finally:
+        admission_gate.leave()
+
+
 # -------------------- Routes --------------------
 
 # Basic health check endpoint
@@ -237,6 +421,65 @@ async def log_post_request_details(request: Request, call_next):
 async def health_check():
     return {"status": "ok"}
 
+# Readiness: 503 until the credential cache is loaded and the broker channel is open, and while shutting down.
+# A stale cache is reported but does not fail readiness, since the last good cache keeps being served.
+@app.get("/api/readyz")
+async def readiness_check(request: Request):
+    credential_cache = credential_cache_status()
+    connection = getattr(request.app.state, "rabbitmq_connection", None)
+    channel = getattr(request.app.state, "rabbitmq_channel", None)
+    broker = {
+        "connection": "open" if connection is not None and not connection.is_closed else "closed",
+        "channel": "open" if channel is not None and not channel.is_closed else "closed",
+    }
+
+    if admission_gate.draining:
+        status = "draining"
+    elif credential_cache["records"] and broker["connection"] == "open" and broker["channel"] == "open":
+        status = "ready"
+    else:
+        status = "not_ready"
+
+    return JSONResponse(
+        {"status": status, "credential_cache": credential_cache, "broker": broker},
+        status_code=200 if status == "ready" else 503
+    )
+
+# Cameras that have stopped uploading (stale) or are overdue against their own cadence (late)
+@app.get("/api/cameras/freshness")
+async def camera_freshness(limit: int = 100):
+    if camera_tracker is None:
+        return Response(content="Camera tracking is disabled", media_type="text/plain", status_code=404)
+    limit = max(0, min(limit, 10000))
+    return {
+        "tracked": len(camera_tracker),
+        "stale_after_seconds": camera_tracker.stale_seconds,
+        "stale": camera_tracker.stale(limit=limit),
+        "late": camera_tracker.late(limit=limit),
+    }
+
+# Upload cadence, sizes and failures for one camera
+@app.get("/api/cameras/{camera_id}/freshness")
+async def camera_freshness_detail(camera_id: str):
+    stats = camera_tracker.camera_stats(camera_id) if camera_tracker is not None else None
+    if stats is None:
+        return Response(content="Camera not tracked", media_type="text/plain", status_code=404)
+    return stats
+
+# How bursty upload arrivals are, and how camera phases line up within their intervals
+@app.get("/api/uploads/arrivals")
+async def upload_arrivals():
+    if upload_scheduler is None:
+        return Response(content="Upload arrival tracking is disabled", media_type="text/plain", status_code=404)
+    return upload_scheduler.report(camera_tracker.cadences() if camera_tracker is not None else None)
+
+# Payload size and latency quantiles per region, with sketches that merge across workers
+@app.get("/api/sketches")
+async def sketches():
+    if region_sketches is None:
+        return Response(content="Region sketches are disabled", media_type="text/plain", status_code=404)
+    return region_sketches.report()
+
 # Informational endpoint confirming image upload availability
 @app.get("/")
 @app.get("/api/images")
@@ -250,38 +493,114 @@ async def index():
 # Main image ingestion route
 @app.post("/api/images")
 async def receive_image(request: Request, auth_data=Depends(authenticate_request)):
+    trace = get_trace(request)
+    # Scripted backfills are neither counted as arrivals nor given a schedule
+    live = lane_for(auth_data) == LIVE_LANE
+    if live and upload_scheduler is not None:
+        upload_scheduler.record_arrival()
+    response = await process_image_upload(request, auth_data, trace)
+    trace.finish(response.status_code)
+    # Only frames actually published get a hint, not throttled, duplicate or superseded ones
+    published = getattr(request.state, "frame_published", False)
+    if live and published and upload_scheduler is not None and camera_tracker is not None:
+        camera_id = str(auth_data.get("ID", ""))
+        hint = upload_scheduler.hint(camera_id, camera_tracker.cadence(camera_id))
+        if hint is not None:
+            response.headers[SCHEDULE_HINT_HEADER] = hint
+    return response
+
+async def process_image_upload(request: Request, auth_data: dict, trace) -> Response:
     camera_id = str(auth_data.get("ID", ""))
+    region = (auth_data.get("Cam_LocationsRegion") or "").strip()
+    lane = lane_for(auth_data)
+    # Freshness is tracked for live cameras only; scripted backfills would distort their cadence
+    tracker = camera_tracker if lane == LIVE_LANE else None
     TIMESTAMP_FORMAT = "%Y%m%dT%H%M%SZ"
 
+    # Per-camera rate limit, checked before any of the body is read
+    if camera_rate_limiter is not None:
+        allowed, retry_after = camera_rate_limiter.allow(camera_id, region)
+        if not allowed:
+            logger.warning("Upload rate limit exceeded for camera_id=%s", camera_id)
+            trace.note("rate_limited")
+            if CAMERA_RATE_LIMIT_ACTION == "drop":
+                return Response(content="Image dropped: upload rate limit exceeded", media_type="text/plain", status_code=200)
+            return Response(
+                content="Upload rate limit exceeded",
+                media_type="text/plain",
+                status_code=429,
+                headers={"Retry-After": retry_after_header(retry_after)}
+            )
+
+    # Multipart uploads stream the image out of their first file part, which auth located
+    multipart_reader = getattr(request.state, "multipart_reader", None)
+    max_content_length = MAX_FILE_SIZE if multipart_reader is None else MAX_FILE_SIZE + MULTIPART_MAX_PREAMBLE_BYTES
+
     content_length = request.headers.get("content-length")
-    if content_length and int(content_length) > MAX_FILE_SIZE:
-        logger.warning(f"Content-Length ({content_length}) exceeds max size for camera_id={camera_id}")
+    if content_length and int(content_length) > max_content_length:
+        logger.warning("Content-Length (%s) exceeds max size for camera_id=%s", content_length, camera_id)
         record_processing_failure()
         return Response(f"Image exceeds maximum size limit of {MAX_FILE_SIZE} bytes", status_code=413) # Payload Too Large
 
+    read_start = time.perf_counter()
     image_bytes = bytearray()
+    frame_digest = FrameDigest() if duplicate_cache is not None else None
+    metadata = new_metadata_parser()
     try:
-        async for chunk in request.stream():
+        body = multipart_reader.stream() if multipart_reader is not None else request.stream()
+        async for chunk in body:
             image_bytes.extend(chunk)
+            if frame_digest is not None:
+                frame_digest.update(chunk)
+            if metadata is not None:
+                metadata.feed(chunk)
             if len(image_bytes) > MAX_FILE_SIZE:
-                logger.warning(f"Streamed image exceeds max size for camera_id={camera_id}")
+                logger.warning("Streamed image exceeds max size for camera_id=%s", camera_id)
                 record_processing_failure()
                 return Response(f"Image exceeds maximum size limit of {MAX_FILE_SIZE} bytes", status_code=413)
     except ClientDisconnect:
-        logger.warning(f"Client disconnected before sending full image for camera_id={camera_id}. Proceeding with partial data.")
+        logger.warning("Client disconnected before sending full image for camera_id=%s. Proceeding with partial data.", camera_id)
+    except MultipartError as e:
+        logger.warning("Malformed multipart body for camera_id=%s: %s", camera_id, e)
+        record_processing_failure()
+        return Response(content="Malformed multipart body", media_type="text/plain", status_code=400)
+    request.state.body_read_at = time.perf_counter()
+    trace.stage("read", read_start)
+    trace.size = len(image_bytes)
 
     if not image_bytes:
-        logger.warning(f"No image data received for camera_id={camera_id}")
+        logger.warning("No image data received for camera_id=%s", camera_id)
         record_processing_failure()
         return Response(content="No image data received", media_type="text/plain", status_code=400)
 
     # Validate the received image
+    validate_start = time.perf_counter()
     valid, error = validate_jpg_image(image_bytes)
+    trace.stage("validate", validate_start)
     if not valid:
-        logger.warning(f"Validation failed for camera_id={camera_id}: {error}")
+        logger.warning("Validation failed for camera_id=%s: %s", camera_id, error)
         record_processing_failure()
+        if tracker is not None:
+            tracker.record_failure(camera_id)
         return Response(error, media_type="text/plain", status_code=400)
 
+    # Skip exact re-sends of a frame this camera had published recently
+    digest = frame_digest.digest() if frame_digest is not None else None
+    if digest is not None and duplicate_cache.is_duplicate(camera_id, digest, region):
+        logger.info("Duplicate image skipped for camera_id=%s", camera_id)
+        trace.note("duplicate")
+        record_processing_success()
+        if tracker is not None:
+            tracker.record_upload(camera_id, len(image_bytes))
+        return Response(content="Duplicate image skipped", media_type="text/plain", status_code=200)
+
+    # Lossless optimization and derivatives both start from the validated original
+    optimize_future = start_optimization(image_bytes, camera_id, region)
+    derivatives_future = start_derivatives(image_bytes, camera_id)
+    if optimize_future is not None:
+        optimize_start = time.perf_counter()
+        image_bytes = await finish_optimization(optimize_future, image_bytes, camera_id, region)
+        trace.stage("optimize", optimize_start)
 
     timestamp_header = request.headers.get("timestamp")
 
@@ -290,44 +609,215 @@ async def receive_image(request: Request, auth_data=Depends(authenticate_request
             # Only allow compact UTC format: 20250819T142345Z
             ts = datetime.strptime(timestamp_header, TIMESTAMP_FORMAT)
             timestamp = ts.strftime(TIMESTAMP_FORMAT)
-            logger.info(f"Using timestamp header for camera_id={camera_id} with timestamp={timestamp}")
+            logger.info("Using timestamp header for camera_id=%s with timestamp=%s", camera_id, timestamp)
         except ValueError:
             logger.warning(
-                f"Invalid timestamp header for camera_id={camera_id}, "
-                "falling back to current UTC time."
+                "Invalid timestamp header for camera_id=%s, "
+                "falling back to current UTC time.", camera_id
             )
             timestamp = datetime.now(timezone.utc).strftime(TIMESTAMP_FORMAT)
     else:
         timestamp = datetime.now(timezone.utc).strftime(TIMESTAMP_FORMAT)
 
     rabbitmq_filename = f"{camera_id}_{timestamp}.jpg"
+    headers = metadata.as_headers() if metadata is not None else None
 
     # Track overall result
     push_failed = False
     failure_messages = []
 
     # --- Send image to RabbitMQ ---
+    publish_start = time.perf_counter()
+    superseded = False
     try:
-        await send_to_rabbitmq(request, image_bytes, rabbitmq_filename, camera_id=camera_id, timestamp=timestamp)
-        logger.info(f"Pushed to RabbitMQ for camera_id={camera_id} with filename={rabbitmq_filename}")
+        publish = lambda: publish_in_lane(
+            lane,
+            lambda: send_to_rabbitmq(request, image_bytes, rabbitmq_filename, camera_id=camera_id, timestamp=timestamp, headers=headers, region=region, lane=lane)
+        )
+        if frame_coalescer is not None:
+            published = await frame_coalescer.submit(camera_id, publish)
+            superseded = not published
+        else:
+            await publish()
+        if superseded:
+            logger.info("Frame superseded by a newer upload for camera_id=%s with filename=%s", camera_id, rabbitmq_filename)
+        else:
+            logger.info("Pushed to RabbitMQ for camera_id=%s with filename=%s", camera_id, rabbitmq_filename)
+            if digest is not None:
+                duplicate_cache.remember(camera_id, digest)
     except Exception as e:
-        logger.error(f"Push to RabbitMQ failed for camera_id={camera_id}: %s", str(e), exc_info=False)
+        logger.error("Push to RabbitMQ failed for camera_id=%s: %s", camera_id, str(e), exc_info=False)
         record_processing_failure()
         push_failed = True
         failure_messages.append("Push to RabbitMQ failed")
+    trace.stage("publish", publish_start)
+    if concurrency_limiter is not None:
+        concurrency_limiter.record_publish_latency(time.perf_counter() - publish_start)
+
+    if derivatives_future is not None:
+        if push_failed or superseded:
+            derivatives_future.cancel()
+        else:
+            derivatives_start = time.perf_counter()
+            await publish_derivatives(request, derivatives_future, camera_id, timestamp, rabbitmq_filename, region, lane)
+            trace.stage("derivatives", derivatives_start)
 
 
     # --- Final outcome ---
+    if tracker is not None:
+        if push_failed:
+            tracker.record_failure(camera_id)
+        else:
+            tracker.record_upload(camera_id, len(image_bytes))
+
     if push_failed:
-        logger.warning(f"Image processed with errors for camera_id={camera_id}: {', '.join(failure_messages)}")
+        logger.warning("Image processed with errors for camera_id=%s: %s", camera_id, ', '.join(failure_messages))
         return Response(
             content=f"Image processed with errors: {', '.join(failure_messages)}",
             media_type="text/plain",
             status_code=500
         )
 
+    if superseded:
+        trace.note("superseded")
+        record_processing_success()
+        return Response(content="Image superseded by a newer frame", media_type="text/plain", status_code=200)
+
     # All operations succeeded
-    logger.info(f"Successfully processed image for camera_id={camera_id}")
+    request.state.frame_published = True
+    if region_sketches is not None:
+        admitted_at = getattr(request.state, "admitted_at", None) or read_start
+        region_sketches.record(region, len(image_bytes), time.perf_counter() - admitted_at)
+    logger.info("Successfully processed image for camera_id=%s", camera_id)
     record_processing_success()
     return Response(content="Image received and processed successfully", media_type="text/plain", status_code=200)
 
+
+# -------------------- Batch Uploads --------------------
+
+BATCH_MAX_ITEMS = get_int_env("BATCH_MAX_ITEMS", 200)
+BATCH_MAX_BYTES = get_int_env("BATCH_MAX_BYTES", 64 * 1024 * 1024)
+
+async def read_batch_item(reader: MultipartImageReader, filename: str, cameras: dict, byte_budget: int):
+    """
+    Checks and reads the current file part of a batch. Returns (status, detail, item)
+    where item is ready for send_batch_to_rabbitmq, or None if nothing should be published.
+    """
+    camera_id = camera_id_from_filename(filename)
+    if not camera_id:
+        return 400, "Invalid filename format", None
+
+    try:
+        record = validate_id_and_get_camera_record(cameras, camera_id)
+    except ValueError as e:
+        logger.warning("Batch item rejected for camera %s: %s", camera_id, e)
+        record_auth_failure()
+        return 401, "Unauthorized", None
+    camera_id = str(record["ID"])
+    region = (record.get("Cam_LocationsRegion") or "").strip()
+
+    if camera_rate_limiter is not None:
+        allowed, _ = camera_rate_limiter.allow(camera_id, region)
+        if not allowed:
+            logger.warning("Upload rate limit exceeded for camera_id=%s", camera_id)
+            if CAMERA_RATE_LIMIT_ACTION == "drop":
+                return 200, "Image dropped: upload rate limit exceeded", None
+            return 429, "Upload rate limit exceeded", None
+
+    limit = min(MAX_FILE_SIZE, byte_budget)
+    image_bytes = bytearray()
+    frame_digest = FrameDigest() if duplicate_cache is not None else None
+    metadata = new_metadata_parser()
+    async for chunk in reader.stream():
+        image_bytes.extend(chunk)
+        if frame_digest is not None:
+            frame_digest.update(chunk)
+        if metadata is not None:
+            metadata.feed(chunk)
+        if len(image_bytes) > limit:
+            return 413, f"Image exceeds maximum size limit of {limit} bytes", None
+
+    valid, error = validate_jpg_image(image_bytes)
+    if not valid:
+        return 400, error, None
+
+    digest = frame_digest.digest() if frame_digest is not None else None
+    if digest is not None and duplicate_cache.is_duplicate(camera_id, digest, region):
+        return 200, "Duplicate image skipped", None
+
+    timestamp = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%SZ")
+    return 200, None, {
+        "image_bytes": image_bytes,
+        "filename": f"{camera_id}_{timestamp}.jpg",
+        "camera_id": camera_id,
+        "timestamp": timestamp,
+        "region": region,
+        "headers": metadata.as_headers() if metadata is not None else None,
+        "digest": digest,
+    }
+
+# Many cameras' images in one multipart/form-data request from a scripted source.
+# Each file part is one image named like a single upload, e.g. filename="123.jpg".
+@app.post("/api/images/batch")
+async def receive_image_batch(request: Request, source=Depends(authenticate_batch_request)):
+    try:
+        boundary = multipart_boundary(request.headers.get("content-type"))
+    except MultipartError:
+        boundary = None
+    if boundary is None:
+        return Response(content="Batch uploads must be multipart/form-data", media_type="text/plain", status_code=415)
+
+    reader = MultipartImageReader(request.stream(), boundary)
+    results = []
+    pending = []
+    bytes_accepted = 0
+    try:
+        while (filename := await reader.next_file()) is not None:
+            if len(results) >= BATCH_MAX_ITEMS:
+                results.append({"filename": filename, "status": 413, "detail": f"Batch exceeds {BATCH_MAX_ITEMS} images, remaining images were not read"})
+                break
+            status_code, detail, item = await read_batch_item(reader, filename, source["cameras"], BATCH_MAX_BYTES - bytes_accepted)
+            result = {"filename": filename, "status": status_code}
+            if detail:
+                result["detail"] = detail
+            if item is not None:
+                result["camera_id"] = item["camera_id"]
+                bytes_accepted += len(item["image_bytes"])
+                pending.append((result, item))
+            elif status_code == 200:
+                record_processing_success()
+            else:
+                record_processing_failure()
+            results.append(result)
+    except (MultipartError, ClientDisconnect) as e:
+        logger.warning("Batch from %s aborted, nothing published: %s", source["scripted_name"], e)
+        return Response(content="Malformed or incomplete multipart body", media_type="text/plain", status_code=400)
+
+    if not results:
+        return Response(content="No images in batch", media_type="text/plain", status_code=400)
+
+    # --- Publish every accepted image with one confirm wait ---
+    if pending:
+        publish_start = time.perf_counter()
+        items = [item for _, item in pending]
+        errors = await publish_batch_in_lane(request, items, SCRIPTED_LANE)
+        if concurrency_limiter is not None:
+            concurrency_limiter.record_publish_latency(time.perf_counter() - publish_start)
+        for (result, item), error in zip(pending, errors):
+            if error is not None:
+                record_processing_failure()
+                result["status"] = 500
+                result["detail"] = "Push to RabbitMQ failed"
+                continue
+            record_processing_success()
+            result["detail"] = "Image received and processed successfully"
+            if item["digest"] is not None:
+                duplicate_cache.remember(item["camera_id"], item["digest"])
+
+    published = sum(1 for result, _ in pending if result["status"] == 200)
+    logger.info("Batch from %s: %s images, %s published", source["scripted_name"], len(results), published)
+    all_ok = all(result["status"] == 200 for result in results)
+    return JSONResponse(
+        content={"items": results, "published": published},
+        status_code=200 if all_ok else 207
+    )
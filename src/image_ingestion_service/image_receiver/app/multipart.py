@@ -0,0 +1,159 @@
+import logging
+from collections import deque
+from typing import AsyncIterator, Optional
+
+from python_multipart.exceptions import MultipartParseError
+from python_multipart.multipart import MultipartParser, parse_options_header
+
+from .config import get_int_env
+
+
+logger = logging.getLogger(__name__)
+
+# Bytes read while looking for the image part's headers. Auth needs the filename
+# before credentials can be checked, so this bounds unauthenticated reads.
+MULTIPART_MAX_PREAMBLE_BYTES = get_int_env("MULTIPART_MAX_PREAMBLE_BYTES", 64 * 1024)
+
+
+class MultipartError(ValueError):
+    """Raised when a multipart body is malformed or has no file part."""
+
+
+def multipart_boundary(content_type: Optional[str]) -> Optional[bytes]:
+    """Return the boundary if the Content-Type is multipart/form-data, otherwise None."""
+    if not content_type:
+        return None
+    media_type, options = parse_options_header(content_type)
+    if media_type != b"multipart/form-data":
+        return None
+    boundary = options.get(b"boundary")
+    if not boundary:
+        raise MultipartError("Missing multipart boundary")
+    return boundary
+
+
+# -------------------- Streaming Reader --------------------
+class MultipartImageReader:
+    """
+    Pulls file parts out of a multipart/form-data request body one at a time
+    without buffering the form.
+
+    `next_file()` consumes the body only up to the end of the next file part's
+    headers and `stream()` then yields that part's data chunk by chunk as it
+    arrives. Non-file form fields are parsed past and discarded.
+    """
+
+    def __init__(self, chunks: AsyncIterator[bytes], boundary: bytes, max_preamble: int = MULTIPART_MAX_PREAMBLE_BYTES):
+        self._chunks = chunks.__aiter__()
+        self._max_preamble = max_preamble
+        self._parser = MultipartParser(boundary, callbacks={
+            "on_part_begin": self._on_part_begin,
+            "on_header_field": self._on_header_field,
+            "on_header_value": self._on_header_value,
+            "on_header_end": self._on_header_end,
+            "on_headers_finished": self._on_headers_finished,
+            "on_part_data": self._on_part_data,
+            "on_part_end": self._on_part_end,
+        })
+        self._header_field = bytearray()
+        self._header_value = bytearray()
+        self._part_headers = {}
+        self._in_file_part = False
+        # Parsed events not yet consumed: ("file", filename, content_type), ("data", bytes) or ("end",).
+        # One network chunk can hold several whole parts, so they are queued rather than tracked in flags.
+        self._events = deque()
+        self._streaming = False
+        self._eof = False
+        self.files_seen = 0
+        self.filename: Optional[str] = None
+        self.content_type: Optional[str] = None
+        self.bytes_read = 0
+
+    # Parser callbacks
+    def _on_part_begin(self):
+        self._part_headers = {}
+
+    def _on_header_field(self, data: bytes, start: int, end: int):
+        self._header_field += data[start:end]
+
+    def _on_header_value(self, data: bytes, start: int, end: int):
+        self._header_value += data[start:end]
+
+    def _on_header_end(self):
+        self._part_headers[bytes(self._header_field).lower()] = bytes(self._header_value)
+        self._header_field.clear()
+        self._header_value.clear()
+
+    def _on_headers_finished(self):
+        _, options = parse_options_header(self._part_headers.get(b"content-disposition", b""))
+        filename = options.get(b"filename")
+        self._in_file_part = bool(filename)
+        if self._in_file_part:
+            content_type = self._part_headers.get(b"content-type", b"").decode("latin-1") or None
+            self._events.append(("file", filename.decode("utf-8", "replace"), content_type))
+
+    def _on_part_data(self, data: bytes, start: int, end: int):
+        if self._in_file_part:
+            self._events.append(("data", bytes(data[start:end])))
+
+    def _on_part_end(self):
+        if self._in_file_part:
+            self._in_file_part = False
+            self._events.append(("end",))
+
+    async def _feed(self):
+        try:
+            chunk = await self._chunks.__anext__()
+        except StopAsyncIteration:
+            self._eof = True
+            return
+        self.bytes_read += len(chunk)
+        try:
+            self._parser.write(chunk)
+        except MultipartParseError as e:
+            raise MultipartError(f"Malformed multipart body: {e}") from e
+
+    async def next_file(self) -> Optional[str]:
+        """
+        Advance to the next file part and return its filename, or None at the
+        end of the body. Unread data of the current part is skipped.
+        """
+        self._streaming = False
+        while True:
+            while self._events:
+                event = self._events.popleft()
+                if event[0] == "file":
+                    _, self.filename, self.content_type = event
+                    self.files_seen += 1
+                    self._streaming = True
+                    return self.filename
+            if self._eof:
+                return None
+            if not self.files_seen and self.bytes_read > self._max_preamble:
+                raise MultipartError("No file part within the first %d bytes" % self._max_preamble)
+            await self._feed()
+
+    async def read_filename(self) -> str:
+        """Read until the first file part's headers and return its filename."""
+        filename = await self.next_file()
+        if filename is None:
+            raise MultipartError("Multipart body has no file part")
+        return filename
+
+    async def stream(self) -> AsyncIterator[bytes]:
+        """Yield the current file part's bytes. Call after next_file() or read_filename()."""
+        while self._streaming:
+            while self._events:
+                event = self._events[0]
+                if event[0] != "data":
+                    if event[0] == "end":
+                        self._events.popleft()
+                    self._streaming = False
+                    return
+                self._events.popleft()
+                yield event[1]
+            if self._eof:
+                # A body cut short (or missing its closing boundary) must not pass as a whole image
+                self._streaming = False
+                raise MultipartError("Multipart body ended inside a file part")
+            await self._feed()
@@ -0,0 +1,94 @@
+import os
+import asyncio
+import logging
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Callable, Optional
+
+from prometheus_client import Counter, Gauge
+
+from .config import get_int_env
+
+
+logger = logging.getLogger(__name__)
+
+# -------------------- Prometheus Metrics --------------------
+pool_tasks_gauge = Gauge("process_pool_tasks_in_flight", "CPU-bound tasks queued or running in the shared process pool")
+pool_skipped_counter = Counter(
+    "process_pool_tasks_skipped_total",
+    "Count of optional CPU-bound tasks skipped because the process pool was at capacity",
+    ["task"],
+)
+
+
+class PoolBusy(Exception):
+    """Raised when the pool already has its maximum number of tasks in flight."""
+
+
+# -------------------- Bounded Process Pool --------------------
+class BoundedProcessPool:
+    """
+    Process pool for optional CPU-bound work such as re-encoding images.
+
+    At most `max_pending` tasks are queued or running at once. Callers use
+    `try_submit`, which refuses immediately rather than waiting when the pool
+    is full, so the work is skipped under load instead of delaying uploads.
+    Worker processes are started on first use with the forkserver method,
+    because the service has logging threads that make plain fork unsafe.
+    """
+
+    def __init__(self, workers: int, max_pending: int):
+        self.workers = max(1, workers)
+        self.max_pending = max(1, max_pending)
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._pending = 0
+
+    @property
+    def pending(self) -> int:
+        return self._pending
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.workers,
+                mp_context=multiprocessing.get_context("forkserver"),
+            )
+        return self._executor
+
+    def try_submit(self, task: str, fn: Callable[..., Any], *args) -> "asyncio.Future":
+        """Schedule fn(*args) in a worker and return an awaitable, or raise PoolBusy."""
+        if self._pending >= self.max_pending:
+            pool_skipped_counter.labels(task=task).inc()
+            raise PoolBusy(task)
+
+        future = asyncio.get_running_loop().run_in_executor(self._get_executor(), fn, *args)
+        self._pending += 1
+        pool_tasks_gauge.inc()
+        future.add_done_callback(self._task_done)
+        return future
+
+    def _task_done(self, future):
+        self._pending -= 1
+        pool_tasks_gauge.dec()
+        # A worker that died takes the whole executor with it; start a fresh one on next use
+        if not future.cancelled() and isinstance(future.exception(), BrokenProcessPool) and self._executor is not None:
+            logger.warning("Process pool broke, it will be restarted on next use")
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+
+def build_process_pool_from_env() -> BoundedProcessPool:
+    workers = get_int_env("PROCESS_POOL_WORKERS", min(2, os.cpu_count() or 1))
+    return BoundedProcessPool(
+        workers,
+        max_pending=get_int_env("PROCESS_POOL_MAX_PENDING", workers * 2),
+    )
+
+
+process_pool = build_process_pool_from_env()
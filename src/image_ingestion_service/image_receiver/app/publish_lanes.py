@@ -0,0 +1,166 @@
+import time
+import asyncio
+import logging
+from collections import deque
+from typing import Awaitable, Callable, Dict, Optional, TypeVar
+
+from prometheus_client import Gauge, Histogram
+
+from .auth import load_mapping_from_env
+from .config import get_bool_env, get_int_env
+
+
+logger = logging.getLogger(__name__)
+
+LIVE_LANE = "live"
+SCRIPTED_LANE = "scripted"
+DEFAULT_LANE_WEIGHTS = {LIVE_LANE: 4, SCRIPTED_LANE: 1}
+# Batches are published this many images per lane turn, so a large backfill
+# is scheduled (and holds the channel lock) a few messages at a time
+LANE_BATCH_CHUNK = max(1, get_int_env("PUBLISH_LANE_BATCH_CHUNK", 8))
+
+# -------------------- Prometheus Metrics --------------------
+lane_depth_gauge = Gauge("publish_lane_queue_depth", "Publishes waiting for a slot, per lane", ["lane"])
+lane_wait_histogram = Histogram(
+    "publish_lane_wait_seconds",
+    "Time a publish waited for its lane to be scheduled",
+    ["lane"],
+    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5),
+)
+lane_latency_histogram = Histogram(
+    "publish_lane_latency_seconds",
+    "Time from queueing a publish to its broker confirm, per lane",
+    ["lane"],
+    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5),
+)
+
+T = TypeVar("T")
+
+
+def lane_for(auth_data: dict) -> str:
+    return SCRIPTED_LANE if auth_data.get("is_scripted") else LIVE_LANE
+
+
+# -------------------- Weighted Fair Scheduling --------------------
+class PublishLanes:
+    """
+    Admits publishes from several lanes through `concurrency` shared slots.
+
+    Each lane has its own FIFO queue. When a slot frees up, the next waiter
+    is taken by smooth weighted round robin over the lanes that have
+    waiters, so with weights live=4, scripted=1 a scripted backfill that
+    keeps its lane full still only gets one slot in five while live frames
+    are waiting, and all of them when nothing else is.
+    """
+
+    def __init__(self, weights: Dict[str, int], concurrency: int = 4):
+        self.weights = {lane: max(1, int(weight)) for lane, weight in weights.items()}
+        self.concurrency = max(1, concurrency)
+        self._queues: Dict[str, deque] = {lane: deque() for lane in self.weights}
+        self._credit: Dict[str, int] = {lane: 0 for lane in self.weights}
+        self._active = 0
+        for lane in self.weights:
+            lane_depth_gauge.labels(lane=lane).set(0)
+
+    @property
+    def active(self) -> int:
+        return self._active
+
+    def depth(self, lane: str) -> int:
+        return len(self._queues[lane])
+
+    def _pick_lane(self) -> Optional[str]:
+        waiting = [lane for lane, queue in self._queues.items() if queue]
+        if not waiting:
+            return None
+        total = 0
+        for lane in waiting:
+            self._credit[lane] += self.weights[lane]
+            total += self.weights[lane]
+        chosen = max(waiting, key=lambda lane: self._credit[lane])
+        self._credit[chosen] -= total
+        return chosen
+
+    def _dispatch(self):
+        while self._active < self.concurrency:
+            lane = self._pick_lane()
+            if lane is None:
+                return
+            waiter = self._queues[lane].popleft()
+            lane_depth_gauge.labels(lane=lane).dec()
+            if waiter.done():
+                continue
+            self._active += 1
+            waiter.set_result(None)
+
+    async def _acquire(self, lane: str):
+        if self._active < self.concurrency and not any(self._queues.values()):
+            self._active += 1
+            return
+        waiter = asyncio.get_running_loop().create_future()
+        self._queues[lane].append(waiter)
+        lane_depth_gauge.labels(lane=lane).inc()
+        try:
+            await waiter
+        except asyncio.CancelledError:
+            if waiter.done() and not waiter.cancelled():
+                # Granted just as we were cancelled: hand the slot on
+                self._release()
+            elif waiter in self._queues[lane]:
+                self._queues[lane].remove(waiter)
+                lane_depth_gauge.labels(lane=lane).dec()
+            raise
+
+    def _release(self):
+        self._active -= 1
+        self._dispatch()
+
+    async def run(self, lane: str, publish: Callable[[], Awaitable[T]]) -> T:
+        """Wait for a slot in `lane`, then await publish()."""
+        if lane not in self._queues:
+            lane = LIVE_LANE if LIVE_LANE in self._queues else next(iter(self._queues))
+        queued = time.perf_counter()
+        await self._acquire(lane)
+        lane_wait_histogram.labels(lane=lane).observe(time.perf_counter() - queued)
+        try:
+            return await publish()
+        finally:
+            self._release()
+            lane_latency_histogram.labels(lane=lane).observe(time.perf_counter() - queued)
+
+
+def build_lane_weights_from_env() -> Dict[str, int]:
+    """DEFAULT_LANE_WEIGHTS overridden per lane by PUBLISH_LANE_WEIGHTS, e.g. {"live": 8}."""
+    weights = dict(DEFAULT_LANE_WEIGHTS)
+    for lane, weight in load_mapping_from_env("PUBLISH_LANE_WEIGHTS").items():
+        try:
+            weights[lane] = int(weight)
+        except (TypeError, ValueError):
+            weights[lane] = DEFAULT_LANE_WEIGHTS.get(lane, 1)
+            logger.warning("Invalid weight for publish lane '%s': %s, falling back to %s.", lane, weight, weights[lane])
+    return weights
+
+
+def build_publish_lanes_from_env() -> Optional[PublishLanes]:
+    """Create the lane scheduler if PUBLISH_LANES_ENABLED is set."""
+    if not get_bool_env("PUBLISH_LANES_ENABLED", False):
+        return None
+    weights = build_lane_weights_from_env()
+    concurrency = get_int_env("PUBLISH_LANE_CONCURRENCY", 4)
+    logger.info("Publish lanes enabled with weights %s and %s slots", weights, concurrency)
+    return PublishLanes(weights, concurrency)
+
+
+def build_lane_priorities_from_env() -> Dict[str, int]:
+    """Optional AMQP priority per lane, e.g. {"live": 5, "scripted": 1}. Consumers' queues need x-max-priority."""
+    priorities = {}
+    for lane, priority in load_mapping_from_env("PUBLISH_LANE_PRIORITIES").items():
+        try:
+            priorities[lane] = max(0, min(255, int(priority)))
+        except (TypeError, ValueError):
+            logger.warning("Ignoring invalid priority for publish lane '%s': %s", lane, priority)
+    return priorities
+
+
+publish_lanes = build_publish_lanes_from_env()
+LANE_PRIORITIES = build_lane_priorities_from_env()
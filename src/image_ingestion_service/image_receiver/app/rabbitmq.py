@@ -1,14 +1,53 @@
+import re
+import asyncio
 import aio_pika
 import logging
 from datetime import datetime, timezone
+from typing import List, Optional, Tuple
+
+from . import blobstore
+from .config import get_choice_env
+from .publish_lanes import LANE_PRIORITIES, SCRIPTED_LANE
 
 
 logger = logging.getLogger(__name__)
 
-async def send_to_rabbitmq(request, image_bytes, filename, camera_id, timestamp):
+# -------------------- Exchange Routing --------------------
+EXCHANGE_TYPES = ("fanout", "topic", "headers")
+
+# fanout (default): every bound queue gets every frame.
+# topic: routing key "<region>.<camera_id>", or "<region>.<camera_id>.<derivative>",
+#        so consumers can bind e.g. "LowerMainland.#" or "*.123".
+# headers: messages also carry a "region" header for x-match bindings on region/camera_id.
+RABBITMQ_EXCHANGE_TYPE = get_choice_env("RABBITMQ_EXCHANGE_TYPE", EXCHANGE_TYPES, "fanout")
+
+ROUTING_WORD_INVALID_CHARS = re.compile(r'[^A-Za-z0-9_-]')
+
+def routing_word(value) -> str:
+    """One routing key word: dots and AMQP wildcards would change the key's meaning."""
+    return ROUTING_WORD_INVALID_CHARS.sub("_", str(value or "").strip()) or "unknown"
+
+def build_routing_key(region, camera_id, derivative=None) -> str:
+    """Routing key for topic mode, e.g. "LowerMainland.123" or "LowerMainland.123.thumbnail"."""
+    key = f"{routing_word(region)}.{routing_word(camera_id)}"
+    if derivative:
+        key = f"{key}.{routing_word(derivative)}"
+    return key
+
+def exchange_for(state, lane=None):
+    """The exchange for a publish lane: scripted traffic can have its own (RABBITMQ_SCRIPTED_EXCHANGE_NAME)."""
+    if lane == SCRIPTED_LANE:
+        scripted_exchange = getattr(state, "rabbitmq_scripted_exchange", None)
+        if scripted_exchange is not None:
+            return scripted_exchange
+    return state.rabbitmq_exchange
+
+async def build_message(image_bytes, filename, camera_id, timestamp, headers=None, region="", lane=None) -> Tuple[aio_pika.Message, str, int]:
     """
-    Sends the image to RabbitMQ with the provided camera_id, filename, and timestamp.
-    The timestamp should already be in compact UTC format (YYYYMMDDTHHMMSSZ).
+    Builds the message for one image. Returns it with its routing key and the
+    number of image bytes kept off the broker, which is non-zero only in
+    claim-check mode. Extra `headers` are added to the standard ones, and the
+    lane's AMQP priority is set if PUBLISH_LANE_PRIORITIES configures one.
     """
 
     dt = datetime.fromisoformat(timestamp)
@@ -18,28 +57,107 @@ async def send_to_rabbitmq(request, image_bytes, filename, camera_id, timestamp)
     processed_dt = datetime.now(timezone.utc)
     processed_timestamp = processed_dt.strftime("%Y%m%d%H%M%S") + f"{int(processed_dt.microsecond / 1000):03d}"
 
+    headers = {
+        **(headers or {}),
+        "camera_id": camera_id,
+        "filename": filename,
+        "timestamp": formatted_timestamp,
+        "processed_timestamp": processed_timestamp
+    }
+    if RABBITMQ_EXCHANGE_TYPE == "topic":
+        routing_key = build_routing_key(region, camera_id, headers.get("derivative"))
+    else:
+        routing_key = ""
+        if RABBITMQ_EXCHANGE_TYPE == "headers":
+            headers["region"] = (region or "").strip()
+
+    body = image_bytes
+    bytes_saved = 0
+
+    # Claim-check mode: park the image in the blob store and publish only a reference
+    if blobstore.blob_store is not None:
+        try:
+            headers.update(await blobstore.blob_store.check_in(image_bytes, camera_id, filename))
+            body = b""
+            bytes_saved = len(image_bytes)
+        except Exception as e:
+            blobstore.claim_check_failures_counter.inc()
+            logger.warning("Blob store write failed for camera_id=%s, publishing inline: %s", camera_id, e)
+
+    message = aio_pika.Message(
+        body=body,
+        headers=headers,
+        delivery_mode=aio_pika.DeliveryMode.PERSISTENT,
+        priority=LANE_PRIORITIES.get(lane)
+    )
+    return message, routing_key, bytes_saved
+
+async def send_to_rabbitmq(request, image_bytes, filename, camera_id, timestamp, headers=None, region="", lane=None):
+    """
+    Sends the image to RabbitMQ with the provided camera_id, filename, and timestamp.
+    The timestamp should already be in compact UTC format (YYYYMMDDTHHMMSSZ).
+    """
+
     try:
-        exchange = request.app.state.rabbitmq_exchange
+        message, routing_key, bytes_saved = await build_message(image_bytes, filename, camera_id, timestamp, headers, region, lane)
+        exchange = exchange_for(request.app.state, lane)
         channel_lock = getattr(request.app.state, "rabbitmq_channel_lock", None)
 
-        message = aio_pika.Message(
-            body=image_bytes,
-            headers={
-                "camera_id": camera_id,
-                "filename": filename,
-                "timestamp": formatted_timestamp,
-                "processed_timestamp": processed_timestamp
-            },
-            delivery_mode=aio_pika.DeliveryMode.PERSISTENT
-        )
-
         if channel_lock:
             async with channel_lock:
-                await exchange.publish(message, routing_key="")
+                await exchange.publish(message, routing_key=routing_key)
         else:
-            await exchange.publish(message, routing_key="")
+            await exchange.publish(message, routing_key=routing_key)
 
-        logger.debug(f"Published message for camera_id={camera_id} at {timestamp}")
+        if bytes_saved:
+            blobstore.claim_check_bytes_saved_counter.inc(bytes_saved)
+        logger.debug("Published message for camera_id=%s at %s", camera_id, timestamp)
     except Exception as e:
-        logger.error(f"Failed to publish message to RabbitMQ: {e}", exc_info=True)
+        logger.error("Failed to publish message to RabbitMQ: %s", e, exc_info=True)
         raise
+
+async def send_batch_to_rabbitmq(request, items: List[dict], lane=None) -> List[Optional[Exception]]:
+    """
+    Publishes many images at once. Each item has image_bytes, filename, camera_id,
+    timestamp and optionally headers and region, as for send_to_rabbitmq. All publishes are issued together
+    under one hold of the channel lock, so their broker confirms are awaited in
+    a single round trip instead of one per image.
+
+    Returns one entry per item: None if it was published, otherwise the error.
+    """
+
+    results: List[Optional[Exception]] = [None] * len(items)
+    built = []
+    for index, item in enumerate(items):
+        try:
+            built.append((index, *await build_message(
+                item["image_bytes"], item["filename"], item["camera_id"], item["timestamp"],
+                item.get("headers"), item.get("region", ""), lane
+            )))
+        except Exception as e:
+            results[index] = e
+
+    exchange = exchange_for(request.app.state, lane)
+    channel_lock = getattr(request.app.state, "rabbitmq_channel_lock", None)
+
+    async def publish_all():
+        return await asyncio.gather(
+            *(exchange.publish(message, routing_key=routing_key) for _, message, routing_key, _ in built),
+            return_exceptions=True
+        )
+
+    if channel_lock:
+        async with channel_lock:
+            outcomes = await publish_all()
+    else:
+        outcomes = await publish_all()
+
+    for (index, _, _, bytes_saved), outcome in zip(built, outcomes):
+        if isinstance(outcome, BaseException):
+            logger.error("Failed to publish batch item for camera_id=%s: %s", items[index]["camera_id"], outcome)
+            results[index] = outcome
+        elif bytes_saved:
+            blobstore.claim_check_bytes_saved_counter.inc(bytes_saved)
+
+    logger.debug("Published batch of %s messages", len(built))
+    return results
@@ -0,0 +1,137 @@
+import math
+import time
+import logging
+from typing import Callable, Dict, Optional, Tuple
+
+from prometheus_client import Counter
+
+from .auth import load_mapping_from_env
+from .config import get_choice_env, get_float_env
+
+
+logger = logging.getLogger(__name__)
+
+# -------------------- Prometheus Counters --------------------
+rate_limited_counter = Counter(
+    "camera_rate_limited_total",
+    "Count of camera uploads rejected or dropped by the per-camera rate limit",
+    ["region"],
+)
+
+RATE_LIMIT_ACTIONS = ("reject", "drop")
+
+
+# -------------------- Token Buckets --------------------
+class _Bucket:
+    __slots__ = ("tokens", "updated")
+
+    def __init__(self, tokens: float, updated: float):
+        self.tokens = tokens
+        self.updated = updated
+
+
+class CameraRateLimiter:
+    """
+    Per-camera token buckets keyed on the authenticated camera ID.
+
+    Policies are resolved per camera first, then per region, then the default.
+    A policy is a dict with "rate" (frames per second) and "burst" (bucket size).
+    Buckets that have been idle long enough to refill completely carry no
+    state worth keeping and are evicted on a periodic sweep.
+    """
+
+    def __init__(
+        self,
+        policies: dict,
+        idle_ttl: float = 600.0,
+        sweep_interval: float = 60.0,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.default_policy = self._parse_policy(policies.get("default"))
+        self.region_policies = {
+            region: self._parse_policy(policy) for region, policy in (policies.get("regions") or {}).items()
+        }
+        self.camera_policies = {
+            str(camera_id): self._parse_policy(policy) for camera_id, policy in (policies.get("cameras") or {}).items()
+        }
+        self.idle_ttl = idle_ttl
+        self.sweep_interval = sweep_interval
+        self._clock = clock
+        self._buckets: Dict[str, _Bucket] = {}
+        self._next_sweep = clock() + sweep_interval
+
+    @staticmethod
+    def _parse_policy(policy) -> Optional[Tuple[float, float]]:
+        if not isinstance(policy, dict):
+            return None
+        try:
+            rate = float(policy["rate"])
+            burst = float(policy.get("burst", 1))
+        except (KeyError, TypeError, ValueError):
+            logger.warning("Ignoring invalid rate limit policy: %s", policy)
+            return None
+        if rate <= 0 or burst < 1:
+            logger.warning("Ignoring non-positive rate limit policy: %s", policy)
+            return None
+        return rate, burst
+
+    def policy_for(self, camera_id: str, region: str) -> Optional[Tuple[float, float]]:
+        return self.camera_policies.get(camera_id) or self.region_policies.get(region) or self.default_policy
+
+    def __len__(self) -> int:
+        return len(self._buckets)
+
+    def allow(self, camera_id: str, region: str = "") -> Tuple[bool, float]:
+        """Take one token for the camera. Returns (allowed, seconds until a token is available)."""
+        now = self._clock()
+        if now >= self._next_sweep:
+            self.evict_idle(now)
+
+        policy = self.policy_for(camera_id, region)
+        if policy is None:
+            return True, 0.0
+        rate, burst = policy
+
+        bucket = self._buckets.get(camera_id)
+        if bucket is None:
+            bucket = self._buckets[camera_id] = _Bucket(burst, now)
+        else:
+            bucket.tokens = min(burst, bucket.tokens + (now - bucket.updated) * rate)
+            bucket.updated = now
+
+        if bucket.tokens >= 1:
+            bucket.tokens -= 1
+            return True, 0.0
+
+        rate_limited_counter.labels(region=region or "unknown").inc()
+        return False, (1 - bucket.tokens) / rate
+
+    def evict_idle(self, now: Optional[float] = None):
+        """Drop buckets that have not been touched within the idle TTL."""
+        now = self._clock() if now is None else now
+        cutoff = now - self.idle_ttl
+        idle = [camera_id for camera_id, bucket in self._buckets.items() if bucket.updated < cutoff]
+        for camera_id in idle:
+            del self._buckets[camera_id]
+        self._next_sweep = now + self.sweep_interval
+        if idle:
+            logger.debug("Evicted %s idle rate limit buckets", len(idle))
+
+
+def retry_after_header(seconds: float) -> str:
+    return str(max(1, math.ceil(seconds)))
+
+
+def build_rate_limiter_from_env() -> Optional[CameraRateLimiter]:
+    """Create the per-camera limiter from CAMERA_RATE_LIMITS, or None if no policies are configured."""
+    policies = load_mapping_from_env("CAMERA_RATE_LIMITS")
+    if not policies:
+        return None
+    return CameraRateLimiter(
+        policies,
+        idle_ttl=get_float_env("CAMERA_RATE_LIMIT_IDLE_SECONDS", 600.0),
+    )
+
+
+camera_rate_limiter = build_rate_limiter_from_env()
+CAMERA_RATE_LIMIT_ACTION = get_choice_env("CAMERA_RATE_LIMIT_ACTION", RATE_LIMIT_ACTIONS, "reject")
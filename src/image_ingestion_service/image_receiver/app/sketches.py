@@ -0,0 +1,254 @@
+# Mergeable quantile sketches of payload size and latency per region.
+#
+# Each worker keeps a DDSketch per region and metric and serves it, with its
+# p50/p95/p99, at /api/sketches. Reports from several workers or pods merge
+# exactly (bin counts add), which quantiles from separate histograms cannot:
+#
+#   curl -s http://pod-a:8000/api/sketches > a.json
+#   curl -s http://pod-b:8000/api/sketches > b.json
+#   python -m app.sketches a.json b.json
+
+import sys
+import json
+import math
+import socket
+import logging
+from typing import Dict, Iterable, Optional
+
+from .config import get_bool_env, get_float_env, get_int_env
+
+
+logger = logging.getLogger(__name__)
+
+REPORTED_QUANTILES = (0.5, 0.95, 0.99)
+OTHER_REGION = "other"
+METRICS = ("payload_bytes", "latency_seconds")
+# Values at or below this are counted as zero rather than given a bin
+MIN_INDEXABLE_VALUE = 1e-9
+
+
+# -------------------- DDSketch --------------------
+class DDSketch:
+    """
+    Quantile sketch with relative error guarantees (DDSketch).
+
+    Values fall into logarithmic bins of ratio gamma = (1 + a) / (1 - a), so
+    any quantile is returned within a relative error `a` of the true value.
+    Two sketches with the same accuracy merge by adding bin counts. Once
+    there are more than `max_bins` bins the lowest ones are collapsed
+    together, which keeps memory fixed and only costs accuracy at the low
+    end, away from the p95/p99 used for sizing.
+    """
+
+    __slots__ = ("relative_accuracy", "max_bins", "_log_gamma", "bins", "zero_count", "count", "sum", "min", "max")
+
+    def __init__(self, relative_accuracy: float = 0.01, max_bins: int = 1024):
+        if not 0 < relative_accuracy < 1:
+            raise ValueError("relative_accuracy must be between 0 and 1")
+        self.relative_accuracy = relative_accuracy
+        self.max_bins = max(1, max_bins)
+        gamma = (1 + relative_accuracy) / (1 - relative_accuracy)
+        self._log_gamma = math.log(gamma)
+        self.bins: Dict[int, int] = {}
+        self.zero_count = 0
+        self.count = 0
+        self.sum = 0.0
+        self.min = math.inf
+        self.max = -math.inf
+
+    def _key(self, value: float) -> int:
+        return math.ceil(math.log(value) / self._log_gamma)
+
+    def _value(self, key: int) -> float:
+        # Midpoint of the bin in relative terms, which bounds the error by relative_accuracy
+        return 2 * math.exp(key * self._log_gamma) / (1 + math.exp(self._log_gamma))
+
+    def add(self, value: float, count: int = 1):
+        self.count += count
+        self.sum += value * count
+        self.min = min(self.min, value)
+        self.max = max(self.max, value)
+        if value <= MIN_INDEXABLE_VALUE:
+            self.zero_count += count
+            return
+        key = self._key(value)
+        bins = self.bins
+        if key in bins:
+            bins[key] += count
+        else:
+            bins[key] = count
+            if len(bins) > self.max_bins:
+                self._collapse()
+
+    def _collapse(self):
+        keys = sorted(self.bins)
+        excess = len(keys) - self.max_bins
+        target = keys[excess]
+        for key in keys[:excess]:
+            self.bins[target] += self.bins.pop(key)
+
+    def merge(self, other: "DDSketch"):
+        if other.relative_accuracy != self.relative_accuracy:
+            raise ValueError("Cannot merge sketches with different relative accuracy")
+        if not other.count:
+            return
+        self.count += other.count
+        self.sum += other.sum
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+        self.zero_count += other.zero_count
+        for key, count in other.bins.items():
+            self.bins[key] = self.bins.get(key, 0) + count
+        if len(self.bins) > self.max_bins:
+            self._collapse()
+
+    def quantile(self, q: float) -> Optional[float]:
+        if not self.count:
+            return None
+        rank = q * (self.count - 1)
+        seen = self.zero_count
+        if seen > rank:
+            return 0.0
+        for key in sorted(self.bins):
+            seen += self.bins[key]
+            if seen > rank:
+                # Never report outside what was actually observed
+                return min(max(self._value(key), self.min), self.max)
+        return self.max
+
+    def to_dict(self) -> dict:
+        return {
+            "relative_accuracy": self.relative_accuracy,
+            "count": self.count,
+            "sum": self.sum,
+            "min": self.min if self.count else None,
+            "max": self.max if self.count else None,
+            "zero_count": self.zero_count,
+            "bins": {str(key): count for key, count in sorted(self.bins.items())},
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict, max_bins: int = 1024) -> "DDSketch":
+        sketch = cls(data["relative_accuracy"], max_bins)
+        sketch.count = data["count"]
+        sketch.sum = data["sum"]
+        if sketch.count:
+            sketch.min = data["min"]
+            sketch.max = data["max"]
+        sketch.zero_count = data["zero_count"]
+        sketch.bins = {int(key): count for key, count in data["bins"].items()}
+        if len(sketch.bins) > sketch.max_bins:
+            sketch._collapse()
+        return sketch
+
+
+def summarize(sketch: DDSketch) -> dict:
+    """Quantiles and totals for one sketch, with its bins so it can be merged elsewhere."""
+    summary = {f"p{round(q * 100)}": sketch.quantile(q) for q in REPORTED_QUANTILES}
+    summary["mean"] = sketch.sum / sketch.count if sketch.count else None
+    summary["sketch"] = sketch.to_dict()
+    return summary
+
+
+# -------------------- Per-Region Sketches --------------------
+class RegionSketches:
+    """
+    A payload size and a latency sketch per Cam_LocationsRegion. At most
+    `max_regions` regions get their own pair; any further ones share the
+    "other" pair, so memory stays fixed however regions are named.
+    """
+
+    def __init__(self, relative_accuracy: float = 0.01, max_bins: int = 1024, max_regions: int = 32):
+        self.relative_accuracy = relative_accuracy
+        self.max_bins = max_bins
+        self.max_regions = max(1, max_regions)
+        self._regions: Dict[str, Dict[str, DDSketch]] = {}
+
+    def _sketches(self, region: str) -> Dict[str, DDSketch]:
+        region = region or OTHER_REGION
+        sketches = self._regions.get(region)
+        if sketches is None:
+            if len(self._regions) >= self.max_regions and region != OTHER_REGION:
+                return self._sketches(OTHER_REGION)
+            sketches = self._regions[region] = {
+                metric: DDSketch(self.relative_accuracy, self.max_bins) for metric in METRICS
+            }
+        return sketches
+
+    def record(self, region: str, payload_bytes: int, latency_seconds: float):
+        sketches = self._sketches(region)
+        sketches["payload_bytes"].add(payload_bytes)
+        sketches["latency_seconds"].add(latency_seconds)
+
+    def report(self) -> dict:
+        return {
+            "source": socket.gethostname(),
+            "relative_accuracy": self.relative_accuracy,
+            "regions": {
+                region: {metric: summarize(sketch) for metric, sketch in sketches.items()}
+                for region, sketches in sorted(self._regions.items())
+            },
+        }
+
+
+def merge_reports(reports: Iterable[dict], max_bins: int = 1024) -> dict:
+    """Combine /api/sketches reports from several workers into one with the same layout."""
+    merged: Dict[str, Dict[str, DDSketch]] = {}
+    sources = []
+    for report in reports:
+        sources.append(report.get("source"))
+        for region, metrics in report["regions"].items():
+            for metric, summary in metrics.items():
+                sketch = DDSketch.from_dict(summary["sketch"], max_bins)
+                target = merged.setdefault(region, {}).get(metric)
+                if target is None:
+                    merged[region][metric] = sketch
+                else:
+                    target.merge(sketch)
+    return {
+        "sources": sources,
+        "regions": {
+            region: {metric: summarize(sketch) for metric, sketch in metrics.items()}
+            for region, metrics in sorted(merged.items())
+        },
+    }
+
+
+def build_region_sketches_from_env() -> Optional[RegionSketches]:
+    """Create the per-region sketches if REGION_SKETCHES_ENABLED is set."""
+    if not get_bool_env("REGION_SKETCHES_ENABLED", False):
+        return None
+    relative_accuracy = get_float_env("SKETCH_RELATIVE_ACCURACY", 0.01)
+    if not 0 < relative_accuracy < 1:
+        logger.warning("SKETCH_RELATIVE_ACCURACY must be between 0 and 1, got %s, falling back to 0.01.", relative_accuracy)
+        relative_accuracy = 0.01
+    logger.info("Per-region payload size and latency sketches enabled.")
+    return RegionSketches(
+        relative_accuracy=relative_accuracy,
+        max_bins=get_int_env("SKETCH_MAX_BINS", 1024),
+        max_regions=get_int_env("SKETCH_MAX_REGIONS", 32),
+    )
+
+
+region_sketches = build_region_sketches_from_env()
+
+
+def main(argv=None):
+    paths = sys.argv[1:] if argv is None else argv
+    if not paths:
+        print("usage: python -m app.sketches REPORT.json [REPORT.json ...]", file=sys.stderr)
+        sys.exit(2)
+    reports = []
+    for path in paths:
+        with open(path, encoding="utf-8") as f:
+            reports.append(json.load(f))
+    merged = merge_reports(reports)
+    # The merged bins are only needed to merge again; leave them out of the printed summary
+    for metrics in merged["regions"].values():
+        for summary in metrics.values():
+            summary.pop("sketch")
+    print(json.dumps(merged, indent=2))
+
+
+if __name__ == "__main__":
+    main()
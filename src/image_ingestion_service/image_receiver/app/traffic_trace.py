@@ -0,0 +1,153 @@
+import os
+import json
+import time
+import hmac
+import queue
+import hashlib
+import logging
+import logging.handlers
+from typing import Dict, Optional
+
+from .config import get_int_env
+from .logging_config import DeferredQueueHandler
+
+
+logger = logging.getLogger(__name__)
+
+# -------------------- Trace Records --------------------
+class TraceRecord:
+    """
+    Shape of one upload for later replay: arrival time, anonymized camera,
+    region, payload size, per-stage timings and outcome. Never holds image
+    bytes, credentials or client addresses.
+    """
+
+    __slots__ = ("recorder", "arrived", "camera", "region", "size", "stages", "outcome", "finished")
+
+    def __init__(self, recorder: "TrafficRecorder"):
+        self.recorder = recorder
+        self.arrived = time.time()
+        self.camera: Optional[str] = None
+        self.region = ""
+        self.size = 0
+        self.stages: Dict[str, float] = {}
+        self.outcome = ""
+        self.finished = False
+
+    def set_camera(self, camera_id: str, region: str = ""):
+        self.camera = self.recorder.anonymize(camera_id)
+        self.region = region
+
+    def stage(self, name: str, started: float):
+        """Record a stage that began at `started` (time.perf_counter) and ends now."""
+        self.stages[name] = round((time.perf_counter() - started) * 1000, 3)
+
+    def note(self, outcome: str):
+        self.outcome = outcome
+
+    def finish(self, status_code: int):
+        if self.finished:
+            return
+        self.finished = True
+        entry = {"t": round(self.arrived, 3), "c": self.camera, "r": self.region, "n": self.size, "s": self.stages, "o": status_code}
+        if self.outcome:
+            entry["x"] = self.outcome
+        self.recorder.write(entry)
+
+
+class _NullTrace:
+    """Stand-in used when capture is off so call sites need no checks."""
+
+    def set_camera(self, camera_id: str, region: str = ""):
+        pass
+
+    def stage(self, name: str, started: float):
+        pass
+
+    def note(self, outcome: str):
+        pass
+
+    def finish(self, status_code: int):
+        pass
+
+    @property
+    def size(self):
+        return 0
+
+    @size.setter
+    def size(self, value):
+        pass
+
+
+NULL_TRACE = _NullTrace()
+
+
+# -------------------- Recorder --------------------
+class _TraceFormatter(logging.Formatter):
+    def format(self, record):
+        return json.dumps(record.msg, separators=(",", ":"))
+
+
+class TrafficRecorder:
+    """
+    Writes trace records as compact JSON lines to a size-rotated local file.
+
+    Records go through a queue to a background writer thread, the same way
+    application logs do, so capture adds no file I/O to the request path.
+    Camera IDs are replaced by a keyed hash so traces can leave the cluster.
+    """
+
+    def __init__(self, path: str, max_bytes: int = 50 * 1024 * 1024, backups: int = 5, salt: Optional[str] = None):
+        self.path = path
+        self._key = (salt or os.urandom(16).hex()).encode()
+        file_handler = logging.handlers.RotatingFileHandler(path, maxBytes=max_bytes, backupCount=backups)
+        file_handler.setFormatter(_TraceFormatter())
+        self._handler = DeferredQueueHandler(queue.Queue(maxsize=10000))
+        self._listener = logging.handlers.QueueListener(self._handler.queue, file_handler)
+        self._listener.start()
+
+    def anonymize(self, camera_id: str) -> str:
+        return hmac.new(self._key, str(camera_id).encode(), hashlib.sha256).hexdigest()[:12]
+
+    def start(self) -> TraceRecord:
+        return TraceRecord(self)
+
+    def write(self, entry: dict):
+        self._handler.handle(logging.makeLogRecord({"msg": entry, "levelno": logging.INFO, "levelname": "INFO"}))
+
+    def close(self):
+        if self._listener is not None:
+            self._listener.stop()
+            self._listener = None
+
+
+def build_recorder_from_env() -> Optional[TrafficRecorder]:
+    """Enable capture if TRAFFIC_TRACE_PATH is set."""
+    path = os.getenv("TRAFFIC_TRACE_PATH")
+    if not path:
+        return None
+    logger.info("Traffic trace capture enabled, writing to %s", path)
+    return TrafficRecorder(
+        path,
+        max_bytes=get_int_env("TRAFFIC_TRACE_MAX_BYTES", 50 * 1024 * 1024),
+        backups=get_int_env("TRAFFIC_TRACE_BACKUPS", 5),
+        salt=os.getenv("TRAFFIC_TRACE_SALT"),
+    )
+
+
+traffic_recorder = build_recorder_from_env()
+
+
+# -------------------- Request Helpers --------------------
+def start_trace(request) -> TraceRecord:
+    """Begin a trace for this request if capture is on, otherwise return the null trace."""
+    if traffic_recorder is None:
+        return NULL_TRACE
+    trace = getattr(request.state, "trace", None)
+    if trace is None:
+        trace = request.state.trace = traffic_recorder.start()
+    return trace
+
+
+def get_trace(request) -> TraceRecord:
+    return getattr(request.state, "trace", None) or NULL_TRACE
@@ -0,0 +1,197 @@
+import math
+import time
+import zlib
+import logging
+from array import array
+from typing import Dict, List, Optional
+
+from prometheus_client import Gauge
+
+from .config import get_bool_env, get_int_env
+
+
+logger = logging.getLogger(__name__)
+
+# Response header suggesting when a camera should upload next, as an RFC 8941
+# dictionary: "delay=37.5, interval=60.0" (seconds from now, and the cadence
+# the suggestion assumes). Clients that don't know it ignore it.
+SCHEDULE_HINT_HEADER = "Upload-Schedule"
+GOLDEN_RATIO_FRACTION = (math.sqrt(5) - 1) / 2
+# Arrivals within this share of the interval (or 1s) of their phase count as on schedule
+ON_PHASE_TOLERANCE = 0.02
+REPORTED_INTERVAL_GROUPS = 10
+
+# -------------------- Prometheus Metrics --------------------
+peak_to_mean_gauge = Gauge("upload_arrivals_peak_to_mean", "Busiest second over the mean uploads per second in the arrival window")
+dispersion_gauge = Gauge(
+    "upload_arrivals_dispersion_index",
+    "Variance over mean of uploads per second in the arrival window; 1 for random arrivals, higher when bursty",
+)
+
+
+# -------------------- Phase Assignment --------------------
+def phase_fraction(camera_id: str) -> float:
+    """
+    The camera's position in [0, 1) of its upload interval. Numeric IDs are
+    spaced by the golden ratio, which spreads any run of consecutive IDs
+    evenly; other IDs are hashed. Either way every pod gives the same answer.
+    """
+    if camera_id.isdigit():
+        return (int(camera_id) * GOLDEN_RATIO_FRACTION) % 1.0
+    return zlib.crc32(camera_id.encode()) / 2 ** 32
+
+
+def hint_interval(expected_interval: float) -> float:
+    # Whole seconds, so small jitter in the measured cadence does not move the phase
+    return max(1.0, float(round(expected_interval)))
+
+
+def next_upload_delay(camera_id: str, interval: float, now: float) -> float:
+    """
+    Seconds until the camera's next phase, between half and one and a half
+    intervals away so a camera already on schedule is told to keep its cadence.
+    """
+    phase = phase_fraction(camera_id) * interval
+    delay = (phase - now) % interval
+    if delay < interval / 2:
+        delay += interval
+    return delay
+
+
+def format_schedule_hint(delay: float, interval: float) -> str:
+    return f"delay={delay:.1f}, interval={interval:.1f}"
+
+
+# -------------------- Arrival Window --------------------
+class ArrivalWindow:
+    """Uploads per second over the last `seconds`, in a ring of counters."""
+
+    def __init__(self, seconds: int):
+        self.seconds = max(2, seconds)
+        self._counts = array("L", [0] * self.seconds)
+        self._current: Optional[int] = None
+
+    def record(self, now: float):
+        second = int(now)
+        if self._current is None or second > self._current:
+            start = second - self.seconds + 1 if self._current is None else max(self._current + 1, second - self.seconds + 1)
+            for expired in range(start, second + 1):
+                self._counts[expired % self.seconds] = 0
+            self._current = second
+        elif second <= self._current - self.seconds:
+            # Clock stepped back past the window: count it as now
+            second = self._current
+        self._counts[second % self.seconds] += 1
+
+    def counts(self, now: float) -> List[int]:
+        """Per-second counts for the complete seconds in the window, oldest first."""
+        second = int(now)
+        counts = []
+        for past in range(second - self.seconds + 1, second):
+            if self._current is not None and self._current - self.seconds < past <= self._current:
+                counts.append(self._counts[past % self.seconds])
+            else:
+                counts.append(0)
+        return counts
+
+    def stats(self, now: float) -> dict:
+        counts = self.counts(now)
+        total = sum(counts)
+        mean = total / len(counts)
+        variance = sum((count - mean) ** 2 for count in counts) / len(counts)
+        ordered = sorted(counts)
+        return {
+            "window_seconds": len(counts),
+            "uploads": total,
+            "mean_per_second": round(mean, 3),
+            "p99_per_second": ordered[min(len(ordered) - 1, int(len(ordered) * 0.99))],
+            "max_per_second": ordered[-1],
+            "peak_to_mean": round(ordered[-1] / mean, 2) if mean else None,
+            # 1 for independent (Poisson) arrivals, higher the more they bunch up
+            "dispersion_index": round(variance / mean, 2) if mean else None,
+            "idle_seconds": counts.count(0),
+        }
+
+
+# -------------------- Phase Alignment --------------------
+def phase_alignment(cadences, limit: int = REPORTED_INTERVAL_GROUPS) -> dict:
+    """
+    How the last arrivals of cameras with a known cadence fall within their
+    interval, per (whole-second) interval. `concentration` is the length of
+    the mean phase vector: near 0 when phases are spread out, 1 when every
+    camera uploads in the same instant. `on_phase_share` is the share arriving
+    at their hinted phase, so adherence to the hints can be judged.
+    """
+    groups: Dict[float, dict] = {}
+    for camera_id, last_seen, expected in cadences:
+        interval = hint_interval(expected)
+        group = groups.setdefault(interval, {"cameras": 0, "cos": 0.0, "sin": 0.0, "on_phase": 0, "buckets": {}})
+        offset = last_seen % interval
+        angle = 2 * math.pi * offset / interval
+        group["cameras"] += 1
+        group["cos"] += math.cos(angle)
+        group["sin"] += math.sin(angle)
+        bucket = int(offset)
+        group["buckets"][bucket] = group["buckets"].get(bucket, 0) + 1
+        error = (offset - phase_fraction(camera_id) * interval) % interval
+        if min(error, interval - error) <= max(1.0, interval * ON_PHASE_TOLERANCE):
+            group["on_phase"] += 1
+
+    largest = sorted(groups.items(), key=lambda item: item[1]["cameras"], reverse=True)[:limit]
+    return {
+        "intervals": len(groups),
+        "groups": [
+            {
+                "interval": interval,
+                "cameras": group["cameras"],
+                "concentration": round(math.hypot(group["cos"], group["sin"]) / group["cameras"], 3),
+                "busiest_second_share": round(max(group["buckets"].values()) / group["cameras"], 3),
+                "on_phase_share": round(group["on_phase"] / group["cameras"], 3),
+            }
+            for interval, group in largest
+        ],
+    }
+
+
+# -------------------- Scheduler --------------------
+class UploadScheduler:
+    """Counts upload arrivals and, if `hints` is set, suggests each camera's next upload time."""
+
+    def __init__(self, window_seconds: int = 300, hints: bool = False):
+        self.window = ArrivalWindow(window_seconds)
+        self.hints = hints
+
+    def record_arrival(self, now: Optional[float] = None):
+        self.window.record(time.time() if now is None else now)
+
+    def hint(self, camera_id: str, expected_interval: Optional[float], now: Optional[float] = None) -> Optional[str]:
+        """Upload-Schedule header value, or None if hints are off or the cadence is not known yet."""
+        if not self.hints or not expected_interval:
+            return None
+        now = time.time() if now is None else now
+        interval = hint_interval(expected_interval)
+        return format_schedule_hint(next_upload_delay(camera_id, interval, now), interval)
+
+    def report(self, cadences=None, now: Optional[float] = None) -> dict:
+        now = time.time() if now is None else now
+        report = {"hints": self.hints, "arrivals": self.window.stats(now)}
+        if cadences is not None:
+            report["phases"] = phase_alignment(cadences)
+        return report
+
+
+def build_upload_scheduler_from_env() -> Optional[UploadScheduler]:
+    """Arrival tracking if UPLOAD_SCHEDULE_ENABLED is set; hints also need UPLOAD_SCHEDULE_HINTS."""
+    if not get_bool_env("UPLOAD_SCHEDULE_ENABLED", False):
+        return None
+    scheduler = UploadScheduler(
+        window_seconds=get_int_env("UPLOAD_ARRIVAL_WINDOW_SECONDS", 300),
+        hints=get_bool_env("UPLOAD_SCHEDULE_HINTS", False),
+    )
+    peak_to_mean_gauge.set_function(lambda: scheduler.window.stats(time.time())["peak_to_mean"] or 0.0)
+    dispersion_gauge.set_function(lambda: scheduler.window.stats(time.time())["dispersion_index"] or 0.0)
+    logger.info("Upload arrival tracking enabled%s", ", with schedule hints" if scheduler.hints else "")
+    return scheduler
+
+
+upload_scheduler = build_upload_scheduler_from_env()
@@ -0,0 +1,246 @@
+# Microbenchmarks for the authentication hot path.
+#
+# Times the helpers that run on every upload and authenticate_request as a
+# whole over synthetic credential caches (1k-50k cameras) and scripted IP
+# mappings (10-500 CIDRs), with accept/reject mixes. Results are reported in
+# microseconds per call and can be checked against regression thresholds:
+#
+#   python -m benchmarks.auth_bench                         # full run, JSON report
+#   python -m benchmarks.auth_bench --check                 # fail if over benchmarks/auth_thresholds.json
+#   python -m benchmarks.auth_bench --write-thresholds      # re-baseline with 3x headroom
+
+import sys
+import json
+import time
+import base64
+import asyncio
+import logging
+import argparse
+import ipaddress
+from pathlib import Path
+from typing import Callable, Dict, List
+from unittest import mock
+
+from .standins import configure_environment
+
+configure_environment()
+
+from fastapi import HTTPException  # noqa: E402
+from fastapi.security import HTTPBasicCredentials  # noqa: E402
+from starlette.requests import Request  # noqa: E402
+
+from app import auth  # noqa: E402
+
+
+THRESHOLDS_FILE = Path(__file__).with_name("auth_thresholds.json")
+CACHE_SIZES = (1000, 10000, 50000)
+CIDR_COUNTS = (10, 100, 500)
+REGIONS = ("LowerMainland", "Northern", "SouthernInterior")
+PASSWORD = "bench_password"
+
+# Share of each scenario in a request mix
+MIXES: Dict[str, Dict[str, int]] = {
+    "all_accept": {"camera_accept": 9, "scripted_accept": 1},
+    "mostly_accept": {"camera_accept": 8, "scripted_accept": 1, "bad_password": 1},
+    "reject_heavy": {"camera_accept": 4, "bad_password": 2, "unknown_camera": 2, "ip_mismatch": 2},
+}
+
+
+# -------------------- Synthetic Data --------------------
+def camera_ip(index: int) -> str:
+    return str(ipaddress.IPv4Address(0x0A000000 + index))
+
+
+def build_cache(size: int) -> Dict[str, dict]:
+    return {
+        str(index): {
+            "ID": index,
+            "Cam_InternetFTP_Folder": f"/cams/{index}",
+            "Cam_InternetFTP_Filename": f"{index}.jpg",
+            "Cam_LocationsRegion": REGIONS[index % len(REGIONS)],
+            "Cam_MaintenancePublic_IP": camera_ip(index),
+        }
+        for index in range(1, size + 1)
+    }
+
+
+def build_scripted_mapping(cidr_count: int) -> Dict[str, List[str]]:
+    # Spread the CIDRs over a handful of scripted sources, last one is the one used
+    sources = {f"Scripted{source}": [] for source in range(5)}
+    for index in range(cidr_count):
+        network = ipaddress.IPv4Network((0xC0A80000 + index * 256, 24))
+        sources[f"Scripted{index % 5}"].append(str(network))
+    return sources
+
+
+def build_credentials() -> Dict[str, dict]:
+    names = list(REGIONS) + [f"Scripted{source}" for source in range(5)]
+    return {name: {"username": f"{name}_user", "password": PASSWORD} for name in names}
+
+
+def make_request(camera_id: str, client_ip: str) -> Request:
+    headers = [
+        (b"content-disposition", f'attachment; filename="{camera_id}.jpg"'.encode()),
+        (b"forwarded", f"for={client_ip};proto=https".encode()),
+        (b"authorization", b"Basic " + base64.b64encode(b"x:y")),
+    ]
+    return Request({
+        "type": "http",
+        "method": "POST",
+        "path": "/api/images",
+        "headers": headers,
+        "query_string": b"",
+        "client": ("127.0.0.1", 50000),
+    })
+
+
+def scenario_requests(cache_size: int, scripted: Dict[str, List[str]]):
+    """(request, credentials) pairs for each accept/reject scenario."""
+    camera_index = cache_size // 2
+    region = REGIONS[camera_index % len(REGIONS)]
+    good = HTTPBasicCredentials(username=f"{region}_user", password=PASSWORD)
+    last_source = f"Scripted{(sum(len(v) for v in scripted.values()) - 1) % 5}"
+    scripted_ip = str(next(ipaddress.IPv4Network(scripted[last_source][-1]).hosts()))
+    return {
+        "camera_accept": (make_request(str(camera_index), camera_ip(camera_index)), good),
+        "scripted_accept": (
+            make_request(str(camera_index), scripted_ip),
+            HTTPBasicCredentials(username=f"{last_source}_user", password=PASSWORD),
+        ),
+        "bad_password": (
+            make_request(str(camera_index), camera_ip(camera_index)),
+            HTTPBasicCredentials(username=f"{region}_user", password="wrong"),
+        ),
+        "unknown_camera": (make_request(str(cache_size + 10), camera_ip(1)), good),
+        "ip_mismatch": (make_request(str(camera_index), "172.16.0.1"), good),
+    }
+
+
+# -------------------- Timing --------------------
+def time_per_call(func: Callable[[], object], repeat: int = 5, min_time: float = 0.05) -> float:
+    """Best-of-N microseconds per call, with the loop count sized to min_time."""
+    loops = 1
+    while True:
+        start = time.perf_counter()
+        for _ in range(loops):
+            func()
+        if time.perf_counter() - start >= min_time:
+            break
+        loops *= 2
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for _ in range(loops):
+            func()
+        best = min(best, (time.perf_counter() - start) / loops)
+    return best * 1e6
+
+
+def time_authenticate(loop: asyncio.AbstractEventLoop, sequence, repeat: int = 5) -> float:
+    async def run_sequence():
+        for request, credentials in sequence:
+            try:
+                await auth.authenticate_request(request, credentials)
+            except HTTPException:
+                pass
+
+    return time_per_call(lambda: loop.run_until_complete(run_sequence()), repeat=repeat) / len(sequence)
+
+
+def helper_cases(cache: Dict[str, dict]) -> Dict[str, Callable[[], object]]:
+    forwarded = make_request("123", "10.1.2.3")
+    direct = Request({"type": "http", "headers": [], "client": ("10.1.2.3", 1)})
+    return {
+        "get_client_ip[forwarded]": lambda: auth.get_client_ip(forwarded),
+        "get_client_ip[direct]": lambda: auth.get_client_ip(direct),
+        "get_client_proto": lambda: auth.get_client_proto(forwarded),
+        "normalize_and_validate_ip[address]": lambda: auth.normalize_and_validate_ip("10.1.2.3:8080"),
+        "normalize_and_validate_ip[cidr]": lambda: auth.normalize_and_validate_ip("192.168.4.0/24"),
+        "check_ip_match[address]": lambda: auth.check_ip_match("10.1.2.3", "10.1.2.3"),
+        "check_ip_match[cidr]": lambda: auth.check_ip_match("192.168.4.20", "192.168.4.0/24"),
+        "camera_id_from_filename": lambda: auth.camera_id_from_filename("../uploads/123456.jpg"),
+        "content_disposition_parse": lambda: auth.camera_id_from_filename(
+            'attachment; filename="123456.jpg"'.split("filename=")[-1].strip('"')
+        ),
+        "validate_id_and_get_camera_record[hit]": lambda: auth.validate_id_and_get_camera_record(cache, "500"),
+        "validate_id_and_get_camera_record[miss]": lambda: _swallow(auth.validate_id_and_get_camera_record, cache, "99999999"),
+    }
+
+
+def _swallow(func, *args):
+    try:
+        func(*args)
+    except ValueError:
+        pass
+
+
+def run(cache_sizes=CACHE_SIZES, cidr_counts=CIDR_COUNTS) -> Dict[str, float]:
+    results: Dict[str, float] = {}
+    credentials = build_credentials()
+
+    for name, func in helper_cases(build_cache(1000)).items():
+        results[name] = time_per_call(func)
+    for cidr_count in cidr_counts:
+        with mock.patch.object(auth, "SCRIPTED_IP_MAPPING", build_scripted_mapping(cidr_count)):
+            # A camera upload checks every scripted network before falling through
+            results[f"find_scripted_source[miss,cidrs={cidr_count}]"] = time_per_call(lambda: auth.find_scripted_source("172.16.0.1"))
+
+    loop = asyncio.new_event_loop()
+    try:
+        for cache_size in cache_sizes:
+            cache = build_cache(cache_size)
+            for cidr_count in cidr_counts:
+                scripted = build_scripted_mapping(cidr_count)
+                scenarios = scenario_requests(cache_size, scripted)
+                with mock.patch.dict(auth.CREDENTIAL_CACHE, cache, clear=True), \
+                        mock.patch.object(auth, "SCRIPTED_IP_MAPPING", scripted), \
+                        mock.patch.object(auth, "LOCATION_USER_PASS_MAPPING", credentials):
+                    for mix_name, weights in MIXES.items():
+                        sequence = [scenarios[scenario] for scenario, weight in weights.items() for _ in range(weight)]
+                        key = f"authenticate_request[mix={mix_name},cameras={cache_size},cidrs={cidr_count}]"
+                        results[key] = time_authenticate(loop, sequence)
+    finally:
+        loop.close()
+    return {name: round(value, 3) for name, value in results.items()}
+
+
+def check(results: Dict[str, float], thresholds: Dict[str, float]) -> List[str]:
+    failures = []
+    for name, limit in thresholds.items():
+        measured = results.get(name)
+        if measured is not None and measured > limit:
+            failures.append(f"{name}: {measured:.2f}us > {limit:.2f}us")
+    return failures
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Authentication hot path microbenchmarks")
+    parser.add_argument("--quick", action="store_true", help="only the smallest and largest cache and mapping sizes")
+    parser.add_argument("--check", action="store_true", help="exit non-zero if any case exceeds its threshold")
+    parser.add_argument("--thresholds", default=str(THRESHOLDS_FILE), help="threshold file (us per call)")
+    parser.add_argument("--write-thresholds", action="store_true", help="write measured times x --headroom as new thresholds")
+    parser.add_argument("--headroom", type=float, default=3.0)
+    parser.add_argument("--with-logging", action="store_true", help="keep auth log lines enabled while timing")
+    args = parser.parse_args(argv)
+
+    if not args.with_logging:
+        logging.disable(logging.CRITICAL)
+
+    sizes = (CACHE_SIZES[0], CACHE_SIZES[-1]) if args.quick else CACHE_SIZES
+    cidrs = (CIDR_COUNTS[0], CIDR_COUNTS[-1]) if args.quick else CIDR_COUNTS
+    results = run(sizes, cidrs)
+    print(json.dumps({"unit": "us_per_call", "results": results}, indent=2))
+
+    if args.write_thresholds:
+        thresholds = {name: round(value * args.headroom, 2) for name, value in results.items()}
+        Path(args.thresholds).write_text(json.dumps(thresholds, indent=2, sort_keys=True) + "\n")
+
+    if args.check:
+        failures = check(results, json.loads(Path(args.thresholds).read_text()))
+        if failures:
+            print("Auth benchmark regressions:\n  " + "\n  ".join(failures), file=sys.stderr)
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+# Header-only JPEG metadata extraction versus Pillow.
+#
+# For each camera frame profile, times the marker-level parser in app/jpeg_meta.py
+# (fed in upload-sized chunks, as it runs while the body streams) against
+# opening the frame with Pillow to read its size and EXIF, and against a full
+# Pillow decode. Reports microseconds per frame and the speed-up as JSON:
+#
+#   python -m benchmarks.jpeg_meta_bench
+#   python -m benchmarks.jpeg_meta_bench --chunk-size 16384 --output jpeg_meta.json
+
+import json
+import argparse
+from io import BytesIO
+from pathlib import Path
+from typing import Dict
+
+from PIL import Image
+
+from app.jpeg_meta import JpegMetadataParser
+from .auth_bench import time_per_call
+from .standins import JPEG_PROFILES, synthetic_jpeg
+
+
+def frame_with_exif(width: int, height: int) -> bytes:
+    """A synthetic frame re-saved with an EXIF block, as Axis cameras send."""
+    exif = Image.Exif()
+    exif[0x010F] = "AXIS"
+    exif[0x8769] = {0x9003: "2025:08:19 14:23:45"}
+    with Image.open(BytesIO(synthetic_jpeg(width, height, seed=1))) as img:
+        buffer = BytesIO()
+        img.save(buffer, format="JPEG", quality=85, exif=exif.tobytes())
+    return buffer.getvalue()
+
+
+def parse_streamed(data: bytes, chunk_size: int) -> dict:
+    # memoryview slices, so the harness does not copy chunks the server would already have
+    view = memoryview(data)
+    parser = JpegMetadataParser()
+    for start in range(0, len(data), chunk_size):
+        parser.feed(view[start:start + chunk_size])
+    return parser.as_headers()
+
+
+def pillow_open(data: bytes) -> dict:
+    with Image.open(BytesIO(data)) as img:
+        exif = img.getexif().get_ifd(0x8769)
+        return {"size": img.size, "mode": img.mode, "taken": exif.get(0x9003)}
+
+
+def pillow_decode(data: bytes):
+    with Image.open(BytesIO(data)) as img:
+        img.load()
+
+
+def run(chunk_size: int) -> Dict[str, dict]:
+    results = {}
+    for width, height, _ in JPEG_PROFILES:
+        data = frame_with_exif(width, height)
+        headers = parse_streamed(data, chunk_size)
+        assert headers["image_width"] == width and headers["exif_datetime_original"] == "2025-08-19T14:23:45"
+
+        parser_us = time_per_call(lambda: parse_streamed(data, chunk_size))
+        open_us = time_per_call(lambda: pillow_open(data))
+        decode_us = time_per_call(lambda: pillow_decode(data), repeat=3)
+        results[f"{width}x{height}"] = {
+            "bytes": len(data),
+            "marker_parser_us": round(parser_us, 2),
+            "pillow_open_us": round(open_us, 2),
+            "pillow_decode_us": round(decode_us, 2),
+            "speedup_vs_open": round(open_us / parser_us, 1),
+            "speedup_vs_decode": round(decode_us / parser_us, 1),
+        }
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Header-only JPEG metadata extraction versus Pillow")
+    parser.add_argument("--chunk-size", type=int, default=65536, help="bytes per feed() call, like request.stream() chunks")
+    parser.add_argument("--output", help="write the JSON report to this file instead of stdout")
+    args = parser.parse_args(argv)
+
+    output = json.dumps(run(args.chunk_size), indent=2)
+    if args.output:
+        Path(args.output).write_text(output + "\n")
+    else:
+        print(output)
+
+
+if __name__ == "__main__":
+    main()
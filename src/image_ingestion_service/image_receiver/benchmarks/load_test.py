@@ -0,0 +1,182 @@
+# End-to-end load test for the image receiver.
+#
+# Runs the real app.main:app in process against the in-process AMQP stand-in
+# and a SQLite copy of the [Cams] table, simulates N cameras uploading
+# realistic JPEGs on their own schedules, and prints a JSON report:
+#
+#   python -m benchmarks.load_test --cameras 500 --interval 5 --duration 60 --output report.json
+
+import gc
+import os
+import sys
+import json
+import time
+import random
+import asyncio
+import argparse
+import resource
+import tempfile
+import tracemalloc
+from collections import Counter
+from typing import Dict, List, Tuple
+
+from .standins import (
+    InProcessBroker, SqliteCameraStore, configure_environment, running_app,
+    pick_profile, synthetic_jpeg, upload_headers, with_comment,
+)
+
+
+def percentiles(values: List[float], points=(50, 90, 95, 99)) -> Dict[str, float]:
+    if not values:
+        return {}
+    ordered = sorted(values)
+    result = {}
+    for point in points:
+        index = min(len(ordered) - 1, max(0, round(point / 100 * len(ordered)) - 1))
+        result[f"p{point}"] = ordered[index]
+    result["max"] = ordered[-1]
+    result["mean"] = sum(ordered) / len(ordered)
+    return result
+
+
+def scaled(summary: Dict[str, float], factor: float) -> Dict[str, float]:
+    return {key: round(value * factor, 3) for key, value in summary.items()}
+
+
+def max_rss_bytes() -> int:
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes, macOS bytes
+    return rss if sys.platform == "darwin" else rss * 1024
+
+
+# -------------------- Event Loop Lag --------------------
+async def sample_loop_lag(samples: List[float], stop: asyncio.Event, period: float = 0.01):
+    loop = asyncio.get_running_loop()
+    while not stop.is_set():
+        expected = loop.time() + period
+        await asyncio.sleep(period)
+        samples.append(max(0.0, loop.time() - expected))
+
+
+# -------------------- Simulated Cameras --------------------
+async def camera_loop(client, camera_id: str, payload: bytes, args, deadline: float, results: List[Tuple[float, int]]):
+    loop = asyncio.get_running_loop()
+    rng = random.Random(camera_id)
+    headers = upload_headers(camera_id)
+    frame = 0
+
+    # Spread first uploads over one interval, like cameras booted at different times
+    await asyncio.sleep(rng.uniform(0, args.interval))
+    while loop.time() < deadline:
+        frame += 1
+        body = with_comment(payload, f"{camera_id}:{frame}".encode())
+        start = time.perf_counter()
+        try:
+            response = await client.post("/api/images", content=body, headers=headers)
+            status = response.status_code
+        except Exception:
+            status = 0
+        elapsed = time.perf_counter() - start
+        results.append((elapsed, status))
+
+        wait = args.interval * rng.uniform(1 - args.jitter, 1 + args.jitter) - elapsed
+        await asyncio.sleep(max(0.0, wait))
+
+
+async def run(args) -> dict:
+    configure_environment()
+    broker = InProcessBroker(publish_latency=args.publish_latency, publish_jitter=args.publish_jitter)
+    database = tempfile.NamedTemporaryFile(suffix=".sqlite3", delete=False)
+    database.close()
+    store = SqliteCameraStore(database.name, args.cameras)
+
+    rng = random.Random(args.seed)
+    payload_pool = {}
+    payloads = {}
+    for camera_id in store.camera_ids:
+        profile = pick_profile(rng)
+        if profile not in payload_pool:
+            payload_pool[profile] = synthetic_jpeg(*profile, seed=args.seed)
+        payloads[camera_id] = payload_pool[profile]
+
+    results: List[Tuple[float, int]] = []
+    lag_samples: List[float] = []
+    stop = asyncio.Event()
+
+    gc.collect()
+    if args.tracemalloc:
+        tracemalloc.start()
+
+    try:
+        async with running_app(broker, store) as client:
+            lag_task = asyncio.create_task(sample_loop_lag(lag_samples, stop))
+            loop = asyncio.get_running_loop()
+            started = time.perf_counter()
+            deadline = loop.time() + args.duration
+            await asyncio.gather(*(
+                camera_loop(client, camera_id, payloads[camera_id], args, deadline, results)
+                for camera_id in store.camera_ids
+            ))
+            wall = time.perf_counter() - started
+            stop.set()
+            await lag_task
+    finally:
+        os.unlink(database.name)
+
+    traced_peak = tracemalloc.get_traced_memory()[1] if args.tracemalloc else None
+    if args.tracemalloc:
+        tracemalloc.stop()
+
+    latencies = [elapsed for elapsed, _ in results]
+    payload_sizes = [len(payloads[camera_id]) for camera_id in store.camera_ids]
+    return {
+        "config": {
+            "cameras": args.cameras,
+            "interval_s": args.interval,
+            "jitter": args.jitter,
+            "duration_s": args.duration,
+            "publish_latency_s": args.publish_latency,
+            "seed": args.seed,
+        },
+        "requests": len(results),
+        "wall_time_s": round(wall, 3),
+        "requests_per_second": round(len(results) / wall, 2) if wall else 0.0,
+        "status_counts": {str(status): count for status, count in sorted(Counter(s for _, s in results).items())},
+        "latency_ms": scaled(percentiles(latencies), 1000),
+        "event_loop_lag_ms": scaled(percentiles(lag_samples), 1000),
+        "payload_bytes_mean": round(sum(payload_sizes) / len(payload_sizes)) if payload_sizes else 0,
+        "memory": {
+            "max_rss_bytes": max_rss_bytes(),
+            "tracemalloc_peak_bytes": traced_peak,
+        },
+        "broker": broker.summary(),
+    }
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="End-to-end load test for the image receiver")
+    parser.add_argument("--cameras", type=int, default=200, help="number of simulated cameras")
+    parser.add_argument("--interval", type=float, default=5.0, help="seconds between uploads per camera")
+    parser.add_argument("--jitter", type=float, default=0.1, help="relative jitter applied to each interval")
+    parser.add_argument("--duration", type=float, default=30.0, help="test length in seconds")
+    parser.add_argument("--publish-latency", type=float, default=0.002, help="simulated broker confirm latency in seconds")
+    parser.add_argument("--publish-jitter", type=float, default=0.0, help="extra random broker latency in seconds")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--tracemalloc", action="store_true", help="also report the Python allocation high-water mark (slower)")
+    parser.add_argument("--output", help="write the JSON report to this file instead of stdout")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    report = asyncio.run(run(args))
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as handle:
+            handle.write(output + "\n")
+    else:
+        print(output)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,226 @@
+# Replay a captured traffic trace against a local instance.
+#
+# Traces are written by the service when TRAFFIC_TRACE_PATH is set (see
+# app/traffic_trace.py). This tool re-drives uploads with the same arrival
+# pattern, per-region mix and payload sizes, using synthetic JPEGs. Each
+# traced camera is replayed as a camera of the same region, so credentials
+# chosen by region match the camera they are sent with:
+#
+#   python -m benchmarks.replay trace.jsonl                      # in-process app with stand-ins
+#   python -m benchmarks.replay trace.jsonl --speed 4            # same shape, four times faster
+#   python -m benchmarks.replay trace.jsonl --url http://localhost:8000 \
+#       --credentials creds.json --camera-ids ids.json           # a running instance
+
+import os
+import glob
+import json
+import time
+import asyncio
+import argparse
+import tempfile
+from collections import Counter
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from .load_test import percentiles, scaled
+from .standins import (
+    BENCH_PASSWORD, BENCH_REGION, BENCH_USERNAME, InProcessBroker, SqliteCameraStore,
+    configure_environment, running_app, sized_jpeg, upload_headers, with_comment,
+)
+
+# --camera-ids and --credentials key for records without a region, and the fallback for any region not listed
+ANY_REGION = "*"
+
+
+def load_trace(path: str) -> List[dict]:
+    """Read a trace file and its rotated backups (path.1, path.2, ...), sorted by arrival time."""
+    backups = [name for name in glob.glob(f"{glob.escape(path)}.*") if name.rsplit(".", 1)[1].isdigit()]
+    records = []
+    for name in backups + [path]:
+        if not Path(name).exists():
+            continue
+        with open(name) as handle:
+            for line in handle:
+                line = line.strip()
+                if line:
+                    records.append(json.loads(line))
+    records.sort(key=lambda record: record["t"])
+    return records
+
+
+def trace_cameras_by_region(records: List[dict]) -> Dict[str, set]:
+    """The distinct anonymized camera IDs of each region in the trace."""
+    cameras: Dict[str, set] = {}
+    for record in records:
+        cameras.setdefault(record.get("r") or ANY_REGION, set()).add(record.get("c") or "unknown")
+    return cameras
+
+
+class CameraMapper:
+    """
+    Maps anonymized trace camera IDs onto camera IDs the target instance
+    knows, round robin within the record's region: `camera_ids` is
+    {"<region>" or "*": [IDs]}, with "*" used for regions not listed.
+    """
+
+    def __init__(self, camera_ids: Dict[str, List[str]]):
+        self.camera_ids = camera_ids
+        self._assigned: Dict[tuple, str] = {}
+        self._used: Dict[str, int] = {}
+
+    def ids_for(self, region: Optional[str]) -> List[str]:
+        return self.camera_ids.get(region or ANY_REGION) or self.camera_ids.get(ANY_REGION) or []
+
+    def __call__(self, anonymized: Optional[str], region: Optional[str] = None) -> str:
+        key = (region or ANY_REGION, anonymized or "unknown")
+        if key not in self._assigned:
+            ids = self.ids_for(region)
+            used = self._used.get(key[0], 0)
+            self._assigned[key] = ids[used % len(ids)]
+            self._used[key[0]] = used + 1
+        return self._assigned[key]
+
+
+class PayloadFactory:
+    """Synthetic JPEGs of the traced sizes, unique per upload so dedup does not kick in."""
+
+    def __init__(self):
+        self._by_size: Dict[int, bytes] = {}
+        self._counter = 0
+
+    def __call__(self, size: int) -> bytes:
+        size = max(size, 1024)
+        if size not in self._by_size:
+            self._by_size[size] = sized_jpeg(size - 16)
+        self._counter += 1
+        return with_comment(self._by_size[size], self._counter.to_bytes(12, "big"))
+
+
+async def replay(client, records: List[dict], mapper: CameraMapper, credentials: Dict[str, dict], args) -> dict:
+    payloads = PayloadFactory()
+    loop = asyncio.get_running_loop()
+    origin = records[0]["t"]
+    started = loop.time()
+    results = []
+    schedule_lag = []
+
+    async def send(record: dict):
+        due = started + (record["t"] - origin) / args.speed
+        delay = due - loop.time()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        schedule_lag.append(max(0.0, loop.time() - due))
+
+        camera_id = mapper(record.get("c"), record.get("r"))
+        creds = credentials.get(record.get("r") or ANY_REGION) or credentials.get(ANY_REGION) or {}
+        username = creds.get("username", BENCH_USERNAME)
+        password = creds.get("password", BENCH_PASSWORD)
+        if args.reproduce_rejects and record.get("x") == "auth_rejected":
+            password = password + "-rejected"
+        headers = upload_headers(camera_id, username, password)
+
+        begin = time.perf_counter()
+        try:
+            response = await client.post("/api/images", content=payloads(record.get("n", 0)), headers=headers)
+            status = response.status_code
+        except Exception:
+            status = 0
+        results.append((time.perf_counter() - begin, status, record.get("o")))
+
+    wall_start = time.perf_counter()
+    await asyncio.gather(*(send(record) for record in records))
+    wall = time.perf_counter() - wall_start
+
+    matched = sum(1 for _, status, original in results if status == original)
+    return {
+        "records": len(records),
+        "trace_span_s": round(records[-1]["t"] - origin, 3),
+        "speed": args.speed,
+        "wall_time_s": round(wall, 3),
+        "requests_per_second": round(len(results) / wall, 2) if wall else 0.0,
+        "status_counts": {str(status): count for status, count in sorted(Counter(s for _, s, _ in results).items())},
+        "status_match_ratio": round(matched / len(results), 4) if results else 0.0,
+        "region_mix": dict(Counter(record.get("r") or "unknown" for record in records)),
+        "latency_ms": scaled(percentiles([elapsed for elapsed, _, _ in results]), 1000),
+        "schedule_lag_ms": scaled(percentiles(schedule_lag), 1000),
+    }
+
+
+async def run(args) -> dict:
+    records = load_trace(args.trace)
+    if args.limit:
+        records = records[:args.limit]
+    if not records:
+        raise SystemExit(f"No trace records found in {args.trace}")
+
+    credentials = json.loads(Path(args.credentials).read_text()) if args.credentials else {}
+    trace_cameras = trace_cameras_by_region(records)
+
+    if args.url:
+        try:
+            import httpx2 as httpx
+        except ImportError:  # pragma: no cover
+            import httpx
+        if not args.camera_ids:
+            raise SystemExit("--camera-ids is required with --url")
+        mapper = CameraMapper(json.loads(Path(args.camera_ids).read_text()))
+        missing = sorted(region for region in trace_cameras if region != ANY_REGION and not mapper.ids_for(region))
+        if ANY_REGION in trace_cameras and not mapper.ids_for(ANY_REGION):
+            missing.append("(no region)")
+        if missing:
+            raise SystemExit(f"--camera-ids has no cameras for regions {missing} and no \"{ANY_REGION}\" entry")
+        async with httpx.AsyncClient(base_url=args.url, timeout=60) as client:
+            return await replay(client, records, mapper, credentials, args)
+
+    # Seed each trace region with as many cameras as it has in the trace, all
+    # accepting the stand-in credentials; records without a region use BENCH_REGION
+    def stored_region(region: str) -> str:
+        return BENCH_REGION if region == ANY_REGION else region
+
+    configure_environment(LOCATION_USER_PASS_MAPPING=json.dumps(
+        {stored_region(region): {"username": BENCH_USERNAME, "password": BENCH_PASSWORD} for region in trace_cameras}
+    ))
+    seeded_regions = [region for region, cameras in trace_cameras.items() for _ in cameras]
+    broker = InProcessBroker(publish_latency=args.publish_latency)
+    database = tempfile.NamedTemporaryFile(suffix=".sqlite3", delete=False)
+    database.close()
+    store = SqliteCameraStore(
+        database.name,
+        len(seeded_regions),
+        region=lambda camera_id: stored_region(seeded_regions[int(camera_id) - 1]),
+    )
+    camera_ids: Dict[str, List[str]] = {}
+    for camera_id, region in zip(store.camera_ids, seeded_regions):
+        camera_ids.setdefault(region, []).append(camera_id)
+    try:
+        async with running_app(broker, store) as client:
+            report = await replay(client, records, CameraMapper(camera_ids), credentials, args)
+    finally:
+        os.unlink(database.name)
+    report["broker"] = broker.summary()
+    return report
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Replay a captured traffic trace")
+    parser.add_argument("trace", help="trace file written with TRAFFIC_TRACE_PATH (rotated backups are read too)")
+    parser.add_argument("--url", help="base URL of a running instance; default runs the app in process")
+    parser.add_argument("--camera-ids", help='JSON file {"<region>" or "*": ["<camera ID>", ...]} of cameras known to the target instance')
+    parser.add_argument("--credentials", help='JSON file {"<region>" or "*": {"username": ..., "password": ...}}')
+    parser.add_argument("--speed", type=float, default=1.0, help="time compression factor")
+    parser.add_argument("--limit", type=int, default=0, help="only replay the first N records")
+    parser.add_argument("--reproduce-rejects", action="store_true", help="send bad credentials where the trace was rejected at auth")
+    parser.add_argument("--publish-latency", type=float, default=0.002, help="stand-in broker latency (in-process mode)")
+    parser.add_argument("--output", help="write the JSON report to this file instead of stdout")
+    args = parser.parse_args(argv)
+
+    report = asyncio.run(run(args))
+    output = json.dumps(report, indent=2)
+    if args.output:
+        Path(args.output).write_text(output + "\n")
+    else:
+        print(output)
+
+
+if __name__ == "__main__":
+    main()
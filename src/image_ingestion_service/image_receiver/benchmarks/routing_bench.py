@@ -0,0 +1,101 @@
+# Per-consumer broker traffic under fanout, topic and headers exchanges.
+#
+# Drives the in-process app with cameras spread over several regions and one
+# consumer queue per region, bound the way a region-specific consumer would
+# be ("<region>.#" for topic, x-match region for headers). Reports what each
+# consumer receives in every mode and the reduction against fanout:
+#
+#   python -m benchmarks.routing_bench --regions 5 --cameras 20 --frames 3
+
+import os
+import json
+import asyncio
+import argparse
+import tempfile
+from pathlib import Path
+from unittest import mock
+
+from .standins import (
+    BENCH_PASSWORD, BENCH_USERNAME, InProcessBroker, SqliteCameraStore,
+    configure_environment, running_app, synthetic_jpeg, upload_headers, with_comment,
+)
+
+REGION_NAMES = ("LowerMainland", "Northern", "SouthernInterior", "Peace", "Kootenay", "Thompson", "Cariboo", "Island")
+MODES = ("fanout", "topic", "headers")
+
+
+async def run_mode(mode: str, regions, store: SqliteCameraStore, payload: bytes, frames: int, concurrency: int) -> dict:
+    broker = InProcessBroker()
+    for region in regions:
+        broker.bind(region, binding_key=f"{region}.#", match_headers={"region": region})
+
+    with mock.patch("app.rabbitmq.RABBITMQ_EXCHANGE_TYPE", mode), mock.patch("app.main.RABBITMQ_EXCHANGE_TYPE", mode):
+        async with running_app(broker, store) as client:
+            limit = asyncio.Semaphore(concurrency)
+
+            async def upload(camera_id: str, frame: int):
+                async with limit:
+                    body = with_comment(payload, f"{mode}:{camera_id}:{frame}".encode())
+                    response = await client.post("/api/images", content=body, headers=upload_headers(camera_id))
+                    response.raise_for_status()
+
+            await asyncio.gather(*(
+                upload(camera_id, frame) for frame in range(frames) for camera_id in store.camera_ids
+            ))
+
+    queues = broker.queues
+    return {
+        "published_messages": broker.messages,
+        "published_bytes": broker.bytes,
+        "per_consumer_messages": round(sum(queue["messages"] for queue in queues.values()) / len(queues), 1),
+        "per_consumer_bytes": round(sum(queue["bytes"] for queue in queues.values()) / len(queues)),
+        "total_delivered_bytes": sum(queue["bytes"] for queue in queues.values()),
+    }
+
+
+async def run(args) -> dict:
+    regions = REGION_NAMES[:args.regions]
+    configure_environment(LOCATION_USER_PASS_MAPPING=json.dumps(
+        {region: {"username": BENCH_USERNAME, "password": BENCH_PASSWORD} for region in regions}
+    ))
+    database = tempfile.NamedTemporaryFile(suffix=".sqlite3", delete=False)
+    database.close()
+    store = SqliteCameraStore(
+        database.name,
+        args.regions * args.cameras,
+        region=lambda camera_id: regions[int(camera_id) % len(regions)],
+    )
+    payload = synthetic_jpeg(1280, 720, seed=args.seed)
+
+    report = {"config": {"regions": len(regions), "cameras_per_region": args.cameras, "frames_per_camera": args.frames}}
+    try:
+        for mode in MODES:
+            report[mode] = await run_mode(mode, regions, store, payload, args.frames, args.concurrency)
+    finally:
+        os.unlink(database.name)
+
+    fanout_bytes = report["fanout"]["per_consumer_bytes"]
+    for mode in MODES:
+        report[mode]["per_consumer_reduction_vs_fanout"] = round(fanout_bytes / max(1, report[mode]["per_consumer_bytes"]), 2)
+    return report
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Per-consumer broker traffic by exchange type")
+    parser.add_argument("--regions", type=int, default=5, choices=range(1, len(REGION_NAMES) + 1), metavar=f"1-{len(REGION_NAMES)}")
+    parser.add_argument("--cameras", type=int, default=20, help="cameras per region")
+    parser.add_argument("--frames", type=int, default=3, help="uploads per camera")
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--output", help="write the JSON report to this file instead of stdout")
+    args = parser.parse_args(argv)
+
+    output = json.dumps(asyncio.run(run(args)), indent=2)
+    if args.output:
+        Path(args.output).write_text(output + "\n")
+    else:
+        print(output)
+
+
+if __name__ == "__main__":
+    main()
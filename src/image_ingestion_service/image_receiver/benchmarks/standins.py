@@ -0,0 +1,296 @@
+# Local stand-ins for RabbitMQ and SQL Server so the real app.main:app can be
+# driven end to end on a laptop or CI runner without either service.
+
+import os
+import json
+import time
+import base64
+import random
+import asyncio
+import sqlite3
+import struct
+from io import BytesIO
+from contextlib import ExitStack, asynccontextmanager
+from typing import Dict, List, Optional, Tuple
+from unittest import mock
+
+from PIL import Image
+
+
+BENCH_REGION = "BenchRegion"
+BENCH_USERNAME = "bench_user"
+BENCH_PASSWORD = "bench_password"
+
+# (width, height, share of cameras) roughly matching the camera fleet
+JPEG_PROFILES: List[Tuple[int, int, float]] = [
+    (640, 480, 0.3),
+    (1280, 720, 0.5),
+    (1920, 1080, 0.2),
+]
+
+
+# -------------------- Environment --------------------
+def configure_environment(**overrides: str):
+    """Set the variables app.main needs at import. Call before importing app.main."""
+    defaults = {
+        "CLUSTER": "GOLD",
+        "RABBITMQ_GOLD_URL": "amqp://bench/",
+        "RABBITMQ_GOLDDR_URL": "amqp://bench/",
+        "RABBITMQ_EXCHANGE_NAME": "bench.exchange",
+        "LOCATION_USER_PASS_MAPPING": json.dumps(
+            {BENCH_REGION: {"username": BENCH_USERNAME, "password": BENCH_PASSWORD}}
+        ),
+        "PYTHON_LOG_LEVEL": "WARNING",
+    }
+    for name, value in defaults.items():
+        os.environ.setdefault(name, value)
+    os.environ.update(overrides)
+
+
+# -------------------- In-Process AMQP Stand-In --------------------
+class InProcessBroker:
+    """
+    Minimal stand-in for the aio_pika objects used by the service.
+
+    Pass `broker.connect_robust` in place of aio_pika.connect_robust. Every
+    publish sleeps for the configured latency and is tallied per exchange
+    and routing key so benchmarks can report what the broker would carry.
+    Queues added with `bind` are delivered to with fanout, topic or headers
+    exchange semantics, and their traffic is tallied per queue.
+    """
+
+    def __init__(self, publish_latency: float = 0.0, publish_jitter: float = 0.0, connect_latency: float = 0.0):
+        self.connect_latency = connect_latency
+        self.publish_latency = publish_latency
+        self.publish_jitter = publish_jitter
+        self.messages = 0
+        self.bytes = 0
+        self.by_routing_key: Dict[str, int] = {}
+        self.published: List[Tuple[str, str, dict, int]] = []
+        self.keep_messages = False
+        self.bindings: List[Tuple[str, str, dict]] = []
+        self.queues: Dict[str, Dict[str, int]] = {}
+
+    def bind(self, queue: str, binding_key: str = "#", match_headers: Optional[dict] = None):
+        """Bind a queue with a topic binding key, or x-match=all headers for a headers exchange."""
+        self.bindings.append((queue, binding_key, match_headers or {}))
+        self.queues.setdefault(queue, {"messages": 0, "bytes": 0})
+
+    async def connect_robust(self, url=None, **kwargs):
+        if self.connect_latency > 0:
+            await asyncio.sleep(self.connect_latency)
+        return _Connection(self)
+
+    async def _publish(self, exchange: "_Exchange", message, routing_key: str):
+        delay = self.publish_latency
+        if self.publish_jitter:
+            delay += random.uniform(0, self.publish_jitter)
+        if delay > 0:
+            await asyncio.sleep(delay)
+        size = len(message.body)
+        self.messages += 1
+        self.bytes += size
+        self.by_routing_key[routing_key] = self.by_routing_key.get(routing_key, 0) + 1
+        headers = message.headers or {}
+        for queue in {queue for queue, key, match in self.bindings if _routes(exchange.type, routing_key, headers, key, match)}:
+            self.queues[queue]["messages"] += 1
+            self.queues[queue]["bytes"] += size
+        if self.keep_messages:
+            self.published.append((exchange.name, routing_key, dict(message.headers or {}), size))
+
+    def summary(self) -> dict:
+        summary = {"messages": self.messages, "bytes": self.bytes}
+        if self.queues:
+            summary["queues"] = self.queues
+        return summary
+
+
+def topic_matches(binding_key: str, routing_key: str) -> bool:
+    """AMQP topic matching: '*' is exactly one word, '#' is zero or more."""
+    def match(pattern: List[str], words: List[str]) -> bool:
+        if not pattern:
+            return not words
+        if pattern[0] == "#":
+            return any(match(pattern[1:], words[index:]) for index in range(len(words) + 1))
+        if not words:
+            return False
+        return (pattern[0] == "*" or pattern[0] == words[0]) and match(pattern[1:], words[1:])
+    return match(binding_key.split("."), routing_key.split("."))
+
+
+def _routes(exchange_type, routing_key: str, headers: dict, binding_key: str, match_headers: dict) -> bool:
+    kind = getattr(exchange_type, "value", exchange_type) or "fanout"
+    if kind == "topic":
+        return topic_matches(binding_key, routing_key)
+    if kind == "headers":
+        return all(headers.get(name) == value for name, value in match_headers.items())
+    return True
+
+
+class _Connection:
+
+    def __init__(self, broker: InProcessBroker):
+        self._broker = broker
+        self.is_closed = False
+
+    async def channel(self, **kwargs):
+        return _Channel(self._broker)
+
+    async def close(self):
+        self.is_closed = True
+
+
+class _Channel:
+
+    def __init__(self, broker: InProcessBroker):
+        self._broker = broker
+        self.is_closed = False
+
+    async def declare_exchange(self, name, type=None, durable=False, **kwargs):
+        return _Exchange(self._broker, name, type)
+
+    async def close(self):
+        self.is_closed = True
+
+
+class _Exchange:
+
+    def __init__(self, broker: InProcessBroker, name: str, exchange_type):
+        self._broker = broker
+        self.name = name
+        self.type = exchange_type
+
+    async def publish(self, message, routing_key: str = "", **kwargs):
+        await self._broker._publish(self, message, routing_key)
+
+
+# -------------------- SQLite Camera Table --------------------
+class SqliteCameraStore:
+    """
+    SQLite copy of the [Cams] table, queried with the service's own SQL.
+
+    `get_all_from_db` is a drop-in replacement for app.db.fetch_all_from_db,
+    and `create_engine` for app.db.create_db_engine. SQLAlchemy is only
+    imported once one of them is used, as in the service.
+    """
+
+    def __init__(self, path: str, camera_count: int, region=BENCH_REGION, ip_for=None, first_id: int = 1,
+                 connect_latency: float = 0.0):
+        from app.db import CAMS_QUERY
+
+        self.query = CAMS_QUERY
+        self.camera_ids = [str(first_id + index) for index in range(camera_count)]
+
+        with sqlite3.connect(path) as connection:
+            connection.execute("DROP TABLE IF EXISTS Cams")
+            connection.execute(
+                "CREATE TABLE Cams (ID INTEGER PRIMARY KEY, Cam_InternetFTP_Folder TEXT, "
+                "Cam_InternetFTP_Filename TEXT, Cam_LocationsRegion TEXT, Cam_MaintenancePublic_IP TEXT)"
+            )
+            connection.executemany(
+                "INSERT INTO Cams VALUES (?, ?, ?, ?, ?)",
+                [
+                    (
+                        int(camera_id), f"/cams/{camera_id}", f"{camera_id}.jpg",
+                        region(camera_id) if callable(region) else region,
+                        ip_for(camera_id) if ip_for else None,
+                    )
+                    for camera_id in self.camera_ids
+                ],
+            )
+        self.path = path
+        self.connect_latency = connect_latency
+        self._engine = None
+
+    def create_engine(self):
+        """An engine on this table; each new connection waits connect_latency, like a DB login."""
+        from sqlalchemy import create_engine, event
+
+        engine = create_engine(f"sqlite:///{self.path}")
+        if self.connect_latency > 0:
+            event.listen(engine, "connect", lambda *args: time.sleep(self.connect_latency))
+        return engine
+
+    def get_all_from_db(self):
+        from sqlalchemy import text
+
+        if self._engine is None:
+            self._engine = self.create_engine()
+        with self._engine.connect() as connection:
+            result = connection.execute(text(self.query))
+            return [dict(row._mapping) for row in result]
+
+
+# -------------------- Synthetic Uploads --------------------
+def synthetic_jpeg(width: int, height: int, quality: int = 85, seed: Optional[int] = None) -> bytes:
+    """A gradient with moderate noise, which compresses roughly like a road camera frame."""
+    rng = random.Random(seed)
+    gradient = Image.linear_gradient("L").resize((width, height))
+    noise = Image.effect_noise((width, height), rng.uniform(20, 40))
+    gray = Image.blend(gradient, noise, 0.35)
+    image = Image.merge("RGB", (gray, gradient, noise.point(lambda value: value // 2)))
+    buffer = BytesIO()
+    image.save(buffer, format="JPEG", quality=quality)
+    return buffer.getvalue()
+
+
+def sized_jpeg(size: int, seed: Optional[int] = None) -> bytes:
+    """A valid JPEG padded with a comment segment to exactly `size` bytes where possible."""
+    base = synthetic_jpeg(160, 120, seed=seed)
+    return with_comment(base, b"", pad_to=size)
+
+
+def with_comment(jpeg: bytes, comment: bytes, pad_to: int = 0) -> bytes:
+    """Insert COM segments after SOI so each upload is unique but still a valid JPEG."""
+    extra = max(0, pad_to - len(jpeg) - len(comment) - 4)
+    body = comment + b"\x00" * extra
+    segments = []
+    while True:
+        chunk, body = body[:65533], body[65533:]
+        segments.append(b"\xff\xfe" + struct.pack(">H", len(chunk) + 2) + chunk)
+        if not body:
+            break
+    return jpeg[:2] + b"".join(segments) + jpeg[2:]
+
+
+def pick_profile(rng: random.Random) -> Tuple[int, int]:
+    roll = rng.random()
+    for width, height, share in JPEG_PROFILES:
+        if roll < share:
+            return width, height
+        roll -= share
+    return JPEG_PROFILES[-1][:2]
+
+
+def upload_headers(camera_id: str, username: str = BENCH_USERNAME, password: str = BENCH_PASSWORD) -> dict:
+    token = base64.b64encode(f"{username}:{password}".encode()).decode()
+    return {
+        "authorization": f"Basic {token}",
+        "content-disposition": f'attachment; filename="{camera_id}.jpg"',
+        "content-type": "image/jpeg",
+    }
+
+
+# -------------------- In-Process App --------------------
+@asynccontextmanager
+async def running_app(broker: InProcessBroker, store: Optional[SqliteCameraStore], base_url: str = "http://bench"):
+    """
+    Run app.main:app through its real lifespan with the stand-ins patched in,
+    yielding an HTTP client bound to it. With store=None the DB is left
+    alone, for callers that patch app.db.create_db_engine themselves.
+    """
+    try:
+        import httpx2 as httpx
+    except ImportError:  # pragma: no cover
+        import httpx
+
+    with ExitStack() as patches:
+        patches.enter_context(mock.patch("app.main.aio_pika.connect_robust", broker.connect_robust))
+        if store is not None:
+            patches.enter_context(mock.patch("app.auth.fetch_all_from_db", store.get_all_from_db))
+        from app.main import app
+
+        async with app.router.lifespan_context(app):
+            transport = httpx.ASGITransport(app=app)
+            async with httpx.AsyncClient(transport=transport, base_url=base_url, timeout=60) as client:
+                yield client
@@ -0,0 +1,166 @@
+# Cold start: import time of app.main and time to the first accepted upload.
+#
+# Every run is a fresh interpreter, as a pod start is. The import run only
+# times `import app.main` and lists which deferred modules it loaded. The
+# upload run starts the real lifespan against the in-process broker and a
+# SQLite copy of [Cams] reached through app.db's own engine code, both with
+# a connect latency. Like a pod behind a readiness probe, it polls
+# /api/readyz and then posts one upload until it is accepted. Medians are
+# reported in milliseconds as JSON and can be checked against thresholds:
+#
+#   python -m benchmarks.startup_bench
+#   python -m benchmarks.startup_bench --check               # fail if over benchmarks/startup_thresholds.json
+#   python -m benchmarks.startup_bench --write-thresholds    # re-baseline with 3x headroom
+
+import os
+import sys
+import json
+import time
+import asyncio
+import argparse
+import tempfile
+import statistics
+import subprocess
+from pathlib import Path
+from typing import Dict, List
+from unittest import mock
+
+from .standins import configure_environment
+
+THRESHOLDS_FILE = Path(__file__).with_name("startup_thresholds.json")
+RECEIVER_DIR = Path(__file__).resolve().parent.parent
+
+# Imported on first use by the service, so `import app.main` must not load them
+DEFERRED_MODULES = ("sqlalchemy", "pyodbc", "aiofiles")
+
+IMPORT_CHILD = f"""
+import sys, json, time
+started = time.perf_counter()
+import app.main
+print(json.dumps({{
+    "import_ms": (time.perf_counter() - started) * 1000,
+    "deferred_loaded": [name for name in {DEFERRED_MODULES!r} if name in sys.modules],
+}}))
+"""
+
+
+# -------------------- Child Processes --------------------
+async def first_upload(cameras: int, broker_latency: float, db_latency: float) -> dict:
+    from .standins import InProcessBroker, SqliteCameraStore, running_app, synthetic_jpeg, upload_headers
+
+    database = tempfile.NamedTemporaryFile(suffix=".sqlite3", delete=False)
+    database.close()
+    store = SqliteCameraStore(database.name, cameras, connect_latency=db_latency)
+    broker = InProcessBroker(connect_latency=broker_latency)
+    body = synthetic_jpeg(640, 480, seed=1)
+    headers = upload_headers(store.camera_ids[0])
+    import app.main  # noqa: F401  (timed by the import run, not here)
+
+    try:
+        with mock.patch("app.db.create_db_engine", store.create_engine):
+            started = time.perf_counter()
+            async with running_app(broker, None) as client:
+                lifespan_ms = (time.perf_counter() - started) * 1000
+                while (await client.get("/api/readyz")).status_code != 200:
+                    if time.perf_counter() - started > 60:
+                        raise RuntimeError("Not ready after 60s")
+                    await asyncio.sleep(0.005)
+                ready_ms = (time.perf_counter() - started) * 1000
+                rejected = 0
+                while True:
+                    response = await client.post("/api/images", content=body, headers=headers)
+                    if response.status_code == 200:
+                        break
+                    rejected += 1
+                    if time.perf_counter() - started > 60:
+                        raise RuntimeError(f"No upload accepted after 60s, last status {response.status_code}")
+                    await asyncio.sleep(0.005)
+                first_upload_ms = (time.perf_counter() - started) * 1000
+    finally:
+        os.unlink(database.name)
+    return {
+        "lifespan_ms": lifespan_ms,
+        "ready_ms": ready_ms,
+        "first_upload_ms": first_upload_ms,
+        "rejected_before_first": rejected,
+    }
+
+
+def run_child(command: List[str]) -> dict:
+    completed = subprocess.run(
+        [sys.executable, *command], cwd=RECEIVER_DIR, env=os.environ, capture_output=True, text=True, check=True,
+    )
+    return json.loads(completed.stdout.strip().splitlines()[-1])
+
+
+# -------------------- Runs --------------------
+def run(runs: int, cameras: int, broker_latency: float, db_latency: float) -> dict:
+    imports = [run_child(["-c", IMPORT_CHILD]) for _ in range(runs)]
+    uploads = [
+        run_child([
+            "-m", "benchmarks.startup_bench", "--child-upload",
+            "--cameras", str(cameras), "--broker-latency", str(broker_latency), "--db-latency", str(db_latency),
+        ])
+        for _ in range(runs)
+    ]
+
+    import_ms = statistics.median(result["import_ms"] for result in imports)
+    first_upload_ms = statistics.median(result["first_upload_ms"] for result in uploads)
+    return {
+        "config": {"runs": runs, "cameras": cameras, "broker_latency_s": broker_latency, "db_latency_s": db_latency},
+        "deferred_loaded_at_import": sorted({name for result in imports for name in result["deferred_loaded"]}),
+        "results": {
+            "import_ms": round(import_ms, 1),
+            "lifespan_ms": round(statistics.median(result["lifespan_ms"] for result in uploads), 1),
+            "ready_ms": round(statistics.median(result["ready_ms"] for result in uploads), 1),
+            "first_upload_ms": round(first_upload_ms, 1),
+            # From interpreter start to the first 200, as a pod would see it
+            "time_to_first_upload_ms": round(import_ms + first_upload_ms, 1),
+        },
+        "rejected_before_first": max(result["rejected_before_first"] for result in uploads),
+    }
+
+
+def check(report: dict, thresholds: Dict[str, float]) -> List[str]:
+    failures = [f"{name} imported by app.main" for name in report["deferred_loaded_at_import"]]
+    for name, limit in thresholds.items():
+        measured = report["results"].get(name)
+        if measured is not None and measured > limit:
+            failures.append(f"{name}: {measured:.1f}ms > {limit:.1f}ms")
+    return failures
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Import time and time to first accepted upload")
+    parser.add_argument("--runs", type=int, default=5, help="fresh interpreters per measurement")
+    parser.add_argument("--cameras", type=int, default=5000, help="rows in the SQLite [Cams] table")
+    parser.add_argument("--broker-latency", type=float, default=0.15, help="seconds for the RabbitMQ connect")
+    parser.add_argument("--db-latency", type=float, default=0.3, help="seconds for each DB login")
+    parser.add_argument("--check", action="store_true", help="exit non-zero on a threshold or deferred import regression")
+    parser.add_argument("--thresholds", default=str(THRESHOLDS_FILE), help="threshold file (ms)")
+    parser.add_argument("--write-thresholds", action="store_true", help="write measured times x --headroom as new thresholds")
+    parser.add_argument("--headroom", type=float, default=3.0)
+    parser.add_argument("--child-upload", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    configure_environment()
+    if args.child_upload:
+        print(json.dumps(asyncio.run(first_upload(args.cameras, args.broker_latency, args.db_latency))))
+        return
+
+    report = run(max(1, args.runs), args.cameras, args.broker_latency, args.db_latency)
+    print(json.dumps(report, indent=2))
+
+    if args.write_thresholds:
+        thresholds = {name: round(value * args.headroom, 1) for name, value in report["results"].items()}
+        Path(args.thresholds).write_text(json.dumps(thresholds, indent=2, sort_keys=True) + "\n")
+
+    if args.check:
+        failures = check(report, json.loads(Path(args.thresholds).read_text()))
+        if failures:
+            print("Startup benchmark regressions:\n  " + "\n  ".join(failures), file=sys.stderr)
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
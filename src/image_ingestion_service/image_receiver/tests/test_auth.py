@@ -40,4 +40,85 @@ def test_verify_credentials():
         "password":TEST_PASSWORD
     }
 
-    assert verify_credentials(creds, expected)
\ No newline at end of file
+    assert verify_credentials(creds, expected)
+
+def test_camera_id_from_filename():
+
+    from app.auth import camera_id_from_filename
+
+    assert camera_id_from_filename("123.jpg") == "123"
+    assert camera_id_from_filename("../../etc/456.jpg") == "456"
+    assert camera_id_from_filename("cam 7!.jpg") == "cam7"
+    assert camera_id_from_filename("$$$.jpg") == ""
+
+def test_find_scripted_source():
+
+    from app.auth import find_scripted_source
+
+    mapping = {"Scripted": ["192.0.2.0/24"], "Other": "198.51.100.7"}
+    with patch("app.auth.SCRIPTED_IP_MAPPING", mapping):
+        assert find_scripted_source("192.0.2.15") == "Scripted"
+        assert find_scripted_source("198.51.100.7") == "Other"
+        assert find_scripted_source("203.0.113.1") is None
+
+def test_batch_auth_requires_scripted_source():
+
+    import asyncio
+    import pytest
+    from types import SimpleNamespace
+    from fastapi import HTTPException
+    from app.auth import authenticate_batch_request
+
+    request = SimpleNamespace(headers={}, client=SimpleNamespace(host="203.0.113.1"))
+    creds = HTTPBasicCredentials(username=TEST_USERNAME, password=TEST_PASSWORD)
+    expected = {"username": TEST_USERNAME, "password": TEST_PASSWORD}
+
+    with patch("app.auth.CREDENTIAL_CACHE", {"1": {"ID": 1}}), \
+            patch("app.auth.SCRIPTED_IP_MAPPING", {"Scripted": "192.0.2.0/24"}), \
+            patch("app.auth.LOCATION_USER_PASS_MAPPING", {"Scripted": expected}):
+
+        with pytest.raises(HTTPException) as error:
+            asyncio.run(authenticate_batch_request(request, creds))
+        assert error.value.status_code == 403
+
+        request.client.host = "192.0.2.15"
+        source = asyncio.run(authenticate_batch_request(request, creds))
+        assert source["scripted_name"] == "Scripted"
+        assert "1" in source["cameras"]
+
+def test_refresh_failure_keeps_last_good_cache():
+
+    import asyncio
+    from app import auth
+
+    rows = [{"ID": 1, "Cam_LocationsRegion": "North"}, {"ID": 2, "Cam_LocationsRegion": "South"}]
+
+    with patch("app.auth.CREDENTIAL_CACHE", {}), patch("app.auth.CREDENTIAL_CACHE_LOADED_AT", None):
+        assert auth.credential_cache_is_stale()
+
+        with patch("app.auth.fetch_all_from_db", return_value=rows):
+            assert asyncio.run(auth.refresh_credentials()) is True
+        cache = asyncio.run(auth.get_cached_credentials())
+        assert set(cache) == {"1", "2"}
+        assert not auth.credential_cache_is_stale()
+
+        with patch("app.auth.fetch_all_from_db", side_effect=Exception("Login timeout expired")):
+            assert asyncio.run(auth.refresh_credentials()) is False
+        with patch("app.auth.fetch_all_from_db", return_value=[]):
+            assert asyncio.run(auth.refresh_credentials()) is False
+        assert asyncio.run(auth.get_cached_credentials()) is cache
+
+        with patch("app.auth.CREDENTIAL_STALENESS_BUDGET_SECONDS", 0):
+            assert auth.credential_cache_is_stale()
+
+def test_refresh_backoff_is_jittered_and_capped():
+
+    from app import auth
+
+    with patch("app.auth.CREDENTIAL_REFRESH_INTERVAL_SECONDS", 30), \
+            patch("app.auth.CREDENTIAL_REFRESH_RETRY_SECONDS", 5), \
+            patch("app.auth.CREDENTIAL_REFRESH_MAX_BACKOFF_SECONDS", 300):
+        assert auth.next_refresh_delay(0) == 30
+        assert 2.5 <= auth.next_refresh_delay(1) <= 5
+        assert 10 <= auth.next_refresh_delay(3) <= 20
+        assert 150 <= auth.next_refresh_delay(50) <= 300
@@ -0,0 +1,97 @@
+import json
+import os
+import asyncio
+import pytest
+from unittest.mock import patch
+from app import auth
+from app.auth_mappings import AuthMappingsWatcher, compile_scripted_networks, parse_env_file, read_auth_mappings_file
+
+LOCATIONS = {"North": {"username": "north_user", "password": "north_pass"}}
+
+
+def test_env_file_is_parsed_like_sourced_secrets(tmp_path):
+
+    scripted = json.dumps(json.dumps({"Scripted": ["192.0.2.0/24", "198.51.100.7:8080"]}))
+    path = tmp_path / "secrets.env"
+    path.write_text(
+        "# vault agent output\n"
+        f"export LOCATION_USER_PASS_MAPPING='{json.dumps(LOCATIONS)}'\n"
+        f"SCRIPTED_IP_MAPPING={scripted}\n"
+        "export DB_PASSWORD=\"unused\"\n"
+    )
+
+    mappings = read_auth_mappings_file(str(path))
+
+    assert mappings.locations == LOCATIONS
+    assert [(name, str(network)) for name, network in mappings.scripted_networks] == [
+        ("Scripted", "192.0.2.0/24"),
+        ("Scripted", "198.51.100.7/32"),
+    ]
+    assert parse_env_file("NO_EQUALS\nKEY = 'value'")["KEY"] == "value"
+
+
+def test_json_file_with_both_keys(tmp_path):
+
+    path = tmp_path / "auth.json"
+    path.write_text(json.dumps({"LOCATION_USER_PASS_MAPPING": LOCATIONS, "SCRIPTED_IP_MAPPING": {"Scripted": "192.0.2.1"}}))
+
+    mappings = read_auth_mappings_file(str(path))
+
+    assert mappings.scripted == {"Scripted": "192.0.2.1"}
+    assert len(mappings.scripted_networks) == 1
+
+
+@pytest.mark.parametrize("document", [
+    {"SCRIPTED_IP_MAPPING": {"Scripted": "192.0.2.1"}},
+    {"LOCATION_USER_PASS_MAPPING": {"North": {"username": "north_user"}}},
+    {"LOCATION_USER_PASS_MAPPING": LOCATIONS, "SCRIPTED_IP_MAPPING": {"Scripted": "192.0.2.300/24"}},
+    {"LOCATION_USER_PASS_MAPPING": LOCATIONS, "SCRIPTED_IP_MAPPING": ["192.0.2.1"]},
+])
+def test_invalid_files_are_rejected(tmp_path, document):
+
+    path = tmp_path / "auth.json"
+    path.write_text(json.dumps(document))
+
+    with pytest.raises(ValueError):
+        read_auth_mappings_file(str(path))
+
+
+def test_lenient_compile_skips_invalid_patterns():
+
+    networks = compile_scripted_networks({"Scripted": ["not-an-ip", "192.0.2.0/24"], "Other": 5})
+
+    assert [(name, str(network)) for name, network in networks] == [("Scripted", "192.0.2.0/24")]
+
+
+def test_watcher_applies_changes_and_keeps_maps_on_bad_file(tmp_path):
+
+    path = tmp_path / "auth.json"
+    path.write_text(json.dumps({"LOCATION_USER_PASS_MAPPING": LOCATIONS, "SCRIPTED_IP_MAPPING": {"Scripted": "192.0.2.0/24"}}))
+    watcher = AuthMappingsWatcher(str(path), interval=1)
+
+    with patch("app.auth.LOCATION_USER_PASS_MAPPING", {}), patch("app.auth.SCRIPTED_IP_MAPPING", {}):
+        assert asyncio.run(watcher.check(auth.apply_auth_mappings)) is True
+        assert auth.LOCATION_USER_PASS_MAPPING == LOCATIONS
+        assert auth.find_scripted_source("192.0.2.15") == "Scripted"
+
+        # Unchanged file: nothing to do
+        assert asyncio.run(watcher.check(auth.apply_auth_mappings)) is False
+
+        # Half-written file: rejected, current maps stay
+        path.write_text('{"LOCATION_USER_PASS_MAPPING": ')
+        os.utime(path, ns=(0, 1))
+        assert asyncio.run(watcher.check(auth.apply_auth_mappings)) is False
+        assert auth.find_scripted_source("192.0.2.15") == "Scripted"
+
+        path.write_text(json.dumps({"LOCATION_USER_PASS_MAPPING": LOCATIONS, "SCRIPTED_IP_MAPPING": {"Moved": "198.51.100.0/24"}}))
+        os.utime(path, ns=(0, 2))
+        assert asyncio.run(watcher.check(auth.apply_auth_mappings)) is True
+        assert auth.find_scripted_source("192.0.2.15") is None
+        assert auth.find_scripted_source("198.51.100.9") == "Moved"
+
+
+def test_missing_file_is_not_applied(tmp_path):
+
+    watcher = AuthMappingsWatcher(str(tmp_path / "missing.json"), interval=1)
+
+    assert asyncio.run(watcher.check(lambda mappings: pytest.fail("applied"))) is False
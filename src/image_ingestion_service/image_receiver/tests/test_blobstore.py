@@ -0,0 +1,69 @@
+import os
+import time
+import pytest
+from unittest.mock import patch
+
+from app.blobstore import LocalFilesystemBlobStore, build_blob_store_from_env
+
+
+@pytest.mark.asyncio
+async def test_put_writes_file_and_returns_reference(tmp_path):
+
+    store = LocalFilesystemBlobStore(str(tmp_path))
+    ref = await store.put("CAM001/frame.jpg", b"image")
+
+    path = tmp_path / "CAM001" / "frame.jpg"
+    assert ref == f"file://{path}"
+    assert path.read_bytes() == b"image"
+    assert [name for name in os.listdir(tmp_path / "CAM001")] == ["frame.jpg"]
+
+
+@pytest.mark.asyncio
+async def test_put_rejects_keys_outside_root(tmp_path):
+
+    store = LocalFilesystemBlobStore(str(tmp_path))
+    with pytest.raises(ValueError):
+        await store.put("../escape.jpg", b"image")
+
+
+@pytest.mark.asyncio
+async def test_check_in_returns_reference_headers(tmp_path):
+
+    store = LocalFilesystemBlobStore(str(tmp_path))
+    headers = await store.check_in(b"image", "CAM001", "CAM001_20260101T000000Z.jpg")
+
+    assert headers["content_sha256"] == "6105d6cc76af400325e94d588ce511be5bfdbb73b437dc51eca43917d7a43e3d"
+    assert headers["content_length"] == 5
+    assert headers["blob_ref"].endswith("CAM001_20260101T000000Z.jpg")
+    assert open(headers["blob_ref"][len("file://"):], "rb").read() == b"image"
+
+
+@pytest.mark.asyncio
+async def test_purge_removes_only_expired_blobs(tmp_path):
+
+    store = LocalFilesystemBlobStore(str(tmp_path))
+    await store.put("CAM001/old.jpg", b"old")
+    await store.put("CAM002/new.jpg", b"new")
+    old_time = time.time() - 7200
+    os.utime(tmp_path / "CAM001" / "old.jpg", (old_time, old_time))
+
+    removed = await store.purge(time.time() - 3600)
+
+    assert removed == 1
+    assert not (tmp_path / "CAM001").exists()
+    assert (tmp_path / "CAM002" / "new.jpg").exists()
+
+
+def test_disabled_by_default():
+
+    with patch.dict(os.environ, {}, clear=True):
+        assert build_blob_store_from_env() is None
+
+
+def test_enabled_needs_a_path(tmp_path):
+
+    with patch.dict(os.environ, {"CLAIM_CHECK_ENABLED": "true"}, clear=True):
+        assert build_blob_store_from_env() is None
+
+    with patch.dict(os.environ, {"CLAIM_CHECK_ENABLED": "true", "BLOB_STORE_PATH": str(tmp_path)}, clear=True):
+        assert isinstance(build_blob_store_from_env(), LocalFilesystemBlobStore)
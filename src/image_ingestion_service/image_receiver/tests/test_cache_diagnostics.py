@@ -0,0 +1,82 @@
+import json
+import sqlite3
+from unittest.mock import patch
+from sqlalchemy import create_engine
+from app import cache_diagnostics
+from app.auth import build_credential_cache
+
+RECORDS = {
+    "1": {"ID": 1, "Cam_LocationsRegion": "North", "Cam_MaintenancePublic_IP": "192.0.2.1"},
+    "2": {"ID": 2, "Cam_LocationsRegion": "North", "Cam_MaintenancePublic_IP": "192.0.2.2"},
+}
+
+
+def sqlite_engine(path):
+    with sqlite3.connect(path) as connection:
+        connection.execute(
+            "CREATE TABLE Cams (ID INTEGER PRIMARY KEY, Cam_InternetFTP_Folder TEXT, "
+            "Cam_InternetFTP_Filename TEXT, Cam_LocationsRegion TEXT, Cam_MaintenancePublic_IP TEXT)"
+        )
+        connection.executemany(
+            "INSERT INTO Cams VALUES (?, ?, ?, ?, ?)",
+            [(1, "/cams/1", "1.jpg", "North", "192.0.2.1"), (2, "/cams/2", "2.jpg", "South", None)],
+        )
+    return create_engine(f"sqlite:///{path}")
+
+
+def test_build_credential_cache_keys_by_string_id():
+
+    cache = build_credential_cache([{"ID": 7}, {"ID": "8"}])
+
+    assert set(cache) == {"7", "8"}
+
+
+def test_timed_load_uses_service_query(tmp_path):
+
+    with patch("app.cache_diagnostics.get_engine", return_value=sqlite_engine(tmp_path / "cams.sqlite3")):
+        cache, phases = cache_diagnostics.timed_load()
+
+    assert cache["1"]["Cam_LocationsRegion"] == "North"
+    assert cache["2"]["Cam_MaintenancePublic_IP"] is None
+    assert set(phases) == {"connect_ms", "query_ms", "materialize_ms", "build_ms", "total_ms"}
+
+
+def test_footprint_counts_shared_objects_once():
+
+    report = cache_diagnostics.footprint(RECORDS)
+
+    assert report["records"] == 2
+    assert report["per_record_bytes"]["max"] >= report["per_record_bytes"]["p50"]
+    # The "North" string literal is shared by both records
+    assert report["shared_bytes"] > 0
+    assert report["total_bytes"] > report["index_bytes"]
+
+
+def test_snapshot_round_trip_and_diff(tmp_path):
+
+    path = tmp_path / "cams.json"
+    cache_diagnostics.dump_snapshot(RECORDS, str(path))
+    assert json.loads(path.read_text())["records"]["1"]["ID"] == 1
+
+    new = {
+        "2": {**RECORDS["2"], "Cam_MaintenancePublic_IP": "192.0.2.20"},
+        "3": {"ID": 3, "Cam_LocationsRegion": "South", "Cam_MaintenancePublic_IP": ""},
+    }
+    report = cache_diagnostics.diff_snapshots(cache_diagnostics.load_snapshot(str(path)), new)
+
+    assert (report["added"], report["removed"], report["changed"]) == (1, 1, 1)
+    assert report["changed_fields"] == {"Cam_MaintenancePublic_IP": 1}
+    assert report["churn_ratio"] == 1.5
+    assert report["sample_ids"]["added"] == ["3"]
+
+
+def test_lookup_benchmark_reports_hits_and_misses(capsys, tmp_path):
+
+    path = tmp_path / "cams.json"
+    cache_diagnostics.dump_snapshot(RECORDS, str(path))
+
+    cache_diagnostics.main(["lookup", "--snapshot", str(path), "--lookups", "100"])
+    report = json.loads(capsys.readouterr().out)
+
+    assert report["records"] == 2
+    assert report["hit_ns"] > 0 and report["miss_ns"] > 0
@@ -0,0 +1,87 @@
+from app.camera_tracker import CameraTracker
+
+
+def feed(tracker, camera_id, times, size=1000):
+    for t in times:
+        tracker.record_upload(camera_id, size, now=t)
+
+
+def test_stale_cameras_longest_silent_first():
+
+    tracker = CameraTracker(max_cameras=10, stale_seconds=100)
+    feed(tracker, "1", [0])
+    feed(tracker, "2", [50])
+    feed(tracker, "3", [0, 190])
+
+    report = tracker.stale(now=200)
+
+    assert report["count"] == 2
+    assert [camera["camera_id"] for camera in report["cameras"]] == ["1", "2"]
+    assert report["cameras"][0]["seconds_since"] == 200
+    assert tracker.stale(now=200, limit=1)["count"] == 2
+
+
+def test_late_cameras_use_their_own_cadence():
+
+    tracker = CameraTracker(max_cameras=10, stale_seconds=1000, late_factor=3)
+    feed(tracker, "fast", [0, 10, 20, 30])
+    feed(tracker, "slow", [0, 120, 240])
+
+    assert tracker.late(now=50)["count"] == 0
+
+    report = tracker.late(now=70)
+    assert [camera["camera_id"] for camera in report["cameras"]] == ["fast"]
+    assert report["cameras"][0]["expected_interval"] == 10
+    assert report["cameras"][0]["seconds_overdue"] == 10
+
+    # A new upload clears it, and querying does not consume the entries
+    assert tracker.late(now=70)["count"] == 1
+    feed(tracker, "fast", [71])
+    assert tracker.late(now=72)["count"] == 0
+
+
+def test_late_excludes_stale_cameras():
+
+    tracker = CameraTracker(max_cameras=10, stale_seconds=100, late_factor=2)
+    feed(tracker, "1", [0, 10, 20])
+
+    assert tracker.late(now=50)["count"] == 1
+    assert tracker.late(now=500)["count"] == 0
+    assert tracker.stale(now=500)["count"] == 1
+
+
+def test_ring_buffers_keep_recent_history():
+
+    tracker = CameraTracker(max_cameras=10, history=4)
+    feed(tracker, "1", [0, 1, 3, 6, 10, 15, 21], size=500)
+    tracker.record_failure("1")
+
+    stats = tracker.camera_stats("1", now=21)
+
+    assert stats["uploads"] == 7
+    assert stats["failures"] == 1
+    assert stats["bytes"] == 3500
+    assert stats["recent_intervals"] == [3, 4, 5, 6]
+    assert stats["expected_interval"] == 5
+    assert stats["recent_mean_bytes"] == 500
+    assert tracker.camera_stats("unknown") is None
+
+
+def test_capacity_bounds_memory():
+
+    tracker = CameraTracker(max_cameras=2, history=8)
+    for camera_id in ("1", "2", "3"):
+        feed(tracker, camera_id, [0])
+
+    assert len(tracker) == 2
+    assert tracker.camera_stats("3") is None
+    per_camera = tracker.array_bytes() / len(tracker)
+    assert per_camera < 200
+
+
+def test_superseded_deadlines_are_compacted():
+
+    tracker = CameraTracker(max_cameras=1, late_factor=3)
+    feed(tracker, "1", range(0, 1000, 10))
+
+    assert len(tracker._deadlines) <= 2 * len(tracker) + 64
@@ -0,0 +1,111 @@
+import asyncio
+import pytest
+from io import BytesIO
+from PIL import Image
+from unittest.mock import AsyncMock, patch
+from app.coalesce import FrameCoalescer, build_coalescer_from_env
+
+
+@pytest.mark.asyncio
+async def test_single_frame_is_published():
+
+    coalescer = FrameCoalescer()
+    published = []
+
+    async def publish():
+        published.append("frame1")
+
+    assert await coalescer.submit("CAM001", publish) is True
+    assert published == ["frame1"]
+    assert coalescer.pending_count == 0
+
+
+@pytest.mark.asyncio
+async def test_newer_frame_replaces_queued_frame():
+
+    coalescer = FrameCoalescer()
+    release = asyncio.Event()
+    published = []
+
+    def publisher(name):
+        async def publish():
+            if name == "frame1":
+                await release.wait()
+            published.append(name)
+        return publish
+
+    first = asyncio.create_task(coalescer.submit("CAM001", publisher("frame1")))
+    await asyncio.sleep(0)
+    second = asyncio.create_task(coalescer.submit("CAM001", publisher("frame2")))
+    await asyncio.sleep(0)
+    third = asyncio.create_task(coalescer.submit("CAM001", publisher("frame3")))
+    await asyncio.sleep(0)
+
+    assert coalescer.pending_count == 1
+
+    release.set()
+    results = await asyncio.gather(first, second, third)
+
+    assert results == [True, False, True]
+    assert published == ["frame1", "frame3"]
+
+
+@pytest.mark.asyncio
+async def test_cameras_do_not_coalesce_with_each_other():
+
+    coalescer = FrameCoalescer()
+    published = []
+
+    def publisher(name):
+        async def publish():
+            await asyncio.sleep(0)
+            published.append(name)
+        return publish
+
+    results = await asyncio.gather(
+        coalescer.submit("CAM001", publisher("a")),
+        coalescer.submit("CAM002", publisher("b")),
+    )
+
+    assert results == [True, True]
+    assert sorted(published) == ["a", "b"]
+
+
+@pytest.mark.asyncio
+async def test_publish_error_reaches_owner():
+
+    coalescer = FrameCoalescer()
+
+    async def publish():
+        raise RuntimeError("RabbitMQ down")
+
+    with pytest.raises(RuntimeError):
+        await coalescer.submit("CAM001", publish)
+
+
+@patch.dict("os.environ", {"PUBLISH_COALESCING_ENABLED": "true"})
+def test_enabled_from_env():
+
+    assert isinstance(build_coalescer_from_env(), FrameCoalescer)
+
+
+def jpeg():
+
+    img = Image.new("RGB", (10, 10))
+
+    bio = BytesIO()
+    img.save(bio, format="JPEG")
+
+    return bio.getvalue()
+
+
+@patch("app.main.send_to_rabbitmq")
+def test_superseded_upload_acknowledged(mock_send, client):
+
+    with patch("app.main.frame_coalescer") as coalescer:
+        coalescer.submit = AsyncMock(return_value=False)
+
+        response = client.post("/api/images", content=jpeg())
+
+    assert response.status_code == 200
+    assert "superseded" in response.text
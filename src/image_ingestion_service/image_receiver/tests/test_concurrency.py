@@ -0,0 +1,143 @@
+import time
+from unittest.mock import patch
+from app.concurrency import AdaptiveConcurrencyLimiter, build_limiter_from_env
+
+
+class FakeClock:
+
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_sheds_when_limit_reached():
+
+    limiter = AdaptiveConcurrencyLimiter(initial_limit=2, min_limit=1)
+
+    assert limiter.try_acquire()
+    assert limiter.try_acquire()
+    assert not limiter.try_acquire()
+
+    limiter.release(0.1)
+
+    assert limiter.try_acquire()
+
+
+def test_limit_grows_while_latency_healthy():
+
+    limiter = AdaptiveConcurrencyLimiter(initial_limit=4, min_limit=1, max_limit=10)
+
+    for _ in range(50):
+        acquired = 0
+        while limiter.try_acquire():
+            acquired += 1
+        for _ in range(acquired):
+            limiter.release(0.05)
+
+    assert limiter.current_limit > 4
+    assert limiter.current_limit <= 10
+
+
+def test_limit_cut_on_slow_request():
+
+    clock = FakeClock()
+    limiter = AdaptiveConcurrencyLimiter(initial_limit=20, min_limit=2, latency_target=1.0, clock=clock)
+
+    limiter.try_acquire()
+    limiter.release(5.0)
+
+    assert limiter.current_limit == 16
+
+    # A second slow request inside the cooldown does not cut again
+    limiter.try_acquire()
+    limiter.release(5.0)
+
+    assert limiter.current_limit == 16
+
+    clock.now = 10.0
+    limiter.try_acquire()
+    limiter.release(0.1, success=False)
+
+    assert limiter.current_limit == 12
+
+
+def test_slow_publish_degrades_limit():
+
+    limiter = AdaptiveConcurrencyLimiter(initial_limit=10, min_limit=2, publish_latency_target=0.5, publish_smoothing=1.0)
+
+    limiter.record_publish_latency(3.0)
+    limiter.try_acquire()
+    limiter.release(0.1)
+
+    assert limiter.current_limit == 8
+
+
+@patch.dict("os.environ", {"INGEST_CONCURRENCY_ENABLED": "false"})
+def test_limiter_can_be_disabled():
+
+    assert build_limiter_from_env() is None
+
+
+def test_upload_shed_returns_503(client):
+
+    with patch("app.main.concurrency_limiter") as limiter:
+        limiter.try_acquire.return_value = False
+        limiter.current_limit = 0
+
+        response = client.post("/api/images", content=b"abc")
+
+    assert response.status_code == 503
+    assert response.headers["Retry-After"] == "1"
+
+
+def test_limiter_is_off_by_default(monkeypatch):
+
+    monkeypatch.delenv("INGEST_CONCURRENCY_ENABLED", raising=False)
+
+    assert build_limiter_from_env() is None
+
+
+def test_upload_latency_excludes_body_read(client):
+
+    limiter = AdaptiveConcurrencyLimiter(initial_limit=10)
+
+    def slow_body():
+        time.sleep(0.2)
+        yield b"abc"
+
+    with patch("app.main.concurrency_limiter", limiter), patch.object(limiter, "release", wraps=limiter.release) as release:
+        client.post("/api/images", content=slow_body(), headers={"content-length": "3"})
+
+    latency, _ = release.call_args[0]
+    assert latency < 0.2
+
+
+def test_release_without_latency_leaves_limit():
+
+    limiter = AdaptiveConcurrencyLimiter(initial_limit=4, min_limit=1, max_limit=10)
+
+    for _ in range(50):
+        acquired = 0
+        while limiter.try_acquire():
+            acquired += 1
+        for _ in range(acquired):
+            limiter.release(None)
+
+    assert limiter.current_limit == 4
+    assert limiter.inflight == 0
+
+
+@patch("app.main.MAX_FILE_SIZE", 100)
+def test_rejection_before_body_read_does_not_grow_limit(client):
+
+    limiter = AdaptiveConcurrencyLimiter(initial_limit=2, min_limit=1, max_limit=10)
+
+    with patch("app.main.concurrency_limiter", limiter):
+        for _ in range(50):
+            response = client.post("/api/images", content=b"abc", headers={"content-length": "1000"})
+            assert response.status_code == 413
+
+    assert limiter.limit == 2
+    assert limiter.inflight == 0
@@ -27,7 +27,7 @@ def test_get_all_from_db_success():
     mock_context.__enter__.return_value = mock_connection
     mock_context.__exit__.return_value = None
 
-    with patch("app.db.engine.connect", return_value=mock_context):
+    with patch("app.db.get_engine", return_value=MagicMock(**{"connect.return_value": mock_context})):
         rows = get_all_from_db()
 
     assert len(rows) == 2
@@ -44,7 +44,7 @@ def test_get_all_from_db_empty():
     mock_context.__enter__.return_value = mock_connection
     mock_context.__exit__.return_value = None
 
-    with patch("app.db.engine.connect", return_value=mock_context):
+    with patch("app.db.get_engine", return_value=MagicMock(**{"connect.return_value": mock_context})):
         rows = get_all_from_db()
 
     assert rows == []
@@ -58,7 +58,7 @@ def test_get_all_from_db_exception():
     mock_context.__enter__.return_value = mock_connection
     mock_context.__exit__.return_value = None
 
-    with patch("app.db.engine.connect", return_value=mock_context):
+    with patch("app.db.get_engine", return_value=MagicMock(**{"connect.return_value": mock_context})):
         with patch("app.db.logger") as mock_logger:
             result = get_all_from_db()
 
@@ -76,8 +76,49 @@ def test_execute_called_once():
     mock_context.__enter__.return_value = mock_connection
     mock_context.__exit__.return_value = None
 
-    with patch("app.db.engine.connect", return_value=mock_context):
+    with patch("app.db.get_engine", return_value=MagicMock(**{"connect.return_value": mock_context})):
         get_all_from_db()
 
     mock_connection.execute.assert_called_once_with(ANY)
 
+
+
+def test_engine_pool_and_query_timeout():
+
+    from app import db
+
+    engine = db.create_db_engine()
+    assert engine.pool.size() == db.DB_POOL_SIZE
+    assert engine.pool._pre_ping is True
+
+    dbapi_connection = MagicMock()
+    db.set_query_timeout(dbapi_connection, None)
+    assert dbapi_connection.timeout == db.DB_QUERY_TIMEOUT_SECONDS
+
+
+def test_fetch_all_from_db_raises():
+
+    import pytest
+    from app.db import fetch_all_from_db
+
+    mock_connection = MagicMock()
+    mock_connection.execute.side_effect = Exception("Query timeout expired")
+
+    mock_context = MagicMock()
+    mock_context.__enter__.return_value = mock_connection
+    mock_context.__exit__.return_value = None
+
+    with patch("app.db.get_engine", return_value=MagicMock(**{"connect.return_value": mock_context})):
+        with pytest.raises(Exception, match="timeout"):
+            fetch_all_from_db()
+
+
+def test_engine_created_once_on_first_use():
+
+    from app import db
+
+    with patch("app.db._engine", None), patch("app.db.create_db_engine", return_value=MagicMock()) as create:
+        engine = db.get_engine()
+        assert db.get_engine() is engine
+
+    create.assert_called_once()
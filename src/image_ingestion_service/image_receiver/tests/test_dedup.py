@@ -0,0 +1,94 @@
+from io import BytesIO
+from PIL import Image
+from unittest.mock import patch
+from app.dedup import DuplicateFrameCache, FrameDigest, build_duplicate_cache_from_env
+
+
+class FakeClock:
+
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def digest_of(*chunks):
+
+    digest = FrameDigest()
+    for chunk in chunks:
+        digest.update(chunk)
+
+    return digest.digest()
+
+
+def test_digest_independent_of_chunking():
+
+    assert digest_of(b"abcdef") == digest_of(b"ab", b"cd", b"ef")
+    assert digest_of(b"abcdef") != digest_of(b"abcdeg")
+    assert digest_of(b"") != digest_of(b"\x00")
+
+
+def test_duplicate_within_window():
+
+    clock = FakeClock()
+    cache = DuplicateFrameCache(window=60, clock=clock)
+    digest = digest_of(b"frame")
+
+    assert not cache.is_duplicate("CAM001", digest)
+
+    cache.remember("CAM001", digest)
+    clock.now = 30
+
+    assert cache.is_duplicate("CAM001", digest)
+    assert not cache.is_duplicate("CAM002", digest)
+
+    clock.now = 61
+
+    assert not cache.is_duplicate("CAM001", digest)
+
+
+def test_history_and_camera_count_bounded():
+
+    cache = DuplicateFrameCache(window=60, history=2, max_cameras=2)
+
+    for frame in (b"a", b"b", b"c"):
+        cache.remember("CAM001", digest_of(frame))
+
+    assert not cache.is_duplicate("CAM001", digest_of(b"a"))
+    assert cache.is_duplicate("CAM001", digest_of(b"c"))
+
+    cache.remember("CAM002", digest_of(b"x"))
+    cache.remember("CAM003", digest_of(b"y"))
+
+    assert len(cache) == 2
+    assert not cache.is_duplicate("CAM001", digest_of(b"c"))
+
+
+@patch.dict("os.environ", {}, clear=True)
+def test_disabled_by_default():
+
+    assert build_duplicate_cache_from_env() is None
+
+
+def jpeg():
+
+    img = Image.new("RGB", (10, 10))
+
+    bio = BytesIO()
+    img.save(bio, format="JPEG")
+
+    return bio.getvalue()
+
+
+@patch("app.main.send_to_rabbitmq")
+def test_duplicate_upload_skipped(mock_send, client):
+
+    with patch("app.main.duplicate_cache", DuplicateFrameCache(window=60)):
+        first = client.post("/api/images", content=jpeg())
+        second = client.post("/api/images", content=jpeg())
+
+    assert first.status_code == 200
+    assert second.status_code == 200
+    assert second.text == "Duplicate image skipped"
+    mock_send.assert_called_once()
@@ -0,0 +1,63 @@
+from io import BytesIO
+from PIL import Image
+from unittest.mock import patch
+
+from app.derivatives import (
+    DerivativeSpec, build_derivative_specs_from_env, derivative_filename,
+    parse_derivative_specs, render_derivatives,
+)
+
+
+def jpeg(width, height):
+
+    bio = BytesIO()
+    Image.new("RGB", (width, height), (200, 40, 40)).save(bio, format="JPEG")
+    return bio.getvalue()
+
+
+def test_render_keeps_aspect_ratio():
+
+    rendered = render_derivatives(jpeg(1920, 1080), [
+        DerivativeSpec("thumbnail", 160, 160, 70),
+        DerivativeSpec("medium", 640, 480, 80),
+    ])
+
+    sizes = {name: (width, height) for name, _, width, height in rendered}
+    assert sizes == {"medium": (640, 360), "thumbnail": (160, 90)}
+
+    for name, data, width, height in rendered:
+        with Image.open(BytesIO(data)) as img:
+            assert img.format == "JPEG"
+            assert img.size == (width, height)
+
+
+def test_render_never_upscales():
+
+    [(_, _, width, height)] = render_derivatives(jpeg(100, 80), [DerivativeSpec("medium", 640, 480, 80)])
+
+    assert (width, height) == (100, 80)
+
+
+def test_parse_specs_skips_invalid_entries():
+
+    specs = parse_derivative_specs({
+        "thumbnail": {"width": 160, "height": 120, "quality": 70},
+        "medium": {"width": 640, "height": 480},
+        "missing": {"width": 10},
+        "huge_quality": {"width": 10, "height": 10, "quality": 500},
+        "not_a_dict": "big",
+    })
+
+    assert specs == [DerivativeSpec("thumbnail", 160, 120, 70), DerivativeSpec("medium", 640, 480, 80)]
+
+
+@patch.dict("os.environ", {}, clear=True)
+def test_disabled_without_config():
+
+    assert build_derivative_specs_from_env() is None
+
+
+def test_derivative_filename():
+
+    assert derivative_filename("123_20250819T142345Z.jpg", "thumbnail") == "123_20250819T142345Z_thumbnail.jpg"
+    assert derivative_filename("noext", "medium") == "noext_medium"
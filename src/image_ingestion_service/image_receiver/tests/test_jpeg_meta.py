@@ -0,0 +1,88 @@
+import pytest
+from io import BytesIO
+from PIL import Image
+from unittest.mock import patch
+
+from app.jpeg_meta import JpegMetadataParser, exif_datetime_original, new_metadata_parser
+
+
+def jpeg(size=(320, 240), quality=85, progressive=False, taken=None):
+
+    exif = Image.Exif()
+    if taken:
+        exif[0x8769] = {0x9003: taken}
+    bio = BytesIO()
+    Image.new("RGB", size, (10, 20, 30)).save(bio, format="JPEG", quality=quality, progressive=progressive, exif=exif.tobytes())
+    return bio.getvalue()
+
+
+def parse(data, chunk_size=65536):
+
+    parser = JpegMetadataParser()
+    for start in range(0, len(data), chunk_size):
+        parser.feed(data[start:start + chunk_size])
+    return parser
+
+
+@pytest.mark.parametrize("chunk_size", [1, 5, 65536])
+def test_reads_header_fields(chunk_size):
+
+    parser = parse(jpeg((640, 360), quality=70, taken="2025:08:19 14:23:45"), chunk_size)
+
+    assert parser.done
+    assert parser.as_headers() == {
+        "image_width": 640,
+        "image_height": 360,
+        "image_components": 3,
+        "image_progressive": False,
+        "image_quality_estimate": 70,
+        "exif_datetime_original": "2025-08-19T14:23:45",
+    }
+
+
+def test_progressive_and_grayscale():
+
+    bio = BytesIO()
+    Image.new("L", (50, 40)).save(bio, format="JPEG", progressive=True)
+
+    parser = parse(bio.getvalue())
+
+    assert parser.progressive is True
+    assert parser.components == 1
+    assert (parser.width, parser.height) == (50, 40)
+
+
+def test_stops_at_start_of_scan():
+
+    data = jpeg()
+    scan = data.index(b"\xff\xda")
+
+    parser = JpegMetadataParser()
+    parser.feed(data[:scan + 2])
+
+    assert parser.done
+    parser.feed(b"\x00" * 100)
+    assert parser.width == 320
+
+
+def test_not_a_jpeg():
+
+    parser = parse(b"GIF89a" + b"\x00" * 100)
+
+    assert parser.done
+    assert parser.as_headers() == {}
+
+
+def test_exif_without_datetime():
+
+    assert exif_datetime_original(b"Exif\x00\x00II*\x00\x08\x00\x00\x00\x00\x00") is None
+    assert exif_datetime_original(b"http://ns.adobe.com/xap/1.0/") is None
+
+
+def test_parser_off_by_default():
+
+    with patch("app.jpeg_meta.JPEG_METADATA_HEADERS", False):
+        assert new_metadata_parser() is None
+
+    with patch("app.jpeg_meta.JPEG_METADATA_HEADERS", True):
+        assert isinstance(new_metadata_parser(), JpegMetadataParser)
@@ -0,0 +1,104 @@
+import os
+import stat
+from io import BytesIO
+from PIL import Image
+from unittest.mock import patch
+
+from app.jpeg_optimize import (
+    accept_optimized, build_jpeg_optimizer_from_env, optimize_jpeg, parse_marker_names, strip_metadata,
+)
+
+APP0, APP1, APP2, COM = 0xE0, 0xE1, 0xE2, 0xFE
+
+
+def jpeg_with_metadata():
+
+    bio = BytesIO()
+    exif = Image.Exif()
+    exif[0x010F] = "Camera Maker " * 200
+    Image.new("RGB", (64, 48), (30, 120, 200)).save(bio, format="JPEG", exif=exif, comment=b"x" * 1000, icc_profile=b"\0" * 200)
+    return bio.getvalue()
+
+
+def markers(data):
+
+    found = []
+    position = 2
+    while data[position + 1] != 0xDA:
+        found.append(data[position + 1])
+        position += 2 + ((data[position + 2] << 8) | data[position + 3])
+    return found
+
+
+def pixels(data):
+
+    with Image.open(BytesIO(data)) as img:
+        return img.convert("RGB").tobytes()
+
+
+def test_marker_names():
+
+    assert parse_marker_names("APP0, app2,COM,APP16,DQT,") == frozenset({APP0, APP2, COM})
+
+
+def test_strip_keeps_listed_markers_and_pixels():
+
+    original = jpeg_with_metadata()
+    assert {APP0, APP1, APP2, COM} <= set(markers(original))
+
+    stripped = strip_metadata(original, frozenset({APP0, APP2}))
+
+    kept = markers(stripped)
+    assert APP1 not in kept and COM not in kept
+    assert APP0 in kept and APP2 in kept
+    assert len(original) - len(stripped) > 3000
+    assert pixels(stripped) == pixels(original)
+
+
+def test_strip_leaves_unparseable_data_alone():
+
+    truncated = jpeg_with_metadata()[:30]
+
+    assert strip_metadata(b"not a jpeg", frozenset()) == b"not a jpeg"
+    assert strip_metadata(truncated, frozenset()) == truncated
+
+
+def test_optimize_runs_jpegtran_on_the_stripped_image(tmp_path):
+
+    # Stand-in for jpegtran that passes its input through and records its arguments
+    script = tmp_path / "jpegtran"
+    script.write_text(f"#!/bin/sh\necho \"$@\" > {tmp_path}/args\nexec cat\n")
+    script.chmod(script.stat().st_mode | stat.S_IEXEC)
+    original = jpeg_with_metadata()
+
+    optimized, cpu_seconds = optimize_jpeg(original, frozenset(), str(script), 5.0)
+
+    assert optimized == strip_metadata(original, frozenset())
+    assert (tmp_path / "args").read_text().split() == ["-optimize", "-copy", "all"]
+    assert cpu_seconds >= 0
+
+
+def test_optimized_image_used_only_above_threshold():
+
+    original = b"x" * 1000
+
+    assert accept_optimized(original, b"x" * 900, 0.01, "North", 5.0) == b"x" * 900
+    assert accept_optimized(original, b"x" * 990, 0.01, "North", 5.0) is original
+    assert accept_optimized(original, b"", 0.01, "", 0.0) is original
+
+
+def test_build_from_env():
+
+    assert build_jpeg_optimizer_from_env() is None
+
+    with patch.dict(os.environ, {"JPEG_OPTIMIZE_ENABLED": "true", "JPEG_OPTIMIZE_KEEP_MARKERS": "APP0", "JPEGTRAN_PATH": "/nonexistent/jpegtran"}):
+        optimizer = build_jpeg_optimizer_from_env()
+
+    assert optimizer.keep_markers == frozenset({APP0})
+    assert optimizer.jpegtran is None
+    assert optimizer.min_savings_percent == 2.0
+
+    with patch.dict(os.environ, {"JPEG_OPTIMIZE_ENABLED": "true"}):
+        optimizer = build_jpeg_optimizer_from_env()
+
+    assert APP1 in optimizer.keep_markers
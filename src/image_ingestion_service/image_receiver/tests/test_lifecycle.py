@@ -0,0 +1,61 @@
+import signal
+import asyncio
+import pytest
+from app.lifecycle import AdmissionGate, install_sigterm_handler, restore_sigterm_handler
+
+
+def test_gate_refuses_uploads_once_draining():
+
+    gate = AdmissionGate()
+
+    assert gate.try_enter() is True
+    gate.begin_drain()
+    assert gate.try_enter() is False
+    assert gate.in_flight == 1
+
+    gate.leave()
+    gate.reset()
+    assert gate.try_enter() is True
+
+
+@pytest.mark.asyncio
+async def test_wait_idle_returns_when_last_upload_leaves():
+
+    gate = AdmissionGate()
+    gate.try_enter()
+    gate.begin_drain()
+
+    async def finish_upload():
+        await asyncio.sleep(0.01)
+        gate.leave()
+
+    task = asyncio.create_task(finish_upload())
+    assert await gate.wait_idle(1) is True
+    await task
+
+
+@pytest.mark.asyncio
+async def test_wait_idle_times_out():
+
+    gate = AdmissionGate()
+    gate.try_enter()
+
+    assert await gate.wait_idle(0.01) is False
+
+
+def test_sigterm_drains_then_chains_to_previous_handler():
+
+    received = []
+    original = signal.signal(signal.SIGTERM, lambda signum, frame: received.append(signum))
+    gate = AdmissionGate()
+    try:
+        previous = install_sigterm_handler(gate)
+        signal.getsignal(signal.SIGTERM)(signal.SIGTERM, None)
+
+        assert gate.draining is True
+        assert received == [signal.SIGTERM]
+
+        restore_sigterm_handler(previous)
+        assert signal.getsignal(signal.SIGTERM) is previous
+    finally:
+        signal.signal(signal.SIGTERM, original)
@@ -0,0 +1,129 @@
+import json
+import queue
+import logging
+import pytest
+from unittest.mock import patch
+from app.logging_config import (
+    DeferredQueueHandler, JsonLogFormatter, MessageRateLimitFilter, TextLogFormatter,
+    request_id_ctx_var, setup_logging, stop_logging,
+)
+
+
+class FakeClock:
+
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def make_record(msg, args=(), level=logging.INFO, name="app.main"):
+
+    return logging.LogRecord(name, level, __file__, 1, msg, args, None)
+
+
+def test_rate_limit_is_per_message_template():
+
+    clock = FakeClock()
+    limiter = MessageRateLimitFilter(rate=1, burst=2, clock=clock)
+
+    pushed = "Pushed to RabbitMQ for camera_id=%s"
+    results = [limiter.filter(make_record(pushed, (str(i),))) for i in range(4)]
+
+    assert results == [True, True, False, False]
+    assert limiter.filter(make_record("Successfully processed image for camera_id=%s", ("1",)))
+
+    clock.now = 1.0
+    record = make_record(pushed, ("5",))
+
+    assert limiter.filter(record)
+    assert record.suppressed == 2
+
+
+def test_rate_limit_bucket_table_is_capped():
+
+    limiter = MessageRateLimitFilter(rate=1, burst=1, max_buckets=3, clock=FakeClock())
+
+    assert limiter.filter(make_record("hot"))
+    for i in range(10):
+        assert limiter.filter(make_record(f"rendered message {i}"))
+        # A message type in use stays tracked while rarer ones are forgotten
+        assert not limiter.filter(make_record("hot"))
+
+    assert len(limiter._buckets) == 3
+    assert ("app.main", "hot") in limiter._buckets
+
+
+def test_rate_limit_skips_errors_and_other_loggers():
+
+    limiter = MessageRateLimitFilter(rate=1, burst=1, clock=FakeClock())
+
+    for _ in range(5):
+        assert limiter.filter(make_record("boom", level=logging.ERROR))
+        assert limiter.filter(make_record("GET /", name="uvicorn.access"))
+
+
+def test_json_formatter_keeps_request_id():
+
+    record = make_record("Pushed camera_id=%s", ("CAM001",))
+    record.request_id = "abc-123"
+    record.suppressed = 3
+
+    entry = json.loads(JsonLogFormatter().format(record))
+
+    assert entry["message"] == "Pushed camera_id=CAM001"
+    assert entry["request_id"] == "abc-123"
+    assert entry["level"] == "INFO"
+    assert entry["suppressed"] == 3
+
+
+def test_text_formatter_reports_suppressed():
+
+    record = make_record("hello")
+    record.suppressed = 7
+
+    assert TextLogFormatter("%(message)s").format(record) == "hello (7 similar messages suppressed)"
+
+
+def test_queue_handler_drops_when_full():
+
+    handler = DeferredQueueHandler(queue.Queue(maxsize=1))
+
+    handler.emit(make_record("one"))
+    handler.emit(make_record("two"))
+
+    assert handler.queue.qsize() == 1
+
+
+@pytest.fixture
+def restore_logging():
+
+    import app.logging_config as logging_config
+
+    root_logger = logging.getLogger()
+    handlers = root_logger.handlers[:]
+    listener = logging_config._listener
+
+    yield
+
+    stop_logging()
+    root_logger.handlers[:] = handlers
+    listener.start()
+    logging_config._listener = listener
+
+
+def test_background_writer_outputs_json(capsys, restore_logging):
+
+    with patch.dict("os.environ", {"LOG_FORMAT": "json"}):
+        setup_logging()
+    token = request_id_ctx_var.set("req-42")
+    logging.getLogger("app.test").info("Hello %s", "world")
+    request_id_ctx_var.reset(token)
+    stop_logging()
+
+    line = capsys.readouterr().out.strip().splitlines()[-1]
+    entry = json.loads(line)
+
+    assert entry["message"] == "Hello world"
+    assert entry["request_id"] == "req-42"
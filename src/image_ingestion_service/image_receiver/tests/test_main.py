@@ -176,6 +176,132 @@ def test_valid_timestamp(mock_send, client):
 
     assert response.status_code == 200
 
+@patch("app.main.send_to_rabbitmq")
+def test_multipart_upload(mock_send, client):
+
+    from fastapi import Request
+    from app.main import app
+    from app.auth import authenticate_request, camera_id_from_filename, get_upload_filename
+    from tests.conftest import fake_auth
+
+    async def multipart_auth(request: Request):
+        filename = await get_upload_filename(request, "127.0.0.1")
+        return {"ID": camera_id_from_filename(filename)}
+
+    image = jpeg()
+    app.dependency_overrides[authenticate_request] = multipart_auth
+    try:
+        response = client.post(
+            "/api/images",
+            data={"note": "from firmware"},
+            files={"image": ("CAM001.jpg", image, "image/jpeg")},
+        )
+    finally:
+        app.dependency_overrides[authenticate_request] = fake_auth
+
+    assert response.status_code == 200
+
+    args, kwargs = mock_send.call_args
+    assert bytes(args[1]) == image
+    assert kwargs["camera_id"] == "CAM001"
+
+@patch("app.main.send_batch_to_rabbitmq")
+@patch("app.main.send_to_rabbitmq")
+def test_upload_publishes_derivatives(mock_send, mock_batch, client):
+
+    import asyncio
+    from app.derivatives import DerivativeSpec
+
+    mock_batch.return_value = [None]
+
+    def submit(task, fn, *args):
+        future = asyncio.get_running_loop().create_future()
+        future.set_result(fn(*args))
+        return future
+
+    with patch("app.main.DERIVATIVE_SPECS", [DerivativeSpec("thumbnail", 16, 16, 70)]), \
+            patch("app.main.process_pool.try_submit", side_effect=submit):
+        response = client.post("/api/images", content=jpeg(), headers={"content-length": "500"})
+
+    assert response.status_code == 200
+    mock_send.assert_called_once()
+
+    [item] = mock_batch.call_args[0][1]
+    assert item["headers"]["derivative"] == "thumbnail"
+    assert item["headers"]["derivative_of"] == mock_send.call_args[0][2]
+    assert item["filename"].endswith("_thumbnail.jpg")
+
+def batch_source():
+
+    return {
+        "scripted_name": "Scripted",
+        "ip_address": "127.0.0.1",
+        "cameras": {"101": {"ID": 101, "Cam_LocationsRegion": "North"}, "102": {"ID": 102}},
+    }
+
+@patch("app.main.send_batch_to_rabbitmq")
+def test_batch_upload(mock_send, client):
+
+    from app.main import app
+    from app.auth import authenticate_batch_request
+
+    mock_send.return_value = [None, None]
+
+    app.dependency_overrides[authenticate_batch_request] = batch_source
+    try:
+        response = client.post(
+            "/api/images/batch",
+            files=[
+                ("image", ("101.jpg", jpeg(), "image/jpeg")),
+                ("image", ("102.jpg", jpeg(), "image/jpeg")),
+            ],
+        )
+    finally:
+        del app.dependency_overrides[authenticate_batch_request]
+
+    assert response.status_code == 200
+    assert response.json()["published"] == 2
+    mock_send.assert_called_once()
+    assert [item["camera_id"] for item in mock_send.call_args[0][1]] == ["101", "102"]
+
+@patch("app.main.send_batch_to_rabbitmq")
+def test_batch_upload_mixed_results(mock_send, client):
+
+    from app.main import app
+    from app.auth import authenticate_batch_request
+
+    mock_send.return_value = [RuntimeError("nack")]
+
+    app.dependency_overrides[authenticate_batch_request] = batch_source
+    try:
+        response = client.post(
+            "/api/images/batch",
+            files=[
+                ("image", ("101.jpg", jpeg(), "image/jpeg")),
+                ("image", ("999.jpg", jpeg(), "image/jpeg")),
+                ("image", ("102.jpg", b"not a jpeg", "image/jpeg")),
+            ],
+        )
+    finally:
+        del app.dependency_overrides[authenticate_batch_request]
+
+    assert response.status_code == 207
+    assert [item["status"] for item in response.json()["items"]] == [500, 401, 400]
+    assert response.json()["published"] == 0
+
+def test_batch_upload_requires_multipart(client):
+
+    from app.main import app
+    from app.auth import authenticate_batch_request
+
+    app.dependency_overrides[authenticate_batch_request] = batch_source
+    try:
+        response = client.post("/api/images/batch", content=jpeg(), headers={"content-type": "image/jpeg"})
+    finally:
+        del app.dependency_overrides[authenticate_batch_request]
+
+    assert response.status_code == 415
+
 @patch.dict("os.environ", {}, clear=True)
 def test_default_max_file_size():
 
@@ -191,4 +317,161 @@ def test_env_max_file_size():
 @patch.dict("os.environ", {"MAX_FILE_SIZE_BYTES": "abc"})
 def test_invalid_env():
 
-    assert _get_max_file_size() == 5 * 1024 * 1024
\ No newline at end of file
+    assert _get_max_file_size() == 5 * 1024 * 1024
+
+def test_readyz_reports_cache_and_broker(client):
+
+    from types import SimpleNamespace
+    from app.main import app
+
+    state = {"records": 0, "age_seconds": None, "stale": True}
+    with patch("app.main.credential_cache_status", return_value=state):
+        response = client.get("/api/readyz")
+    assert response.status_code == 503
+    assert response.json()["status"] == "not_ready"
+    assert response.json()["broker"] == {"connection": "closed", "channel": "closed"}
+
+    app.state.rabbitmq_connection = SimpleNamespace(is_closed=False)
+    app.state.rabbitmq_channel = SimpleNamespace(is_closed=False)
+    try:
+        state = {"records": 10, "age_seconds": 4.2, "stale": False}
+        with patch("app.main.credential_cache_status", return_value=state):
+            response = client.get("/api/readyz")
+        assert response.status_code == 200
+        assert response.json()["status"] == "ready"
+        assert response.json()["credential_cache"]["age_seconds"] == 4.2
+    finally:
+        del app.state.rabbitmq_connection
+        del app.state.rabbitmq_channel
+
+
+def test_uploads_refused_while_draining(client):
+
+    from app.lifecycle import admission_gate
+
+    admission_gate.begin_drain()
+    try:
+        response = client.post("/api/images", content=jpeg())
+        assert response.status_code == 503
+        assert response.headers["Retry-After"] == "1"
+        assert client.get("/api/readyz").json()["status"] == "draining"
+        # Other routes keep working
+        assert client.get("/api/healthz").status_code == 200
+    finally:
+        admission_gate.reset()
+
+
+def test_camera_freshness_endpoints(client):
+
+    from app.camera_tracker import CameraTracker
+
+    assert client.get("/api/cameras/freshness").status_code == 404
+
+    tracker = CameraTracker(max_cameras=10, stale_seconds=60)
+    tracker.record_upload("CAM001", 100, now=0)
+    with patch("app.main.camera_tracker", tracker):
+        report = client.get("/api/cameras/freshness").json()
+        assert report["tracked"] == 1
+        assert report["stale"]["cameras"][0]["camera_id"] == "CAM001"
+
+        assert client.get("/api/cameras/CAM001/freshness").json()["uploads"] == 1
+        assert client.get("/api/cameras/CAM999/freshness").status_code == 404
+
+
+@patch("app.main.send_to_rabbitmq")
+def test_region_sketches_endpoint(mock_send, client):
+
+    from app.sketches import RegionSketches
+
+    assert client.get("/api/sketches").status_code == 404
+
+    sketches = RegionSketches()
+    with patch("app.main.region_sketches", sketches):
+        image = jpeg()
+        assert client.post("/api/images", content=image).status_code == 200
+        report = client.get("/api/sketches").json()
+
+    # The test camera has no region, so it is counted under "other"
+    payload = report["regions"]["other"]["payload_bytes"]
+    assert payload["sketch"]["count"] == 1
+    assert abs(payload["p50"] - len(image)) <= len(image) * 0.01
+    assert report["regions"]["other"]["latency_seconds"]["p99"] > 0
+
+
+@patch("app.main.send_to_rabbitmq")
+def test_upload_publishes_optimized_image(mock_send, client):
+
+    import asyncio
+    from app.jpeg_optimize import JpegOptimizer
+
+    bio = BytesIO()
+    Image.new("RGB", (100, 100), (255, 0, 0)).save(bio, format="JPEG", comment=b"c" * 2000)
+    image = bio.getvalue()
+
+    def submit(task, fn, *args):
+        future = asyncio.get_running_loop().create_future()
+        future.set_result(fn(*args))
+        return future
+
+    optimizer = JpegOptimizer(frozenset(), None, 2.0, 5.0)
+    with patch("app.main.jpeg_optimizer", optimizer), patch("app.main.process_pool.try_submit", side_effect=submit):
+        response = client.post("/api/images", content=image)
+
+    assert response.status_code == 200
+    published = bytes(mock_send.call_args[0][1])
+    assert len(published) < len(image) - 2000
+    assert Image.open(BytesIO(published)).tobytes() == Image.open(BytesIO(image)).tobytes()
+
+
+@patch("app.main.send_to_rabbitmq")
+def test_upload_schedule_hint_and_arrivals(mock_send, client):
+
+    from app.camera_tracker import CameraTracker
+    from app.upload_schedule import UploadScheduler
+
+    assert client.get("/api/uploads/arrivals").status_code == 404
+
+    tracker = CameraTracker(max_cameras=10)
+    for now in (0, 60, 120):
+        tracker.record_upload("CAM001", 100, now=now)
+    with patch("app.main.camera_tracker", tracker), patch("app.main.upload_scheduler", UploadScheduler(hints=True)):
+        response = client.post("/api/images", content=jpeg())
+        report = client.get("/api/uploads/arrivals").json()
+
+    assert response.status_code == 200
+    assert response.headers["Upload-Schedule"].endswith("interval=60.0")
+    assert report["hints"] is True
+    assert report["phases"]["groups"][0]["cameras"] == 1
+
+
+@patch("app.main.send_to_rabbitmq")
+def test_upload_schedule_hint_only_for_published_live_frames(mock_send, client):
+
+    import time
+    from app.main import app
+    from app.auth import authenticate_request
+    from app.camera_tracker import CameraTracker
+    from app.upload_schedule import UploadScheduler
+    from tests.conftest import fake_auth
+
+    tracker = CameraTracker(max_cameras=10)
+    for now in (0, 60, 120):
+        tracker.record_upload("CAM001", 100, now=now)
+    scheduler = UploadScheduler(hints=True)
+
+    with patch("app.main.camera_tracker", tracker), patch("app.main.upload_scheduler", scheduler):
+        with patch("app.main.duplicate_cache") as duplicates:
+            duplicates.is_duplicate.return_value = True
+            duplicate = client.post("/api/images", content=jpeg())
+
+        app.dependency_overrides[authenticate_request] = lambda: {"ID": "CAM001", "is_scripted": True}
+        try:
+            scripted = client.post("/api/images", content=jpeg())
+        finally:
+            app.dependency_overrides[authenticate_request] = fake_auth
+
+    assert duplicate.status_code == 200
+    assert "Upload-Schedule" not in duplicate.headers
+    assert scripted.status_code == 200
+    assert "Upload-Schedule" not in scripted.headers
+    assert sum(scheduler.window.counts(time.time() + 1)) == 1
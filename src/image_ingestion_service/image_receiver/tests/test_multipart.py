@@ -0,0 +1,128 @@
+import pytest
+
+from app.multipart import MultipartError, MultipartImageReader, multipart_boundary
+
+
+BOUNDARY = b"----testboundary"
+
+
+def form(*parts):
+
+    body = b""
+    for headers, data in parts:
+        body += b"--" + BOUNDARY + b"\r\n" + headers + b"\r\n\r\n" + data + b"\r\n"
+    return body + b"--" + BOUNDARY + b"--\r\n"
+
+
+async def chunked(body, size):
+
+    for start in range(0, len(body), size):
+        yield body[start:start + size]
+
+
+async def read_all(reader):
+
+    return b"".join([chunk async for chunk in reader.stream()])
+
+
+def test_boundary_from_content_type():
+
+    assert multipart_boundary("multipart/form-data; boundary=abc") == b"abc"
+    assert multipart_boundary("image/jpeg") is None
+    assert multipart_boundary(None) is None
+
+    with pytest.raises(MultipartError):
+        multipart_boundary("multipart/form-data")
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("chunk_size", [1, 7, 64, 100000])
+async def test_reads_first_file_part(chunk_size):
+
+    image = bytes(range(256)) * 40
+    body = form(
+        (b'Content-Disposition: form-data; name="note"', b"hello"),
+        (b'Content-Disposition: form-data; name="image"; filename="CAM001.jpg"\r\nContent-Type: image/jpeg', image),
+        (b'Content-Disposition: form-data; name="other"; filename="CAM002.jpg"', b"second"),
+    )
+
+    reader = MultipartImageReader(chunked(body, chunk_size), BOUNDARY)
+
+    assert await reader.read_filename() == "CAM001.jpg"
+    assert reader.content_type == "image/jpeg"
+    assert await read_all(reader) == image
+
+
+@pytest.mark.asyncio
+async def test_filename_found_before_part_data_is_read():
+
+    image = b"x" * 50000
+    body = form((b'Content-Disposition: form-data; name="image"; filename="CAM001.jpg"', image))
+
+    reader = MultipartImageReader(chunked(body, 1024), BOUNDARY)
+    await reader.read_filename()
+
+    assert reader.bytes_read < 2048
+
+
+@pytest.mark.asyncio
+async def test_no_file_part():
+
+    body = form((b'Content-Disposition: form-data; name="note"', b"hello"))
+
+    with pytest.raises(MultipartError):
+        await MultipartImageReader(chunked(body, 64), BOUNDARY).read_filename()
+
+
+@pytest.mark.asyncio
+async def test_preamble_limit():
+
+    body = form(
+        (b'Content-Disposition: form-data; name="note"', b"n" * 5000),
+        (b'Content-Disposition: form-data; name="image"; filename="CAM001.jpg"', b"image"),
+    )
+
+    with pytest.raises(MultipartError):
+        await MultipartImageReader(chunked(body, 512), BOUNDARY, max_preamble=1024).read_filename()
+
+
+@pytest.mark.asyncio
+async def test_malformed_body():
+
+    with pytest.raises(MultipartError):
+        await MultipartImageReader(chunked(b"not a multipart body at all", 8), BOUNDARY).read_filename()
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("chunk_size", [3, 100000])
+async def test_next_file_walks_every_file_part(chunk_size):
+
+    body = form(
+        (b'Content-Disposition: form-data; name="image"; filename="101.jpg"', b"first"),
+        (b'Content-Disposition: form-data; name="note"', b"ignored"),
+        (b'Content-Disposition: form-data; name="image"; filename="102.jpg"', b"second"),
+        (b'Content-Disposition: form-data; name="image"; filename="103.jpg"', b"third"),
+    )
+
+    reader = MultipartImageReader(chunked(body, chunk_size), BOUNDARY)
+    seen = []
+    while (filename := await reader.next_file()) is not None:
+        if filename == "102.jpg":
+            continue  # unread parts are skipped
+        seen.append((filename, await read_all(reader)))
+
+    assert seen == [("101.jpg", b"first"), ("103.jpg", b"third")]
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("chunk_size", [5, 100000])
+async def test_body_without_closing_boundary(chunk_size):
+
+    body = form((b'Content-Disposition: form-data; name="image"; filename="CAM001.jpg"', b"x" * 1000))
+    truncated = body[:body.rindex(b"\r\n--" + BOUNDARY)]
+
+    reader = MultipartImageReader(chunked(truncated, chunk_size), BOUNDARY)
+
+    assert await reader.read_filename() == "CAM001.jpg"
+    with pytest.raises(MultipartError, match="ended inside a file part"):
+        await read_all(reader)
@@ -0,0 +1,36 @@
+import pytest
+
+from app.process_pool import BoundedProcessPool, PoolBusy
+
+
+@pytest.mark.asyncio
+async def test_runs_in_worker_and_refuses_when_full():
+
+    pool = BoundedProcessPool(workers=1, max_pending=1)
+    try:
+        future = pool.try_submit("test", divmod, 7, 2)
+        assert pool.pending == 1
+
+        with pytest.raises(PoolBusy):
+            pool.try_submit("test", divmod, 9, 2)
+
+        assert await future == (3, 1)
+        assert pool.pending == 0
+        assert await pool.try_submit("test", divmod, 9, 2) == (4, 1)
+    finally:
+        pool.shutdown()
+
+
+@pytest.mark.asyncio
+async def test_cancelled_task_frees_its_slot():
+
+    pool = BoundedProcessPool(workers=1, max_pending=2)
+    try:
+        first = pool.try_submit("test", divmod, 7, 2)
+        second = pool.try_submit("test", divmod, 9, 2)
+        second.cancel()
+        await first
+
+        assert pool.pending == 0
+    finally:
+        pool.shutdown()
@@ -0,0 +1,172 @@
+import asyncio
+import pytest
+from unittest.mock import AsyncMock, MagicMock, patch
+from app.publish_lanes import (
+    PublishLanes, lane_for, build_lane_priorities_from_env, build_lane_weights_from_env, LIVE_LANE, SCRIPTED_LANE,
+)
+from app.rabbitmq import send_to_rabbitmq
+
+
+def test_lane_for():
+
+    assert lane_for({"is_scripted": True}) == SCRIPTED_LANE
+    assert lane_for({"is_scripted": False}) == LIVE_LANE
+    assert lane_for({}) == LIVE_LANE
+
+
+@pytest.mark.asyncio
+async def test_idle_lane_is_admitted_immediately():
+
+    lanes = PublishLanes({LIVE_LANE: 4, SCRIPTED_LANE: 1}, concurrency=1)
+
+    async def publish():
+        return "published"
+
+    assert await lanes.run(SCRIPTED_LANE, publish) == "published"
+    assert lanes.active == 0
+
+
+@pytest.mark.asyncio
+async def test_backlogged_lanes_are_served_by_weight():
+
+    lanes = PublishLanes({LIVE_LANE: 4, SCRIPTED_LANE: 1}, concurrency=1)
+    release = asyncio.Event()
+    order = []
+
+    async def blocker():
+        await release.wait()
+
+    def publisher(lane):
+        async def publish():
+            order.append(lane)
+        return publish
+
+    first = asyncio.create_task(lanes.run(LIVE_LANE, blocker))
+    await asyncio.sleep(0)
+    tasks = [asyncio.create_task(lanes.run(SCRIPTED_LANE, publisher(SCRIPTED_LANE))) for _ in range(10)]
+    tasks += [asyncio.create_task(lanes.run(LIVE_LANE, publisher(LIVE_LANE))) for _ in range(8)]
+    await asyncio.sleep(0)
+    assert lanes.depth(SCRIPTED_LANE) == 10
+    assert lanes.depth(LIVE_LANE) == 8
+
+    release.set()
+    await asyncio.gather(first, *tasks)
+
+    # While both lanes are backlogged, live gets four slots in every five
+    assert order[:10].count(LIVE_LANE) == 8
+    assert order[10:] == [SCRIPTED_LANE] * 8
+    assert lanes.active == 0
+
+
+@pytest.mark.asyncio
+async def test_cancelled_waiter_leaves_its_lane():
+
+    lanes = PublishLanes({LIVE_LANE: 4, SCRIPTED_LANE: 1}, concurrency=1)
+    release = asyncio.Event()
+
+    async def blocker():
+        await release.wait()
+
+    async def publish():
+        return None
+
+    first = asyncio.create_task(lanes.run(LIVE_LANE, blocker))
+    await asyncio.sleep(0)
+    waiting = asyncio.create_task(lanes.run(SCRIPTED_LANE, publish))
+    await asyncio.sleep(0)
+    assert lanes.depth(SCRIPTED_LANE) == 1
+
+    waiting.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await waiting
+    assert lanes.depth(SCRIPTED_LANE) == 0
+
+    release.set()
+    await first
+    assert lanes.active == 0
+
+
+@pytest.mark.asyncio
+async def test_failed_publish_releases_its_slot():
+
+    lanes = PublishLanes({LIVE_LANE: 4, SCRIPTED_LANE: 1}, concurrency=1)
+
+    async def publish():
+        raise RuntimeError("broker down")
+
+    with pytest.raises(RuntimeError):
+        await lanes.run(LIVE_LANE, publish)
+    assert lanes.active == 0
+
+
+def test_invalid_lane_weight_falls_back_to_default(monkeypatch):
+
+    monkeypatch.setenv("PUBLISH_LANE_WEIGHTS", '{"live": "fast", "scripted": 2, "audit": null}')
+
+    assert build_lane_weights_from_env() == {"live": 4, "scripted": 2, "audit": 1}
+
+
+def test_lane_priorities_are_clamped(monkeypatch):
+
+    monkeypatch.setenv("PUBLISH_LANE_PRIORITIES", '{"live": 300, "scripted": -1, "other": "high"}')
+
+    assert build_lane_priorities_from_env() == {"live": 255, "scripted": 0}
+
+
+@pytest.mark.asyncio
+async def test_scripted_lane_uses_priority_and_exchange():
+
+    live_exchange = AsyncMock()
+    scripted_exchange = AsyncMock()
+    request = MagicMock()
+    request.app.state.rabbitmq_exchange = live_exchange
+    request.app.state.rabbitmq_scripted_exchange = scripted_exchange
+    request.app.state.rabbitmq_channel_lock = None
+
+    with patch("app.rabbitmq.LANE_PRIORITIES", {"live": 5, "scripted": 1}):
+        await send_to_rabbitmq(request, b"image", "cam.jpg", camera_id="1", timestamp="2025-01-01T00:00:00Z", lane=SCRIPTED_LANE)
+        await send_to_rabbitmq(request, b"image", "cam.jpg", camera_id="1", timestamp="2025-01-01T00:00:00Z", lane=LIVE_LANE)
+
+    scripted_message = scripted_exchange.publish.call_args[0][0]
+    live_message = live_exchange.publish.call_args[0][0]
+    assert scripted_message.priority == 1
+    assert live_message.priority == 5
+
+
+@pytest.mark.asyncio
+async def test_live_publish_overtakes_large_batch():
+
+    from app.main import publish_batch_in_lane, publish_in_lane
+
+    published = []
+
+    async def publish(message, routing_key):
+        await asyncio.sleep(0.001)
+        published.append(message.headers["camera_id"])
+
+    exchange = MagicMock()
+    exchange.publish = publish
+    request = MagicMock()
+    request.app.state.rabbitmq_exchange = exchange
+    request.app.state.rabbitmq_scripted_exchange = None
+    request.app.state.rabbitmq_channel_lock = asyncio.Lock()
+
+    items = [
+        {"image_bytes": b"a", "filename": "batch.jpg", "camera_id": f"B{index}", "timestamp": "2026-01-01T12:30:45+00:00"}
+        for index in range(200)
+    ]
+    lanes = PublishLanes({LIVE_LANE: 4, SCRIPTED_LANE: 1}, concurrency=2)
+
+    with patch("app.main.publish_lanes", lanes), patch("app.main.LANE_BATCH_CHUNK", 8):
+        batch = asyncio.create_task(publish_batch_in_lane(request, items, SCRIPTED_LANE))
+        await asyncio.sleep(0.005)
+        await publish_in_lane(LIVE_LANE, lambda: send_to_rabbitmq(
+            request, b"live", "live.jpg", camera_id="LIVE", timestamp="2026-01-01T12:30:45+00:00", lane=LIVE_LANE
+        ))
+
+        assert not batch.done()
+        errors = await batch
+
+    assert errors == [None] * 200
+    assert published.index("LIVE") < 40
+    assert len(published) == 201
@@ -143,4 +143,145 @@ async def test_logger_called_on_exception():
                     "2026-01-01T12:30:45+00:00"
                 )
 
-        logger.error.assert_called_once()
\ No newline at end of file
+        logger.error.assert_called_once()
+
+
+@pytest.mark.asyncio
+async def test_logger_called_when_message_cannot_be_built():
+
+    request = MagicMock()
+    request.app.state.rabbitmq_channel_lock = None
+
+    with patch("app.rabbitmq.logger") as logger:
+
+        with pytest.raises(ValueError):
+
+            await send_to_rabbitmq(request, b"abc", "cam.jpg", "CAM001", "not-a-timestamp")
+
+        logger.error.assert_called_once()
+
+
+@pytest.mark.asyncio
+async def test_claim_check_publishes_reference(tmp_path):
+
+    from app.blobstore import LocalFilesystemBlobStore
+
+    exchange = AsyncMock()
+
+    request = MagicMock()
+    request.app.state.rabbitmq_exchange = exchange
+    request.app.state.rabbitmq_channel_lock = None
+
+    with patch("app.blobstore.blob_store", LocalFilesystemBlobStore(str(tmp_path))):
+
+        with patch("app.rabbitmq.aio_pika.Message") as message:
+
+            await send_to_rabbitmq(
+                request=request,
+                image_bytes=b"abc",
+                filename="camera.jpg",
+                camera_id="CAM123",
+                timestamp="2026-01-01T12:30:45+00:00"
+            )
+
+        _, kwargs = message.call_args
+
+        assert kwargs["body"] == b""
+
+        headers = kwargs["headers"]
+
+        assert headers["camera_id"] == "CAM123"
+        assert headers["content_length"] == 3
+        assert open(headers["blob_ref"][len("file://"):], "rb").read() == b"abc"
+
+@pytest.mark.asyncio
+async def test_claim_check_falls_back_to_inline():
+
+    exchange = AsyncMock()
+
+    request = MagicMock()
+    request.app.state.rabbitmq_exchange = exchange
+    request.app.state.rabbitmq_channel_lock = None
+
+    store = MagicMock()
+    store.check_in = AsyncMock(side_effect=OSError("disk full"))
+
+    with patch("app.blobstore.blob_store", store):
+
+        with patch("app.rabbitmq.aio_pika.Message") as message:
+
+            await send_to_rabbitmq(
+                request=request,
+                image_bytes=b"abc",
+                filename="camera.jpg",
+                camera_id="CAM123",
+                timestamp="2026-01-01T12:30:45+00:00"
+            )
+
+        _, kwargs = message.call_args
+
+        assert kwargs["body"] == b"abc"
+        assert "blob_ref" not in kwargs["headers"]
+
+@pytest.mark.asyncio
+async def test_send_batch_reports_per_item_errors():
+
+    from app.rabbitmq import send_batch_to_rabbitmq
+
+    exchange = AsyncMock()
+    exchange.publish.side_effect = [None, RuntimeError("nack"), None]
+
+    request = MagicMock()
+    request.app.state.rabbitmq_exchange = exchange
+    request.app.state.rabbitmq_channel_lock = None
+
+    items = [
+        {"image_bytes": b"a", "filename": f"{camera}.jpg", "camera_id": camera, "timestamp": "2026-01-01T12:30:45+00:00"}
+        for camera in ("CAM1", "CAM2", "CAM3")
+    ]
+
+    with patch("app.rabbitmq.aio_pika.Message"):
+
+        errors = await send_batch_to_rabbitmq(request, items)
+
+    assert exchange.publish.await_count == 3
+    assert errors[0] is None
+    assert isinstance(errors[1], RuntimeError)
+    assert errors[2] is None
+
+def test_build_routing_key():
+
+    from app.rabbitmq import build_routing_key
+
+    assert build_routing_key("LowerMainland", "123") == "LowerMainland.123"
+    assert build_routing_key("Lower Mainland", "1.2", "thumbnail") == "Lower_Mainland.1_2.thumbnail"
+    assert build_routing_key("", "#*") == "unknown.__"
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("exchange_type, routing_key, region_header", [
+    ("fanout", "", None),
+    ("topic", "North.CAM123", None),
+    ("headers", "", "North"),
+])
+async def test_routing_by_exchange_type(exchange_type, routing_key, region_header):
+
+    exchange = AsyncMock()
+
+    request = MagicMock()
+    request.app.state.rabbitmq_exchange = exchange
+    request.app.state.rabbitmq_channel_lock = None
+
+    with patch("app.rabbitmq.RABBITMQ_EXCHANGE_TYPE", exchange_type), \
+            patch("app.rabbitmq.aio_pika.Message") as message:
+
+        await send_to_rabbitmq(
+            request=request,
+            image_bytes=b"abc",
+            filename="camera.jpg",
+            camera_id="CAM123",
+            timestamp="2026-01-01T12:30:45+00:00",
+            region="North"
+        )
+
+    assert exchange.publish.await_args.kwargs["routing_key"] == routing_key
+    assert message.call_args.kwargs["headers"].get("region") == region_header
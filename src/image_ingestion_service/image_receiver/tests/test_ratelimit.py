@@ -0,0 +1,114 @@
+from unittest.mock import patch
+from app.ratelimit import CameraRateLimiter, build_rate_limiter_from_env, retry_after_header
+from app.auth import authenticate_request
+from app.main import app
+
+
+class FakeClock:
+
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+POLICIES = {
+    "default": {"rate": 1.0, "burst": 2},
+    "regions": {"North": {"rate": 0.1, "burst": 1}},
+    "cameras": {"42": {"rate": 10.0, "burst": 5}},
+}
+
+
+def test_bucket_allows_burst_then_limits():
+
+    clock = FakeClock()
+    limiter = CameraRateLimiter(POLICIES, clock=clock)
+
+    assert limiter.allow("1")[0]
+    assert limiter.allow("1")[0]
+
+    allowed, retry_after = limiter.allow("1")
+
+    assert not allowed
+    assert retry_after == 1.0
+
+    clock.now = 1.0
+
+    assert limiter.allow("1")[0]
+
+
+def test_policy_resolution_order():
+
+    limiter = CameraRateLimiter(POLICIES)
+
+    assert limiter.policy_for("42", "North") == (10.0, 5.0)
+    assert limiter.policy_for("7", "North") == (0.1, 1.0)
+    assert limiter.policy_for("7", "South") == (1.0, 2.0)
+
+
+def test_cameras_without_policy_are_not_limited():
+
+    limiter = CameraRateLimiter({"regions": {"North": {"rate": 1, "burst": 1}}})
+
+    for _ in range(10):
+        assert limiter.allow("7", "South")[0]
+
+    assert len(limiter) == 0
+
+
+def test_idle_buckets_evicted():
+
+    clock = FakeClock()
+    limiter = CameraRateLimiter(POLICIES, idle_ttl=30, sweep_interval=10, clock=clock)
+
+    limiter.allow("1")
+    limiter.allow("2")
+    clock.now = 20.0
+    limiter.allow("2")
+    clock.now = 45.0
+    limiter.allow("3")
+
+    assert len(limiter) == 2
+
+
+def test_retry_after_header_rounds_up():
+
+    assert retry_after_header(0.2) == "1"
+    assert retry_after_header(9.5) == "10"
+
+
+@patch.dict("os.environ", {}, clear=True)
+def test_no_policies_disables_limiter():
+
+    assert build_rate_limiter_from_env() is None
+
+
+def test_upload_rejected_with_429(client):
+
+    previous = app.dependency_overrides[authenticate_request]
+    app.dependency_overrides[authenticate_request] = lambda: {"ID": "CAM001", "Cam_LocationsRegion": "North"}
+    try:
+        with patch("app.main.camera_rate_limiter") as limiter:
+            limiter.allow.return_value = (False, 4.2)
+
+            response = client.post("/api/images", content=b"abc")
+    finally:
+        app.dependency_overrides[authenticate_request] = previous
+
+    assert response.status_code == 429
+    assert response.headers["Retry-After"] == "5"
+    limiter.allow.assert_called_once_with("CAM001", "North")
+
+
+@patch("app.main.CAMERA_RATE_LIMIT_ACTION", "drop")
+@patch("app.main.send_to_rabbitmq")
+def test_upload_dropped_when_configured(mock_send, client):
+
+    with patch("app.main.camera_rate_limiter") as limiter:
+        limiter.allow.return_value = (False, 1.0)
+
+        response = client.post("/api/images", content=b"abc")
+
+    assert response.status_code == 200
+    mock_send.assert_not_called()
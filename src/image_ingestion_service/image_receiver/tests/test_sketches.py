@@ -0,0 +1,115 @@
+import json
+import random
+import pytest
+from app.sketches import DDSketch, RegionSketches, build_region_sketches_from_env, merge_reports, main
+
+
+def exact_quantile(values, q):
+    ordered = sorted(values)
+    return ordered[int(q * (len(ordered) - 1))]
+
+
+def test_quantiles_within_relative_accuracy():
+
+    rng = random.Random(7)
+    values = [rng.lognormvariate(11, 1) for _ in range(20000)]
+    sketch = DDSketch(relative_accuracy=0.01)
+    for value in values:
+        sketch.add(value)
+
+    for q in (0.5, 0.95, 0.99):
+        exact = exact_quantile(values, q)
+        assert abs(sketch.quantile(q) - exact) <= exact * 0.01
+    assert min(values) <= sketch.quantile(0) <= min(values) * 1.01
+    assert max(values) * 0.99 <= sketch.quantile(1) <= max(values)
+    assert DDSketch().quantile(0.5) is None
+
+
+def test_merge_matches_a_single_sketch():
+
+    rng = random.Random(3)
+    values = [rng.expovariate(5) for _ in range(5000)] + [0.0] * 10
+    whole = DDSketch()
+    parts = [DDSketch(), DDSketch(), DDSketch()]
+    for index, value in enumerate(values):
+        whole.add(value)
+        parts[index % 3].add(value)
+
+    merged = DDSketch()
+    for part in parts:
+        # Round-trip through JSON as a report from another worker would
+        merged.merge(DDSketch.from_dict(json.loads(json.dumps(part.to_dict()))))
+
+    assert merged.bins == whole.bins
+    assert merged.zero_count == whole.zero_count == 10
+    assert merged.count == whole.count
+    assert merged.quantile(0.99) == whole.quantile(0.99)
+
+    with pytest.raises(ValueError):
+        merged.merge(DDSketch(relative_accuracy=0.02))
+
+
+def test_bins_are_capped_by_collapsing_the_lowest():
+
+    values = [10 ** exponent * (1 + step / 100) for exponent in range(-6, 7) for step in range(100)]
+    sketch = DDSketch(relative_accuracy=0.01, max_bins=50)
+    for value in values:
+        sketch.add(value)
+
+    assert len(sketch.bins) == 50
+    assert sketch.count == 1300
+    # The top of the distribution keeps its accuracy
+    exact = exact_quantile(values, 0.99)
+    assert abs(sketch.quantile(0.99) - exact) <= exact * 0.01
+
+
+def test_regions_beyond_the_limit_share_other():
+
+    sketches = RegionSketches(max_regions=2)
+    sketches.record("North", 1000, 0.05)
+    sketches.record("South", 2000, 0.10)
+    sketches.record("East", 3000, 0.20)
+    sketches.record("", 4000, 0.30)
+
+    report = sketches.report()
+
+    assert sorted(report["regions"]) == ["North", "South", "other"]
+    assert report["regions"]["other"]["payload_bytes"]["sketch"]["count"] == 2
+
+
+def test_merge_reports_across_workers(tmp_path, capsys):
+
+    first, second = RegionSketches(), RegionSketches()
+    for size in range(1000, 2000):
+        first.record("North", size, 0.01)
+        second.record("North", size + 1000, 0.02)
+    second.record("South", 500, 0.5)
+
+    merged = merge_reports([first.report(), second.report()])
+
+    north = merged["regions"]["North"]
+    assert north["payload_bytes"]["sketch"]["count"] == 2000
+    assert abs(north["payload_bytes"]["p50"] - 2000) <= 2000 * 0.01
+    assert merged["regions"]["South"]["latency_seconds"]["p50"] == 0.5
+
+    paths = []
+    for index, sketches in enumerate((first, second)):
+        path = tmp_path / f"worker{index}.json"
+        path.write_text(json.dumps(sketches.report()))
+        paths.append(str(path))
+    main(paths)
+    printed = json.loads(capsys.readouterr().out)
+    assert "sketch" not in printed["regions"]["North"]["payload_bytes"]
+    assert printed["regions"]["North"]["payload_bytes"]["p99"] == north["payload_bytes"]["p99"]
+
+
+@pytest.mark.parametrize("accuracy", ["0", "1", "-0.5"])
+def test_invalid_relative_accuracy_falls_back_to_default(monkeypatch, accuracy):
+
+    monkeypatch.setenv("REGION_SKETCHES_ENABLED", "true")
+    monkeypatch.setenv("SKETCH_RELATIVE_ACCURACY", accuracy)
+
+    sketches = build_region_sketches_from_env()
+
+    assert sketches.relative_accuracy == 0.01
+    sketches.record("North", 1000, 0.5)
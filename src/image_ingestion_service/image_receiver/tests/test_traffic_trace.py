@@ -0,0 +1,105 @@
+import json
+import time
+import pytest
+from types import SimpleNamespace
+from unittest.mock import patch
+from fastapi import HTTPException
+
+from app import traffic_trace
+from app.traffic_trace import NULL_TRACE, TrafficRecorder, start_trace, get_trace
+
+
+@pytest.fixture
+def recorder(tmp_path):
+
+    recorder = TrafficRecorder(str(tmp_path / "trace.jsonl"), salt="test-salt")
+    yield recorder
+    recorder.close()
+
+
+def read_records(recorder):
+
+    recorder.close()
+    with open(recorder.path) as handle:
+        return [json.loads(line) for line in handle if line.strip()]
+
+
+def test_trace_record_is_compact_and_anonymized(recorder):
+
+    trace = recorder.start()
+    trace.set_camera("CAM001", "North")
+    trace.size = 1234
+    trace.stage("read", time.perf_counter())
+    trace.note("duplicate")
+    trace.finish(200)
+
+    [entry] = read_records(recorder)
+    assert set(entry) == {"t", "c", "r", "n", "s", "o", "x"}
+    assert entry["c"] == recorder.anonymize("CAM001")
+    assert entry["c"] != "CAM001"
+    assert entry["r"] == "North"
+    assert entry["n"] == 1234
+    assert "read" in entry["s"]
+    assert entry["o"] == 200
+    assert entry["x"] == "duplicate"
+
+
+def test_finish_writes_once(recorder):
+
+    trace = recorder.start()
+    trace.finish(200)
+    trace.finish(500)
+
+    assert [entry["o"] for entry in read_records(recorder)] == [200]
+
+
+def test_anonymization_is_stable_per_salt(tmp_path):
+
+    first = TrafficRecorder(str(tmp_path / "a.jsonl"), salt="same")
+    second = TrafficRecorder(str(tmp_path / "b.jsonl"), salt="same")
+    other = TrafficRecorder(str(tmp_path / "c.jsonl"), salt="other")
+    try:
+        assert first.anonymize("CAM001") == second.anonymize("CAM001")
+        assert first.anonymize("CAM001") != other.anonymize("CAM001")
+        assert len(first.anonymize("CAM001")) == 12
+    finally:
+        for recorder in (first, second, other):
+            recorder.close()
+
+
+def test_null_trace_when_capture_disabled():
+
+    request = SimpleNamespace(state=SimpleNamespace())
+    with patch.object(traffic_trace, "traffic_recorder", None):
+        trace = start_trace(request)
+
+    assert trace is NULL_TRACE
+    assert get_trace(request) is NULL_TRACE
+    trace.size = 10
+    trace.set_camera("CAM001")
+    trace.finish(200)
+
+
+def test_start_trace_reuses_request_trace(recorder):
+
+    request = SimpleNamespace(state=SimpleNamespace())
+    with patch.object(traffic_trace, "traffic_recorder", recorder):
+        trace = start_trace(request)
+        assert start_trace(request) is trace
+        assert get_trace(request) is trace
+
+
+@pytest.mark.asyncio
+async def test_auth_rejection_finishes_trace(recorder):
+
+    from app import auth
+
+    request = SimpleNamespace(state=SimpleNamespace(), headers={}, client=SimpleNamespace(host="10.0.0.1"))
+    with patch.object(traffic_trace, "traffic_recorder", recorder), \
+            patch.object(auth, "_authenticate", side_effect=HTTPException(status_code=401, detail="no")):
+        with pytest.raises(HTTPException):
+            await auth.authenticate_request(request, None)
+
+    [entry] = read_records(recorder)
+    assert entry["o"] == 401
+    assert entry["x"] == "auth_rejected"
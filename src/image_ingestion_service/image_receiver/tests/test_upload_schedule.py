@@ -0,0 +1,89 @@
+import random
+from app.camera_tracker import CameraTracker
+from app.upload_schedule import (
+    ArrivalWindow, UploadScheduler, next_upload_delay, phase_alignment, phase_fraction,
+)
+
+
+def test_phases_spread_consecutive_ids():
+
+    fractions = sorted(phase_fraction(str(camera_id)) for camera_id in range(1, 101))
+
+    # Golden-ratio spacing leaves no gap much wider than an even split would
+    gaps = [b - a for a, b in zip(fractions, fractions[1:])]
+    assert max(gaps) < 3 / 100
+    assert 0 <= phase_fraction("CAM-7") < 1
+    assert phase_fraction("CAM-7") == phase_fraction("CAM-7")
+
+
+def test_delay_lands_on_phase_and_keeps_cadence():
+
+    for now in (1000.0, 1012.5, 1059.9):
+        delay = next_upload_delay("42", 60.0, now)
+        assert 30.0 <= delay < 90.0
+        assert abs((now + delay) % 60.0 - phase_fraction("42") * 60.0) < 1e-6
+
+
+def test_hint_needs_known_cadence_and_hints_enabled():
+
+    scheduler = UploadScheduler(hints=True)
+
+    assert scheduler.hint("42", None) is None
+    assert UploadScheduler(hints=False).hint("42", 60.0) is None
+
+    hint = scheduler.hint("42", 59.6, now=1000.0)
+    delay, interval = (float(part.split("=")[1]) for part in hint.split(", "))
+    assert interval == 60.0
+    assert 30.0 <= delay < 90.0
+
+
+def test_arrival_window_stats():
+
+    window = ArrivalWindow(10)
+    for second in range(100, 109):
+        window.record(second + 0.5)
+    for _ in range(18):
+        window.record(105.2)
+
+    stats = window.stats(109.1)
+
+    assert window.counts(109.1) == [1, 1, 1, 1, 1, 19, 1, 1, 1]
+    assert stats["uploads"] == 27
+    assert stats["max_per_second"] == 19
+    assert stats["peak_to_mean"] == 6.33
+    assert stats["dispersion_index"] > 1
+
+    # Seconds that passed without arrivals count as idle
+    assert window.stats(200.0)["uploads"] == 0
+    assert window.stats(200.0)["peak_to_mean"] is None
+
+
+def test_following_hints_flattens_aligned_cameras():
+
+    rng = random.Random(1)
+    tracker = CameraTracker(max_cameras=1000)
+    aligned, hinted = UploadScheduler(window_seconds=120), UploadScheduler(window_seconds=120, hints=True)
+    cameras = [str(camera_id) for camera_id in range(1, 301)]
+
+    for scheduler, follow in ((aligned, False), (hinted, True)):
+        next_upload = {camera_id: 1000 + rng.uniform(0, 1) for camera_id in cameras}
+        while min(next_upload.values()) < 1600:
+            camera_id = min(next_upload, key=next_upload.get)
+            now = next_upload[camera_id]
+            scheduler.record_arrival(now)
+            tracker.record_upload(camera_id, 1000, now=now)
+            hint = scheduler.hint(camera_id, tracker.cadence(camera_id), now=now)
+            if follow and hint:
+                next_upload[camera_id] = now + float(hint.split(",")[0].split("=")[1])
+            else:
+                next_upload[camera_id] = now + 60 + rng.uniform(-0.2, 0.2)
+
+    before = aligned.window.stats(1600)
+    after = hinted.window.stats(1600)
+    assert after["max_per_second"] * 5 < before["max_per_second"]
+    assert after["dispersion_index"] < before["dispersion_index"]
+
+    [group] = phase_alignment(tracker.cadences())["groups"]
+    assert group["interval"] == 60.0
+    assert group["concentration"] < 0.1
+    assert group["on_phase_share"] > 0.9